@@ -0,0 +1,62 @@
+"""
+Microbenchmark: per-request JWT verification CPU cost
+
+Compares decoding the bearer token the way get_current_user used to (the
+secret parsed and the signature verified on every call) with
+decode_access_token on a cache miss (prepared signing key) and on a hit.
+Times are process CPU time. Run from the repository root:
+
+    python benchmarks/auth.py [--number 20000]
+"""
+
+import argparse
+import os
+import sys
+import time
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "src"))
+
+from jose import jwt  # noqa: E402
+
+from app.api import security  # noqa: E402
+from app.config import get_settings  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--number", type=int, default=20000, help="iterations")
+    args = parser.parse_args()
+
+    settings = get_settings()
+    token = security.create_access_token(data={"sub": "benchmark"})
+
+    def uncached() -> dict:
+        return jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+
+    def prepared_key_miss() -> dict:
+        security.token_cache.clear()
+        return security.decode_access_token(token)
+
+    def cache_hit() -> dict:
+        return security.decode_access_token(token)
+
+    assert uncached() == prepared_key_miss() == cache_hit(), "claims differ"
+
+    results = {}
+    for name, fn in (
+        ("jwt.decode", uncached),
+        ("cache miss", prepared_key_miss),
+        ("cache hit", cache_hit),
+    ):
+        timings = timeit.repeat(
+            fn, number=args.number, repeat=5, timer=time.process_time
+        )
+        seconds = min(timings) / args.number
+        results[name] = seconds
+        print(f"{name:>12}: {seconds * 1e6:8.2f} us CPU per request")
+    print(f"{'speedup':>12}: {results['jwt.decode'] / results['cache hit']:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,389 @@
+"""
+Endpoint load benchmark with a machine-readable latency report
+
+Starts the app with uvicorn against a throwaway local database, seeds a user
+and notes, then drives concurrent load against the main endpoints and writes
+throughput and latency percentiles as JSON. Run from the repository root:
+
+    python benchmarks/endpoints.py run --output baseline.json
+    python benchmarks/endpoints.py run --output current.json
+    python benchmarks/endpoints.py compare baseline.json current.json
+
+By default a SQLite (aiosqlite) file in a temp directory is used; pass
+--database-url to benchmark against a local Postgres instead (the schema is
+created with metadata.create_all, so use an empty database).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(ROOT_DIR, "src")
+
+USERNAME = "benchmark"
+PASSWORD = "benchmark-password"
+SEARCH_WORDS = ["alpha", "bravo", "charlie", "delta", "echo", "foxtrot"]
+TAGS = ["work", "home", "urgent", "later", "ideas"]
+# Scenarios that change data or are CPU bound are not warmed up
+NO_WARMUP = {"auth_token", "note_create", "note_update", "note_delete"}
+
+
+# --- Statistics ---
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> Dict[str, Any]:
+    values = sorted(latencies)
+    count = len(values)
+    return {
+        "requests": count + errors,
+        "errors": errors,
+        "throughput_rps": round(count / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(sum(values) / count * 1000, 3) if count else 0.0,
+        "p50_ms": round(percentile(values, 50) * 1000, 3),
+        "p95_ms": round(percentile(values, 95) * 1000, 3),
+        "p99_ms": round(percentile(values, 99) * 1000, 3),
+        "max_ms": round(values[-1] * 1000, 3) if count else 0.0,
+    }
+
+
+# --- Server lifecycle ---
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def create_schema(database_url: str) -> None:
+    """Create tables (including full-text search objects) in a fresh database"""
+    code = (
+        "import asyncio\n"
+        "from app.db import get_engine, metadata\n"
+        "async def main():\n"
+        "    engine = get_engine()\n"
+        "    async with engine.begin() as conn:\n"
+        "        await conn.run_sync(metadata.create_all)\n"
+        "    await engine.dispose()\n"
+        "asyncio.run(main())\n"
+    )
+    subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=SRC_DIR,
+        env={**os.environ, "DATABASE_URL": database_url, "PYTHONPATH": SRC_DIR},
+        check=True,
+    )
+
+
+def start_server(database_url: str, port: int) -> subprocess.Popen:
+    return subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "app.main:app",
+            "--host",
+            "127.0.0.1",
+            "--port",
+            str(port),
+            "--log-level",
+            "warning",
+            "--no-access-log",
+        ],
+        cwd=SRC_DIR,
+        env={**os.environ, "DATABASE_URL": database_url, "PYTHONPATH": SRC_DIR},
+    )
+
+
+async def wait_until_ready(client: httpx.AsyncClient, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get("/ping")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.1)
+    raise RuntimeError("Server did not become ready")
+
+
+# --- Load generation ---
+
+
+Request = Callable[[httpx.AsyncClient], Awaitable[httpx.Response]]
+
+
+async def drive(
+    client: httpx.AsyncClient, make_request: Request, requests: int, concurrency: int
+) -> Dict[str, Any]:
+    """Issue ``requests`` calls with ``concurrency`` workers and summarize them"""
+    latencies: List[float] = []
+    errors = 0
+    remaining = iter(range(requests))
+
+    async def worker() -> None:
+        nonlocal errors
+        for _ in remaining:
+            start = time.perf_counter()
+            try:
+                response = await make_request(client)
+                ok = response.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+def note_payload(i: int) -> Dict[str, Any]:
+    words = " ".join(random.sample(SEARCH_WORDS, 3))
+    return {
+        "title": f"Benchmark note {i}",
+        "description": f"Seeded note {i} mentioning {words}",
+        "completed": i % 3 == 0,
+        "tags": random.sample(TAGS, 2),
+    }
+
+
+async def seed(client: httpx.AsyncClient, notes: int) -> List[int]:
+    await client.post(
+        "/auth/register",
+        json={"username": USERNAME, "email": "bench@example.com", "password": PASSWORD},
+    )
+    response = await client.post(
+        "/auth/token", data={"username": USERNAME, "password": PASSWORD}
+    )
+    response.raise_for_status()
+    client.headers["Authorization"] = f"Bearer {response.json()['access_token']}"
+
+    ids: List[int] = []
+    for start in range(0, notes, 1000):
+        batch = [note_payload(i) for i in range(start, min(start + 1000, notes))]
+        response = await client.post("/notes/bulk", json=batch)
+        response.raise_for_status()
+        ids.extend(response.json()["created_ids"])
+    return ids
+
+
+def scenarios(ids: List[int], created: List[int]) -> Dict[str, Request]:
+    """Named request factories; ``created`` collects ids for update/delete"""
+
+    async def ping(c):
+        return await c.get("/ping")
+
+    async def login(c):
+        return await c.post(
+            "/auth/token", data={"username": USERNAME, "password": PASSWORD}
+        )
+
+    async def list_notes(c):
+        return await c.get("/notes/", params={"limit": 50})
+
+    async def list_deep_cursor(c):
+        response = await c.get("/notes/", params={"limit": 100})
+        cursor = response.headers.get("X-Next-Cursor")
+        for _ in range(4):
+            if not cursor:
+                break
+            response = await c.get("/notes/", params={"limit": 100, "cursor": cursor})
+            cursor = response.headers.get("X-Next-Cursor")
+        return response
+
+    async def search_notes(c):
+        return await c.get(
+            "/notes/", params={"search": random.choice(SEARCH_WORDS), "limit": 20}
+        )
+
+    async def tag_notes(c):
+        return await c.get("/notes/", params={"tag": random.choice(TAGS), "limit": 20})
+
+    async def create_note(c):
+        response = await c.post("/notes/", json=note_payload(len(created)))
+        if response.status_code == 201:
+            created.append(response.json()["id"])
+        return response
+
+    async def read_note(c):
+        return await c.get(f"/notes/{random.choice(ids)}")
+
+    async def update_note(c):
+        note_id = random.choice(created or ids)
+        return await c.put(f"/notes/{note_id}", json=note_payload(note_id))
+
+    async def delete_note(c):
+        return await c.delete(f"/notes/{created.pop()}")
+
+    return {
+        "ping": ping,
+        "auth_token": login,
+        "notes_list": list_notes,
+        "notes_list_cursor_5_pages": list_deep_cursor,
+        "notes_search": search_notes,
+        "notes_tag": tag_notes,
+        "note_create": create_note,
+        "note_read": read_note,
+        "note_update": update_note,
+        "note_delete": delete_note,
+    }
+
+
+async def run_benchmark(args: argparse.Namespace) -> Dict[str, Any]:
+    tmpdir = tempfile.TemporaryDirectory()
+    database_url = args.database_url or (
+        f"sqlite+aiosqlite:///{os.path.join(tmpdir.name, 'bench.db')}"
+    )
+    create_schema(database_url)
+    port = free_port()
+    server = start_server(database_url, port)
+    try:
+        limits = httpx.Limits(max_connections=args.concurrency)
+        async with httpx.AsyncClient(
+            base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60
+        ) as client:
+            await wait_until_ready(client)
+            ids = await seed(client, args.notes)
+            created: List[int] = []
+            results = {}
+            for name, make_request in scenarios(ids, created).items():
+                if args.only and name not in args.only:
+                    continue
+                requests = args.requests
+                if name == "auth_token":
+                    requests = max(1, requests // 10)  # bcrypt bound
+                if name == "note_delete":
+                    requests = min(requests, len(created))
+                if name not in NO_WARMUP:
+                    await drive(client, make_request, 20, args.concurrency)
+                results[name] = await drive(
+                    client, make_request, requests, args.concurrency
+                )
+                print(
+                    f"{name:>28}: {results[name]['throughput_rps']:9.1f} req/s  "
+                    f"p50 {results[name]['p50_ms']:8.2f} ms  "
+                    f"p95 {results[name]['p95_ms']:8.2f} ms  "
+                    f"p99 {results[name]['p99_ms']:8.2f} ms",
+                    file=sys.stderr,
+                )
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+        tmpdir.cleanup()
+
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "database": database_url.split(":", 1)[0],
+            "notes": args.notes,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+        },
+        "scenarios": results,
+    }
+
+
+# --- Comparison ---
+
+
+def compare(
+    baseline: Dict[str, Any], current: Dict[str, Any], threshold: float
+) -> List[str]:
+    """Print a side-by-side table and return the regressed scenario names
+
+    A scenario regresses when its p95 latency grows, or its throughput drops,
+    by more than ``threshold`` percent.
+    """
+    regressions = []
+    header = f"{'scenario':>28} {'rps':>18} {'p95 ms':>20} {'p99 ms':>20}"
+    print(header)
+    for name, new in current["scenarios"].items():
+        old: Optional[Dict[str, Any]] = baseline["scenarios"].get(name)
+        if old is None:
+            print(f"{name:>28} (new)")
+            continue
+
+        def change(key: str) -> float:
+            return (new[key] - old[key]) / old[key] * 100 if old[key] else 0.0
+
+        regressed = change("p95_ms") > threshold or -change("throughput_rps") > threshold
+        if regressed:
+            regressions.append(name)
+        print(
+            f"{name:>28} "
+            f"{old['throughput_rps']:8.1f}>{new['throughput_rps']:<9.1f}"
+            f"{old['p95_ms']:9.2f}>{new['p95_ms']:<10.2f}"
+            f"{old['p99_ms']:9.2f}>{new['p99_ms']:<10.2f}"
+            f"{'REGRESSION' if regressed else ''}"
+        )
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="run the benchmark and write a report")
+    run.add_argument("--output", "-o", help="report path (default: stdout)")
+    run.add_argument("--database-url", help="database to benchmark against")
+    run.add_argument("--notes", type=int, default=5000, help="notes to seed")
+    run.add_argument("--requests", type=int, default=500, help="requests per scenario")
+    run.add_argument("--concurrency", type=int, default=16, help="parallel clients")
+    run.add_argument("--only", nargs="*", help="scenario names to run")
+    run.add_argument("--seed", type=int, default=1234, help="random seed")
+
+    cmp = commands.add_parser("compare", help="compare two reports")
+    cmp.add_argument("baseline")
+    cmp.add_argument("current")
+    cmp.add_argument(
+        "--threshold", type=float, default=10.0, help="allowed change in percent"
+    )
+
+    args = parser.parse_args()
+    if args.command == "run":
+        random.seed(args.seed)
+        report = json.dumps(asyncio.run(run_benchmark(args)), indent=2)
+        if args.output:
+            with open(args.output, "w") as f:
+                f.write(report + "\n")
+        else:
+            print(report)
+    else:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        with open(args.current) as f:
+            current = json.load(f)
+        regressions = compare(baseline, current, args.threshold)
+        if regressions:
+            print(f"Regressed: {', '.join(regressions)}", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Microbenchmark: note list serialization, response_model vs the fast path
+
+Run from the repository root:
+
+    python benchmarks/serialization.py [--rows 100] [--number 2000]
+"""
+
+import argparse
+import os
+import sys
+import timeit
+from datetime import datetime
+from typing import List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "src"))
+
+from pydantic import TypeAdapter  # noqa: E402
+
+from app.api.models import NoteListItem  # noqa: E402
+from app.api.serializers import dump_notes  # noqa: E402
+
+
+def make_rows(count: int) -> List[dict]:
+    # Same key order as the rows crud returns
+    return [
+        {
+            "title": f"Note {i}",
+            "description": "A realistic note description of moderate length",
+            "completed": i % 2 == 0,
+            "tags": ["work", "important"],
+            "id": i,
+            "created_date": datetime(2024, 1, 15, 10, 30, 0, i),
+            "is_deleted": False,
+            "owner_id": 1,
+        }
+        for i in range(count)
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100, help="notes per page")
+    parser.add_argument("--number", type=int, default=2000, help="iterations")
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    adapter = TypeAdapter(List[NoteListItem])
+
+    def response_model_path() -> bytes:
+        # What FastAPI does for response_model=List[NoteListItem]
+        return adapter.dump_json(adapter.validate_python(rows), exclude_unset=True)
+
+    def fast_path() -> bytes:
+        return dump_notes(rows)
+
+    assert response_model_path() == fast_path(), "outputs differ"
+
+    results = {}
+    for name, fn in (("response_model", response_model_path), ("fast_path", fast_path)):
+        seconds = min(timeit.repeat(fn, number=args.number, repeat=5)) / args.number
+        results[name] = seconds
+        print(f"{name:>15}: {seconds * 1e6:8.1f} us per {args.rows}-note page")
+    print(f"{'speedup':>15}: {results['response_model'] / results['fast_path']:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Admission control: bounded concurrency with a deadline-aware wait queue
+
+Each route class (auth, reads, writes) gets an ``AdmissionLimiter``. Up to
+``limit`` requests of the class run at once and up to ``max_queue`` more
+wait in FIFO order for at most ``max_wait`` seconds. A request is shed
+instead of queued when the queue is full or when, at the class's recent
+mean service time, its turn would come after the deadline, so overload
+turns into quick 503s rather than requests timing out while they hold
+their place in line.
+"""
+
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Dict
+
+from app import metrics
+
+requests_shed = metrics.registry.counter(
+    "http_requests_shed",
+    "Requests rejected by admission control, by route class and reason",
+    ("class", "reason"),
+)
+
+
+class RequestShed(RuntimeError):
+    """Raised when a request can't be admitted within its class's deadline"""
+
+    def __init__(self, reason: str):
+        super().__init__(f"Request shed: {reason}")
+        self.reason = reason
+
+
+class AdmissionLimiter:
+    def __init__(self, limit: int, max_queue: int, max_wait: float, smoothing=0.2):
+        self.limit = max(1, limit)
+        self.max_queue = max(0, max_queue)
+        self.max_wait = max_wait
+        self.smoothing = smoothing
+        self.in_flight = 0
+        # Exponentially weighted mean time a request holds its slot
+        self.service_time = 0.0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def expected_wait(self) -> float:
+        """Estimated wait for a request joining the back of the queue now"""
+        return (len(self._waiters) + 1) * self.service_time / self.limit
+
+    def _release(self) -> None:
+        # Hand the slot straight to the oldest live waiter so newcomers can't
+        # overtake the queue
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    async def _acquire(self) -> None:
+        if self.in_flight < self.limit and not self._waiters:
+            self.in_flight += 1
+            return
+        if len(self._waiters) >= self.max_queue:
+            raise RequestShed("queue_full")
+        if self.expected_wait() > self.max_wait:
+            raise RequestShed("deadline")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, self.max_wait)
+        except asyncio.TimeoutError:
+            self._discard(waiter)
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over in the tick the deadline passed
+                # (wait_for can still time out then): keep it, don't leak it
+                return
+            raise RequestShed("deadline")
+        except BaseException:
+            self._discard(waiter)
+            if waiter.done() and not waiter.cancelled():
+                # Cancelled after the slot was handed over: pass it on
+                self._release()
+            raise
+
+    def _discard(self, waiter: asyncio.Future) -> None:
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Hold one of the class's slots, raising RequestShed if none comes"""
+        await self._acquire()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.service_time += self.smoothing * (elapsed - self.service_time)
+            self._release()
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "service_time_seconds": self.service_time,
+        }
+
+
+def collect_limiters(limiters: Dict[str, AdmissionLimiter]):
+    """Metrics collector for the slots in use and waiters of each class"""
+
+    def collect():
+        yield "admission_in_flight", "gauge", "Requests holding a slot", [
+            ({"class": name}, limiter.in_flight) for name, limiter in limiters.items()
+        ]
+        yield "admission_queued", "gauge", "Requests waiting for a slot", [
+            ({"class": name}, limiter.queued) for name, limiter in limiters.items()
+        ]
+
+    return collect
@@ -11,12 +11,18 @@ from app.config import get_settings
 router = APIRouter()
 settings = get_settings()
 
+hashing_busy_exception = HTTPException(
+    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+    detail="Authentication service is busy, please retry",
+    headers={"Retry-After": "1"},
+)
+
 
 @router.post(
     "/register",
     response_model=UserDB,
     status_code=201,
-    responses={400: {"model": ErrorResponse}},
+    responses={400: {"model": ErrorResponse}, 503: {"model": ErrorResponse}},
 )
 async def register(payload: UserCreate, session: AsyncSession = Depends(get_db)):
     """Register a new user"""
@@ -30,23 +36,32 @@ async def register(payload: UserCreate, session: AsyncSession = Depends(get_db))
     if user:
         raise HTTPException(status_code=400, detail="Email already registered")
 
-    hashed_password = security.get_password_hash(payload.password)
+    try:
+        hashed_password = await security.get_password_hash_async(payload.password)
+    except security.PasswordHashingBusy:
+        raise hashing_busy_exception
     await crud.create_user(session, payload, hashed_password)
 
     # Return user data (without password)
     return await crud.get_user_by_username(session, payload.username)
 
 
-@router.post("/token", response_model=Token)
+@router.post(
+    "/token", response_model=Token, responses={503: {"model": ErrorResponse}}
+)
 async def login_for_access_token(
     form_data: OAuth2PasswordRequestForm = Depends(),
     session: AsyncSession = Depends(get_db),
 ):
     """Login to get access token"""
     user = await crud.get_user_by_username(session, form_data.username)
-    if not user or not security.verify_password(
-        form_data.password, user["hashed_password"]
-    ):
+    try:
+        authenticated = user is not None and await security.verify_password_async(
+            form_data.password, user["hashed_password"]
+        )
+    except security.PasswordHashingBusy:
+        raise hashing_busy_exception
+    if not authenticated:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
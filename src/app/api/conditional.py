@@ -0,0 +1,51 @@
+"""
+ETags and If-None-Match handling for note responses
+
+Note versions come from ``users.notes_version``, which every note write
+advances in its own transaction. A single note's ETag is its id and the
+version it was last written at; a list page's ETag is the owner's current
+version plus a digest of the query parameters, so it can be checked before
+running the listing query.
+"""
+
+import hashlib
+from typing import Any, Optional
+
+from fastapi import Response
+
+# Browsers may cache notes privately but must revalidate before reuse
+CACHE_CONTROL = "private, no-cache"
+
+
+def note_etag(id: int, version: int) -> str:
+    return f'"n{id}.{version}"'
+
+
+def list_etag(owner_id: int, version: int, *params: Any) -> str:
+    digest = hashlib.blake2b(repr(params).encode(), digest_size=8).hexdigest()
+    return f'"l{owner_id}.{version}.{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of ``etag`` against an If-None-Match header value"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def not_modified(etag: str) -> Response:
+    return Response(
+        status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    )
+
+
+def validator_headers(etag: str) -> dict:
+    return {"ETag": etag, "Cache-Control": CACHE_CONTROL}
@@ -1,9 +1,64 @@
 from app.api.models import NoteSchema, UserCreate
-from app.db import notes, users
-from sqlalchemy import select, insert, update, or_, and_
+from app.api.search import apply_search
+from app.api.serializers import NOTE_FIELDS, dump_cached_note, load_cached_note
+from app import metrics
+from app.cache import KeyValueBackend, MemoryBackend, ReadThroughCache, TTLCache
+from app.config import get_settings
+from app.db import (
+    mark_write,
+    note_counts,
+    note_day_counts,
+    note_tag_counts,
+    note_is_deleted,
+    note_is_live,
+    notes,
+    note_tags,
+    users,
+)
+from sqlalchemy import select, insert, update, delete, and_
 import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import Optional, List, Dict, Any
+from collections import Counter
+from datetime import date, datetime, timedelta
+from typing import Optional, List, Dict, Any, AsyncIterator, Tuple
+
+settings = get_settings()
+
+# Authenticated users (UserDB) keyed by username, filled by get_current_user
+user_cache = TTLCache(
+    maxsize=settings.user_cache_max_size, ttl=settings.user_cache_ttl_seconds
+)
+metrics.register_cache("user", user_cache)
+
+
+def _note_cache_backend():
+    if settings.note_cache_backend == "memory":
+        return MemoryBackend(
+            maxsize=settings.note_cache_max_size,
+            ttl=settings.note_cache_ttl_seconds,
+        )
+    if settings.note_cache_backend == "redis":
+        return KeyValueBackend.from_url(
+            settings.note_cache_url,
+            dumps=dump_cached_note,
+            loads=load_cached_note,
+            prefix="note:",
+        )
+    return None
+
+
+# Note rows (with version) keyed by str(id), filled by get and invalidated
+# by put, delete_note and delete_all after they commit
+note_cache = ReadThroughCache(
+    _note_cache_backend(), ttl=settings.note_cache_ttl_seconds, name="note"
+)
+metrics.register_cache("note", note_cache)
+
+# Note columns in response field order, so rows serialize without reshaping
+note_columns = [notes.c[name] for name in NOTE_FIELDS if name in notes.c]
+# Single-note reads and writes also return the version for the ETag
+versioned_note_columns = [*note_columns, notes.c.version]
 
 
 # --- User CRUD ---
@@ -25,6 +80,7 @@ async def create_user(
     )
     result = await session.execute(query)
     await session.commit()
+    user_cache.pop(payload.username)
     return result.scalar()
 
 
@@ -48,11 +104,190 @@ async def get_user_by_email(
     return dict(row) if row else None
 
 
+async def get_user_ids(
+    session: AsyncSession, after: int = 0, limit: int = 500
+) -> List[int]:
+    """Return up to ``limit`` user IDs greater than ``after``, in order"""
+    query = (
+        select(users.c.id).where(users.c.id > after).order_by(users.c.id).limit(limit)
+    )
+    result = await session.execute(query)
+    return list(result.scalars())
+
+
 # --- Note CRUD ---
 
 
-async def post(session: AsyncSession, payload: NoteSchema, owner_id: int) -> int:
-    """Create a new note and return its ID"""
+def _dialect(session: AsyncSession) -> str:
+    # get_bind() rather than .bind: read sessions pick their engine lazily
+    return session.get_bind().dialect.name
+
+
+async def _bump_notes_version(session: AsyncSession, owner_id: int) -> int:
+    """Advance the owner's notes version and return it (without committing)
+
+    Runs in the same transaction as the write it versions, so readers never
+    see the new version before the data it describes.
+    """
+    result = await session.execute(
+        update(users)
+        .where(users.c.id == owner_id)
+        .values(notes_version=users.c.notes_version + 1)
+        .returning(users.c.notes_version)
+    )
+    return result.scalar_one()
+
+
+async def get_notes_version(session: AsyncSession, owner_id: int) -> int:
+    """Return the owner's notes version, which changes on every note write"""
+    result = await session.execute(
+        select(users.c.notes_version).where(users.c.id == owner_id)
+    )
+    return result.scalar_one_or_none() or 0
+
+
+def _dml(session: AsyncSession):
+    """The dialect's INSERT, which supports ON CONFLICT"""
+    return postgresql if _dialect(session) == "postgresql" else sqlite
+
+
+def _increment(session: AsyncSession, table: sa.Table, rows: List[Dict[str, Any]]):
+    """Upsert ``rows`` into a counter table, adding to existing rows' counters
+
+    Rows are sent as one multi-row INSERT, so every row needs the same keys.
+    """
+    query = _dml(session).insert(table).values(rows)
+    return query.on_conflict_do_update(
+        index_elements=list(table.primary_key),
+        set_={
+            column.name: column + query.excluded[column.name]
+            for column in table.c
+            if not column.primary_key and column.name in rows[0]
+        },
+    )
+
+
+async def _execute_all(session: AsyncSession, statements: List[Any]) -> None:
+    """Run independent writes, in a single statement on Postgres
+
+    Postgres runs data-modifying CTEs to completion whether or not the main
+    statement reads them, so all but the last become CTEs of the last.
+    Elsewhere they are sent one by one.
+    """
+    if not statements:
+        return
+    if _dialect(session) != "postgresql":
+        for statement in statements:
+            await session.execute(statement)
+        return
+    *rest, last = statements
+    ctes = [statement.cte(f"write_{i}") for i, statement in enumerate(rest)]
+    await session.execute(last.add_cte(*ctes) if ctes else last)
+
+
+def _note_stats_changes(
+    session: AsyncSession,
+    owner_id: int,
+    total: int = 0,
+    completed: int = 0,
+    deleted: int = 0,
+    tags: Optional[Counter] = None,
+    days: Optional[Counter] = None,
+) -> List[Any]:
+    """Statements applying a write's changes to the owner's note statistics
+
+    ``tags`` and ``days`` map tags and creation dates to the change in their
+    live note counts. Counter rows are created on first use; rows falling to
+    zero are kept (reads skip them) until the next rebuild.
+    """
+    statements = []
+    if total or completed or deleted:
+        statements.append(
+            _increment(
+                session,
+                note_counts,
+                [
+                    {
+                        "owner_id": owner_id,
+                        "total": total,
+                        "completed": completed,
+                        "deleted": deleted,
+                    }
+                ],
+            )
+        )
+    for table, key, changes in (
+        (note_tag_counts, "tag", tags),
+        (note_day_counts, "day", days),
+    ):
+        rows = [
+            {"owner_id": owner_id, key: value, "count": n}
+            for value, n in (changes or {}).items()
+            if n
+        ]
+        # Bulk creates can touch many tags; stay well under bind limits
+        for start in range(0, len(rows), 1000):
+            statements.append(_increment(session, table, rows[start : start + 1000]))
+    return statements
+
+
+def _tag_changes(
+    session: AsyncSession, note_id: int, owner_id: int, tags: Counter
+) -> List[Any]:
+    """Statements adding and removing a note's tag rows per ``tags`` (tag: +1/-1)
+
+    Inserts skip rows that already exist, so the two can't conflict.
+    """
+    statements = []
+    removed = [tag for tag, n in tags.items() if n < 0]
+    if removed:
+        statements.append(
+            delete(note_tags).where(
+                and_(note_tags.c.note_id == note_id, note_tags.c.tag.in_(removed))
+            )
+        )
+    added = [
+        {"note_id": note_id, "owner_id": owner_id, "tag": tag}
+        for tag, n in tags.items()
+        if n > 0
+    ]
+    if added:
+        statements.append(
+            _dml(session).insert(note_tags).values(added).on_conflict_do_nothing()
+        )
+    return statements
+
+
+def _indexed_tags(tags: Optional[List[Any]]) -> Dict[str, int]:
+    """The tags of a stored note that have note_tags rows, each mapped to 1
+
+    Tags from before the 100 character limit were not backfilled into
+    note_tags, so they have no statistics to adjust either.
+    """
+    return dict.fromkeys(
+        (tag for tag in tags or () if isinstance(tag, str) and 1 <= len(tag) <= 100),
+        1,
+    )
+
+
+def _tag_filter(owner_id: int, tags: List[str], tag_mode: str):
+    """Semi-join against the note_tags index for any/all of ``tags``"""
+    unique_tags = list(dict.fromkeys(tags))
+    matching = select(note_tags.c.note_id).where(
+        and_(note_tags.c.owner_id == owner_id, note_tags.c.tag.in_(unique_tags))
+    )
+    if tag_mode == "all" and len(unique_tags) > 1:
+        matching = matching.group_by(note_tags.c.note_id).having(
+            sa.func.count() == len(unique_tags)
+        )
+    return notes.c.id.in_(matching)
+
+
+async def post(
+    session: AsyncSession, payload: NoteSchema, owner_id: int
+) -> Dict[str, Any]:
+    """Create a new note and return the stored row, including its version"""
+    version = await _bump_notes_version(session, owner_id)
     query = (
         insert(notes)
         .values(
@@ -62,20 +297,176 @@ async def post(session: AsyncSession, payload: NoteSchema, owner_id: int) -> int
             tags=payload.tags,
             owner_id=owner_id,
             is_deleted=False,
+            version=version,
         )
-        .returning(notes.c.id)
+        .returning(*versioned_note_columns)
     )
     result = await session.execute(query)
+    note = dict(result.mappings().one())
+    tags = Counter(dict.fromkeys(payload.tags, 1))
+    await _execute_all(
+        session,
+        [
+            *_tag_changes(session, note["id"], owner_id, tags),
+            *_note_stats_changes(
+                session,
+                owner_id,
+                total=1,
+                completed=int(payload.completed),
+                tags=tags,
+                days=Counter({note["created_date"].date(): 1}),
+            ),
+        ],
+    )
     await session.commit()
-    return result.scalar()
+    mark_write(owner_id)
+    return note
+
+
+async def post_many(
+    session: AsyncSession,
+    payloads: List[NoteSchema],
+    owner_id: int,
+    chunk_size: int = 1000,
+) -> List[int]:
+    """Create many notes in one transaction and return their IDs in order
+
+    Rows are sent as batched multi-row INSERTs of ``chunk_size`` notes, with
+    their tags inserted the same way.
+    """
+    ids: List[int] = []
+    # SQLAlchemy can only keep RETURNING in parameter order on SQLite by
+    # inserting row by row. SQLite is a single writer and hands out rowids
+    # consecutively within a multi-row INSERT, so sorting restores the order.
+    ordered = _dialect(session) != "sqlite"
+    version = await _bump_notes_version(session, owner_id)
+    query = insert(notes).returning(
+        notes.c.id, notes.c.created_date, sort_by_parameter_order=ordered
+    )
+    days: Counter = Counter()
+    for start in range(0, len(payloads), chunk_size):
+        chunk = payloads[start : start + chunk_size]
+        result = await session.execute(
+            query,
+            [
+                {
+                    "title": payload.title,
+                    "description": payload.description,
+                    "completed": payload.completed,
+                    "tags": payload.tags,
+                    "owner_id": owner_id,
+                    "is_deleted": False,
+                    "version": version,
+                }
+                for payload in chunk
+            ],
+        )
+        rows = result.all()
+        if not ordered:
+            rows.sort()
+        chunk_ids = [note_id for note_id, _ in rows]
+        days.update(created_date.date() for _, created_date in rows)
+        tag_rows = [
+            {"note_id": note_id, "owner_id": owner_id, "tag": tag}
+            for note_id, payload in zip(chunk_ids, chunk)
+            for tag in dict.fromkeys(payload.tags)
+        ]
+        if tag_rows:
+            await session.execute(insert(note_tags), tag_rows)
+        ids.extend(chunk_ids)
+    await _execute_all(
+        session,
+        _note_stats_changes(
+            session,
+            owner_id,
+            total=len(payloads),
+            completed=sum(payload.completed for payload in payloads),
+            tags=Counter(
+                tag for payload in payloads for tag in dict.fromkeys(payload.tags)
+            ),
+            days=days,
+        ),
+    )
+    await session.commit()
+    mark_write(owner_id)
+    return ids
 
 
 async def get(session: AsyncSession, id: int) -> Optional[Dict[str, Any]]:
-    """Retrieve a single note by ID"""
-    query = select(notes).where(and_(notes.c.id == id, notes.c.is_deleted.is_(False)))
+    """Retrieve a single note by ID, including its version
+
+    Read through ``note_cache``; callers get their own copy of the row.
+    With ``note_cache_validate`` a hit is served only while its version
+    matches the database, since another worker may have written the note.
+    """
+    key = str(id)
+    note = await note_cache.get(key)
+    if note is not None:
+        if not settings.note_cache_validate:
+            return note
+        result = await session.execute(
+            select(notes.c.version).where(and_(notes.c.id == id, note_is_live))
+        )
+        if result.scalar() == note["version"]:
+            return note
+        await note_cache.invalidate([key])
+
+    query = select(*versioned_note_columns).where(
+        and_(notes.c.id == id, note_is_live)
+    )
     result = await session.execute(query)
     row = result.mappings().first()
-    return dict(row) if row else None
+    if row is None:
+        return None
+    note = dict(row)
+    await note_cache.set(key, note)
+    return note
+
+
+def _notes_query(
+    dialect: str,
+    owner_id: int,
+    search: Optional[str] = None,
+    completed: Optional[bool] = None,
+    tags: Optional[List[str]] = None,
+    tag_mode: str = "all",
+    highlight: bool = False,
+):
+    """Build the filtered listing query for an owner's notes
+
+    Returns the query with its ORDER BY applied plus the stripped search
+    term, which callers need to decide between keyset and offset paging.
+    """
+    search = search.strip() if search else None
+
+    query = select(*note_columns).where(
+        and_(notes.c.owner_id == owner_id, note_is_live)
+    )
+
+    # Apply filters
+    filters = []
+
+    if completed is not None:
+        filters.append(notes.c.completed == completed)
+
+    if tags:
+        filters.append(_tag_filter(owner_id, tags, tag_mode))
+
+    # Combine filters with AND operator
+    if filters:
+        query = query.where(and_(*filters))
+
+    # Ordering (id breaks ties between equal timestamps)
+    order_by = [notes.c.created_date.desc(), notes.c.id.desc()]
+
+    if search:
+        plan = apply_search(query, dialect, search, highlight)
+        query = plan.query
+        order_by.insert(0, plan.rank)
+        if plan.snippet is not None:
+            query = query.add_columns(plan.snippet.label("snippet"))
+
+    return query.order_by(*order_by), search
 
 
 async def get_notes(
@@ -85,76 +476,376 @@ async def get_notes(
     limit: int = 10,
     search: Optional[str] = None,
     completed: Optional[bool] = None,
-    tag: Optional[str] = None,
+    tags: Optional[List[str]] = None,
+    tag_mode: str = "all",
+    after: Optional[Tuple[datetime, int]] = None,
+    highlight: bool = False,
 ) -> List[Dict[str, Any]]:
-    """Retrieve notes for a specific owner with optional filtering and pagination"""
+    """Retrieve notes for a specific owner with optional filtering and pagination
+
+    When ``after`` is given as a ``(created_date, id)`` keyset position, rows
+    are returned strictly after it and ``skip`` is ignored, so every page is
+    served by a single range scan of the owner's listing index.
+
+    ``tags`` matches notes carrying all of the given tags, or any of them when
+    ``tag_mode`` is ``"any"``, through the indexed ``note_tags`` table.
+
+    ``search`` uses the backend's full-text index and orders results by
+    relevance, so it pages with ``skip`` only. With ``highlight`` each row
+    carries a ``snippet`` with the matched terms wrapped in ``<mark>`` tags.
+    """
     # Enforce maximum limit to prevent abuse
     limit = min(limit, 100)
 
-    query = select(notes).where(
-        and_(notes.c.owner_id == owner_id, notes.c.is_deleted.is_(False))
+    query, search = _notes_query(
+        _dialect(session),
+        owner_id,
+        search=search,
+        completed=completed,
+        tags=tags,
+        tag_mode=tag_mode,
+        highlight=highlight,
     )
 
-    # Apply filters
-    filters = []
+    # Apply pagination
+    if after is not None and not search:
+        query = query.where(sa.tuple_(notes.c.created_date, notes.c.id) < after)
+    else:
+        query = query.offset(skip)
+    query = query.limit(limit)
 
-    if completed is not None:
-        filters.append(notes.c.completed == completed)
+    result = await session.execute(query)
+    return [dict(row) for row in result.mappings().all()]
 
-    if tag:
-        # Since we switched to JSON, we use a simple check
-        search_tag = f'%"{tag}"%'
-        filters.append(sa.cast(notes.c.tags, sa.String).ilike(search_tag))
 
-    if search:
-        search_pattern = f"%{search}%"
-        filters.append(
-            or_(
-                notes.c.title.ilike(search_pattern),
-                notes.c.description.ilike(search_pattern),
+async def count_notes(
+    session: AsyncSession,
+    owner_id: int,
+    search: Optional[str] = None,
+    completed: Optional[bool] = None,
+    tags: Optional[List[str]] = None,
+    tag_mode: str = "all",
+    limit: int = 1000,
+) -> Tuple[int, bool]:
+    """Count an owner's notes matching the filters of :func:`get_notes`
+
+    Returns ``(count, exact)``. Without ``search`` or ``tags`` the count is
+    read from the owner's ``note_counts`` row. Otherwise matches are counted
+    up to ``limit``; past it the count is ``limit`` and ``exact`` is False.
+    """
+    search = search.strip() if search else None
+    if not search and not tags:
+        if completed is None:
+            column = note_counts.c.total
+        elif completed:
+            column = note_counts.c.completed
+        else:
+            column = note_counts.c.total - note_counts.c.completed
+        result = await session.execute(
+            select(column).where(note_counts.c.owner_id == owner_id)
+        )
+        return result.scalar_one_or_none() or 0, True
+
+    query, _ = _notes_query(
+        _dialect(session),
+        owner_id,
+        search=search,
+        completed=completed,
+        tags=tags,
+        tag_mode=tag_mode,
+    )
+    matching = (
+        query.with_only_columns(notes.c.id).order_by(None).limit(limit + 1).subquery()
+    )
+    result = await session.execute(select(sa.func.count()).select_from(matching))
+    count = result.scalar_one()
+    return min(count, limit), count <= limit
+
+
+async def get_note_stats(
+    session: AsyncSession, owner_id: int, since: date
+) -> Dict[str, Any]:
+    """Return the owner's note statistics from the aggregate tables
+
+    ``created_per_day`` lists live notes per creation day from ``since`` on,
+    oldest first. Only the owner's counter rows are read, so the cost does
+    not grow with the number of notes.
+    """
+    result = await session.execute(
+        select(note_counts.c.total, note_counts.c.completed, note_counts.c.deleted)
+        .where(note_counts.c.owner_id == owner_id)
+    )
+    counts = result.mappings().first()
+    result = await session.execute(
+        select(note_tag_counts.c.tag, note_tag_counts.c["count"])
+        .where(
+            and_(note_tag_counts.c.owner_id == owner_id, note_tag_counts.c["count"] > 0)
+        )
+        .order_by(note_tag_counts.c["count"].desc(), note_tag_counts.c.tag)
+    )
+    tags = {tag: count for tag, count in result.all()}
+    result = await session.execute(
+        select(note_day_counts.c.day, note_day_counts.c["count"])
+        .where(
+            and_(
+                note_day_counts.c.owner_id == owner_id,
+                note_day_counts.c.day >= since,
+                note_day_counts.c["count"] > 0,
             )
         )
+        .order_by(note_day_counts.c.day)
+    )
+    days = [dict(row) for row in result.mappings().all()]
+    return {
+        **(dict(counts) if counts else {"total": 0, "completed": 0, "deleted": 0}),
+        "tags": tags,
+        "created_per_day": days,
+    }
 
-    # Combine filters with AND operator
-    if filters:
-        query = query.where(and_(*filters))
 
-    # Apply pagination and ordering
-    query = query.order_by(notes.c.created_date.desc()).offset(skip).limit(limit)
+async def rebuild_note_stats(session: AsyncSession, owner_id: int) -> None:
+    """Recompute the owner's note statistics from their notes and commit
 
-    result = await session.execute(query)
-    return [dict(row) for row in result.mappings().all()]
+    Repairs counters that drifted, e.g. after notes were changed outside the
+    crud functions. Bumping the notes version first serializes the rebuild
+    with the owner's writes.
+    """
+    await _bump_notes_version(session, owner_id)
+    for table in (note_counts, note_tag_counts, note_day_counts):
+        await session.execute(delete(table).where(table.c.owner_id == owner_id))
 
+    def count(*conditions):
+        return (
+            select(sa.func.count())
+            .where(and_(notes.c.owner_id == owner_id, *conditions))
+            .scalar_subquery()
+        )
 
-async def put(session: AsyncSession, id: int, payload: NoteSchema) -> Optional[int]:
-    """Update a note and return its ID if successful"""
+    await session.execute(
+        insert(note_counts).values(
+            owner_id=owner_id,
+            total=count(note_is_live),
+            completed=count(note_is_live, notes.c.completed),
+            deleted=count(note_is_deleted),
+        )
+    )
+    live = and_(notes.c.owner_id == owner_id, note_is_live)
+    await session.execute(
+        insert(note_tag_counts).from_select(
+            ["owner_id", "tag", "count"],
+            select(note_tags.c.owner_id, note_tags.c.tag, sa.func.count())
+            .join(notes, notes.c.id == note_tags.c.note_id)
+            .where(and_(note_tags.c.owner_id == owner_id, live))
+            .group_by(note_tags.c.owner_id, note_tags.c.tag),
+        )
+    )
+    day = sa.func.date(notes.c.created_date)
+    await session.execute(
+        insert(note_day_counts).from_select(
+            ["owner_id", "day", "count"],
+            select(notes.c.owner_id, day, sa.func.count())
+            .where(live)
+            .group_by(notes.c.owner_id, day),
+        )
+    )
+    await session.commit()
+
+
+async def stream_notes(
+    session: AsyncSession,
+    owner_id: int,
+    search: Optional[str] = None,
+    completed: Optional[bool] = None,
+    tags: Optional[List[str]] = None,
+    tag_mode: str = "all",
+    batch_size: int = 500,
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Yield all of an owner's matching notes in batches of ``batch_size``
+
+    Rows come from a server-side cursor, so memory use does not grow with
+    the number of notes. Filters behave as in :func:`get_notes`.
+    """
+    query, _ = _notes_query(
+        _dialect(session),
+        owner_id,
+        search=search,
+        completed=completed,
+        tags=tags,
+        tag_mode=tag_mode,
+    )
+    result = await session.stream(query.execution_options(yield_per=batch_size))
+    async for partition in result.mappings().partitions(batch_size):
+        yield [dict(row) for row in partition]
+
+
+async def put(
+    session: AsyncSession, id: int, payload: NoteSchema, owner_id: int
+) -> Optional[Dict[str, Any]]:
+    """Update an owner's note and return the updated row, or None if not found"""
+    version = await _bump_notes_version(session, owner_id)
+    target = and_(notes.c.id == id, notes.c.owner_id == owner_id, note_is_live)
+    # The previous flag and tags, for the statistics (writes to an owner's
+    # notes are serialized by the notes version bump above)
+    result = await session.execute(
+        select(notes.c.completed, notes.c.tags).where(target)
+    )
+    previous = result.first()
+    if previous is None:
+        await session.rollback()
+        return None
     query = (
         update(notes)
-        .where(and_(notes.c.id == id, notes.c.is_deleted.is_(False)))
+        .where(target)
         .values(
             title=payload.title,
             description=payload.description,
             completed=payload.completed,
             tags=payload.tags,
+            version=version,
         )
-        .returning(notes.c.id)
+        .returning(*versioned_note_columns)
     )
     result = await session.execute(query)
+    row = result.mappings().first()
+    if row is None:
+        await session.rollback()
+        return None
+    tags = Counter(dict.fromkeys(payload.tags, 1))
+    tags.subtract(_indexed_tags(previous.tags))
+    await _execute_all(
+        session,
+        [
+            *_tag_changes(session, id, owner_id, tags),
+            *_note_stats_changes(
+                session,
+                owner_id,
+                completed=int(payload.completed) - int(previous.completed),
+                tags=tags,
+            ),
+        ],
+    )
     await session.commit()
-    return result.scalar()
+    mark_write(owner_id)
+    await note_cache.invalidate([str(id)])
+    return dict(row)
 
 
-async def delete_note(session: AsyncSession, id: int) -> int:
-    """Soft delete a note and return the number of rows affected"""
-    query = update(notes).where(and_(notes.c.id == id, notes.c.is_deleted.is_(False))).values(is_deleted=True)
+async def delete_note(
+    session: AsyncSession, id: int, owner_id: int
+) -> Optional[Dict[str, Any]]:
+    """Soft delete an owner's note and return the deleted row, or None if not found"""
+    version = await _bump_notes_version(session, owner_id)
+    query = (
+        update(notes)
+        .where(
+            and_(
+                notes.c.id == id,
+                notes.c.owner_id == owner_id,
+                note_is_live,
+            )
+        )
+        .values(is_deleted=True, deleted_date=sa.func.now(), version=version)
+        .returning(*versioned_note_columns)
+    )
     result = await session.execute(query)
+    row = result.mappings().first()
+    if row is None:
+        await session.rollback()
+        return None
+    await _execute_all(
+        session,
+        _note_stats_changes(
+            session,
+            owner_id,
+            total=-1,
+            completed=-int(row["completed"]),
+            deleted=1,
+            tags=Counter({tag: -1 for tag in _indexed_tags(row["tags"])}),
+            days=Counter({row["created_date"].date(): -1}),
+        ),
+    )
     await session.commit()
-    return result.rowcount
+    mark_write(owner_id)
+    await note_cache.invalidate([str(id)])
+    return dict(row)
 
 
 async def delete_all(session: AsyncSession, owner_id: int) -> int:
     """Soft delete all notes for a specific owner and return the count"""
-    query = update(notes).where(notes.c.owner_id == owner_id).values(is_deleted=True)
+    version = await _bump_notes_version(session, owner_id)
+    query = (
+        update(notes)
+        .where(and_(notes.c.owner_id == owner_id, note_is_live))
+        .values(is_deleted=True, deleted_date=sa.func.now(), version=version)
+        .returning(notes.c.id, notes.c.completed, notes.c.tags, notes.c.created_date)
+    )
     result = await session.execute(query)
+    deleted = result.all()
+    deleted_ids = [row.id for row in deleted]
+    if deleted:
+        tags: Counter = Counter()
+        days: Counter = Counter()
+        for row in deleted:
+            tags.subtract(_indexed_tags(row.tags))
+            days[row.created_date.date()] -= 1
+        await _execute_all(
+            session,
+            _note_stats_changes(
+                session,
+                owner_id,
+                total=-len(deleted),
+                completed=-sum(row.completed for row in deleted),
+                deleted=len(deleted),
+                tags=tags,
+                days=days,
+            ),
+        )
+    await session.commit()
+    mark_write(owner_id)
+    await note_cache.invalidate([str(note_id) for note_id in deleted_ids])
+    return len(deleted_ids)
+
+
+async def purge_deleted_notes(
+    session: AsyncSession, retention: timedelta, batch_size: int = 500
+) -> int:
+    """Hard delete up to ``batch_size`` notes soft-deleted over ``retention`` ago
+
+    Returns how many were removed; callers repeat until it is below
+    ``batch_size``. Tag rows are deleted explicitly because SQLite does not
+    enforce the ON DELETE CASCADE by default.
+
+    Purgers in other workers may pick the same candidates: the DELETE checks
+    the expiry again and only the notes it actually removed are counted.
+    """
+    # The cutoff is computed by the database, on the clock and time zone that
+    # stamped deleted_date
+    if _dialect(session) == "sqlite":
+        cutoff = sa.func.datetime("now", f"-{int(retention.total_seconds())} seconds")
+    else:
+        cutoff = sa.func.now() - retention
+    expired = and_(note_is_deleted, notes.c.deleted_date < cutoff)
+    result = await session.execute(select(notes.c.id).where(expired).limit(batch_size))
+    candidates = list(result.scalars())
+    if not candidates:
+        await session.rollback()
+        return 0
+    result = await session.execute(
+        delete(notes)
+        .where(and_(notes.c.id.in_(candidates), expired))
+        .returning(notes.c.id, notes.c.owner_id)
+    )
+    rows = result.all()
+    if rows:
+        ids = [note_id for note_id, _ in rows]
+        await session.execute(delete(note_tags).where(note_tags.c.note_id.in_(ids)))
+        owners = Counter(owner_id for _, owner_id in rows)
+        # Owners of soft-deleted notes always have a counter row
+        await session.execute(
+            update(note_counts)
+            .where(note_counts.c.owner_id == sa.bindparam("owner"))
+            .values(deleted=note_counts.c.deleted - sa.bindparam("purged")),
+            [{"owner": owner, "purged": n} for owner, n in owners.items()],
+        )
     await session.commit()
-    return result.rowcount
+    return len(rows)
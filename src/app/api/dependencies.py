@@ -1,14 +1,13 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
+from jose import JWTError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api import crud
+from app import timing
+from app.api import crud, security
 from app.api.models import TokenData, UserDB
-from app.db import get_db
-from app.config import get_settings
+from app.db import current_user_id, get_db
 
-settings = get_settings()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/token")
 
 
@@ -20,22 +19,32 @@ async def get_current_user(
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(
-            token, settings.secret_key, algorithms=[settings.algorithm]
-        )
-        username: str = payload.get("sub")
-        if username is None:
+    # Reported as "auth" in the Server-Timing header
+    with timing.measure("auth"):
+        try:
+            payload = security.decode_access_token(token)
+            username: str = payload.get("sub")
+            if username is None:
+                raise credentials_exception
+            token_data = TokenData(username=username)
+        except JWTError:
             raise credentials_exception
-        token_data = TokenData(username=username)
-    except JWTError:
-        raise credentials_exception
 
-    user = await crud.get_user_by_username(session, username=token_data.username)
-    if user is None:
-        raise credentials_exception
-
-    return UserDB(**user)
+        # Served from the in-process cache when possible, so the common case
+        # needs no database round trip; entries expire after
+        # user_cache_ttl_seconds
+        user = crud.user_cache.get(token_data.username)
+        if user is None:
+            row = await crud.get_user_by_username(
+                session, username=token_data.username
+            )
+            if row is None:
+                raise credentials_exception
+            user = UserDB(**row)
+            crud.user_cache.set(token_data.username, user)
+
+    current_user_id.set(user.id)
+    return user
 
 
 async def get_current_active_user(
@@ -0,0 +1,59 @@
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List
+
+EXPORT_FIELDS = [
+    "id",
+    "title",
+    "description",
+    "completed",
+    "tags",
+    "created_date",
+    "owner_id",
+]
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def _isoformat(value: Any) -> str:
+    return value.isoformat() if isinstance(value, datetime) else str(value)
+
+
+def _csv_value(value: Any) -> Any:
+    if isinstance(value, (bool, list)):
+        return json.dumps(value)
+    return _isoformat(value) if isinstance(value, datetime) else value
+
+
+def _ndjson_chunk(rows: List[Dict[str, Any]]) -> str:
+    return "".join(
+        json.dumps({field: row[field] for field in EXPORT_FIELDS}, default=_isoformat)
+        + "\n"
+        for row in rows
+    )
+
+
+def _csv_chunk(rows: List[Dict[str, Any]], header: bool) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        writer.writerow([_csv_value(row[field]) for field in EXPORT_FIELDS])
+    return buffer.getvalue()
+
+
+async def encode_export(
+    batches: AsyncIterator[List[Dict[str, Any]]], format: str
+) -> AsyncIterator[bytes]:
+    """Encode batches of note rows as NDJSON or CSV, one chunk per batch"""
+    if format == "csv":
+        # The header goes out even when there are no notes
+        yield _csv_chunk([], header=True).encode()
+        async for rows in batches:
+            yield _csv_chunk(rows, header=False).encode()
+    else:
+        async for rows in batches:
+            yield _ndjson_chunk(rows).encode()
@@ -0,0 +1,21 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.metrics import registry
+
+router = APIRouter()
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@router.get(
+    "/metrics",
+    response_class=PlainTextResponse,
+    tags=["monitoring"],
+    summary="Prometheus metrics",
+)
+async def read_metrics():
+    """
+    Request, database and pool metrics in the Prometheus text format.
+    """
+    return PlainTextResponse(registry.render(), media_type=CONTENT_TYPE)
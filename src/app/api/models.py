@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field, ConfigDict, EmailStr, StringConstraints
-from datetime import datetime
-from typing import Annotated, Optional, List
+from datetime import date, datetime
+from typing import Annotated, Any, Dict, Optional, List
 
 
 class UserBase(BaseModel):
@@ -41,7 +41,9 @@ class NoteBase(BaseModel):
         StringConstraints(strip_whitespace=True, min_length=3, max_length=1000),
     ] = Field(..., description="Note description")
     completed: bool = Field(default=False, description="Completion status")
-    tags: List[str] = Field(default_factory=list, description="List of note tags")
+    tags: List[Annotated[str, StringConstraints(min_length=1, max_length=100)]] = (
+        Field(default_factory=list, description="List of note tags")
+    )
 
 
 class NoteSchema(NoteBase):
@@ -74,6 +76,52 @@ class NoteDB(NoteBase):
     )
 
 
+class NoteListItem(NoteDB):
+    """Note returned from a listing, optionally with a search highlight"""
+
+    snippet: Optional[str] = Field(
+        default=None,
+        description="Matched text with search terms wrapped in <mark> tags",
+    )
+
+
+class BulkItemError(BaseModel):
+    """Validation errors for one item of a bulk request"""
+
+    index: int = Field(..., description="Zero-based position of the item")
+    detail: List[Dict[str, Any]] = Field(..., description="Validation errors")
+
+
+class BulkCreateResult(BaseModel):
+    """Outcome of a bulk note creation"""
+
+    created_ids: List[int] = Field(
+        ..., description="IDs of the created notes, in request order"
+    )
+    errors: List[BulkItemError] = Field(
+        default_factory=list, description="Items that were rejected"
+    )
+
+
+class NoteDayCount(BaseModel):
+    day: date = Field(..., description="Creation day")
+    count: int = Field(..., description="Live notes created that day")
+
+
+class NoteStats(BaseModel):
+    """Aggregate counts of the current user's notes"""
+
+    total: int = Field(..., description="Notes that are not deleted")
+    completed: int = Field(..., description="Completed notes that are not deleted")
+    deleted: int = Field(..., description="Soft-deleted notes not yet purged")
+    tags: Dict[str, int] = Field(
+        ..., description="Live notes per tag, most used first"
+    )
+    created_per_day: List[NoteDayCount] = Field(
+        ..., description="Live notes per creation day, oldest first"
+    )
+
+
 class ErrorResponse(BaseModel):
     """Standard error response schema"""
 
@@ -1,12 +1,54 @@
+import json
+
 from app.api import crud
-from app.api.models import NoteDB, NoteSchema, ErrorResponse, UserDB
+from app.api.conditional import (
+    etag_matches,
+    list_etag,
+    not_modified,
+    note_etag,
+    validator_headers,
+)
+from app.api.export import MEDIA_TYPES, encode_export
+from app.api.serializers import dump_note, dump_notes
+from app.api.pagination import InvalidCursor, decode_cursor, encode_cursor
+from app.api.models import (
+    BulkCreateResult,
+    BulkItemError,
+    NoteDB,
+    NoteListItem,
+    NoteSchema,
+    NoteStats,
+    ErrorResponse,
+    UserDB,
+)
 from app.api.dependencies import get_current_active_user
-from app.db import get_db
+from app.config import get_settings
+from app.db import get_db, get_read_db
+from pydantic import ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
-from fastapi import APIRouter, HTTPException, Path, Query, Depends
-from typing import List, Optional
+from fastapi import (
+    APIRouter,
+    Depends,
+    Header,
+    HTTPException,
+    Path,
+    Query,
+    Request,
+    Response,
+)
+from fastapi.responses import StreamingResponse
+from datetime import datetime, timedelta, timezone
+from typing import Any, List, Literal, Optional, Tuple
 
 router = APIRouter()
+settings = get_settings()
+
+
+def _json_response(content: bytes, status_code: int = 200, headers=None) -> Response:
+    """Wrap pre-serialized note JSON, bypassing response_model re-validation"""
+    return Response(
+        content, status_code=status_code, media_type="application/json", headers=headers
+    )
 
 
 @router.post(
@@ -22,14 +64,130 @@ async def create_note(
 ):
     """Create a new note"""
     try:
-        note_id = await crud.post(session, payload, owner_id=current_user.id)
-        response = await crud.get(session, note_id)
-        return response
+        note = await crud.post(session, payload, owner_id=current_user.id)
+        etag = note_etag(note["id"], note.pop("version", 0))
+        return _json_response(
+            dump_note(note), status_code=201, headers=validator_headers(etag)
+        )
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Failed to create note: {str(e)}")
 
 
-@router.get("/", response_model=List[NoteDB], responses={400: {"model": ErrorResponse}})
+async def _read_bulk_body(request: Request, limit: int) -> bytes:
+    """Read the request body, refusing it with 413 once it exceeds ``limit``"""
+    too_large = HTTPException(
+        status_code=413, detail=f"Body larger than {limit} bytes"
+    )
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > limit:
+        raise too_large
+    # Chunked bodies carry no length, so count while streaming
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > limit:
+            raise too_large
+    return bytes(body)
+
+
+def _parse_bulk_body(
+    body: bytes, ndjson: bool
+) -> Tuple[List[Tuple[int, Any]], List[BulkItemError]]:
+    """Split a JSON array or NDJSON body into (index, item) pairs and errors"""
+    if not ndjson:
+        try:
+            items = json.loads(body)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Body is not valid JSON")
+        if not isinstance(items, list):
+            raise HTTPException(status_code=400, detail="Body must be a JSON array")
+        return list(enumerate(items)), []
+
+    items, errors = [], []
+    lines = (line for line in body.splitlines() if line.strip())
+    for index, line in enumerate(lines):
+        try:
+            items.append((index, json.loads(line)))
+        except ValueError as e:
+            errors.append(
+                BulkItemError(
+                    index=index,
+                    detail=[{"type": "json_invalid", "loc": [], "msg": str(e)}],
+                )
+            )
+    return items, errors
+
+
+@router.post(
+    "/bulk",
+    response_model=BulkCreateResult,
+    status_code=201,
+    responses={400: {"model": ErrorResponse}, 413: {"model": ErrorResponse}},
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {
+                    "schema": {
+                        "type": "array",
+                        "items": {"$ref": "#/components/schemas/NoteSchema"},
+                    }
+                },
+                "application/x-ndjson": {"schema": {"type": "string"}},
+            },
+        }
+    },
+)
+async def create_notes_bulk(
+    request: Request,
+    session: AsyncSession = Depends(get_db),
+    current_user: UserDB = Depends(get_current_active_user),
+):
+    """
+    Create many notes at once from a JSON array or NDJSON body.
+
+    Every item is validated first; valid items are inserted in one
+    transaction and invalid ones are reported in `errors` by position.
+    """
+    content_type = request.headers.get("content-type", "")
+    ndjson = content_type.startswith(("application/x-ndjson", "application/jsonl"))
+    body = await _read_bulk_body(request, settings.bulk_max_bytes)
+    items, errors = _parse_bulk_body(body, ndjson)
+    if len(items) + len(errors) > settings.bulk_max_items:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {settings.bulk_max_items} notes per request",
+        )
+
+    payloads = []
+    for index, item in items:
+        try:
+            payloads.append(NoteSchema.model_validate(item))
+        except ValidationError as e:
+            detail = e.errors(
+                include_url=False, include_context=False, include_input=False
+            )
+            errors.append(BulkItemError(index=index, detail=detail))
+    errors.sort(key=lambda error: error.index)
+
+    try:
+        created_ids = await crud.post_many(
+            session,
+            payloads,
+            owner_id=current_user.id,
+            chunk_size=settings.bulk_insert_chunk_size,
+        )
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Failed to create notes: {str(e)}")
+    return BulkCreateResult(created_ids=created_ids, errors=errors)
+
+
+@router.get(
+    "/",
+    response_model=List[NoteListItem],
+    response_model_exclude_unset=True,
+    responses={304: {"description": "Not modified"}, 400: {"model": ErrorResponse}},
+)
 async def read_notes(
     skip: int = Query(0, ge=0, description="Number of items to skip"),
     limit: int = Query(
@@ -38,9 +196,21 @@ async def read_notes(
     search: Optional[str] = Query(
         None, max_length=100, description="Search term for title/description"
     ),
+    highlight: bool = Query(
+        False, description="Include a highlighted snippet with search results"
+    ),
     completed: Optional[bool] = Query(None, description="Filter by completion status"),
-    tag: Optional[str] = Query(None, description="Filter by tag"),
-    session: AsyncSession = Depends(get_db),
+    tag: Optional[List[str]] = Query(
+        None, description="Filter by tag, case-sensitive (repeat to filter by several)"
+    ),
+    tag_mode: Literal["all", "any"] = Query(
+        "all", description="Match notes with all or any of the given tags"
+    ),
+    cursor: Optional[str] = Query(
+        None, description="Opaque cursor from a previous page's X-Next-Cursor header"
+    ),
+    if_none_match: Optional[str] = Header(None),
+    session: AsyncSession = Depends(get_read_db),
     current_user: UserDB = Depends(get_current_active_user),
 ):
     """
@@ -48,42 +218,196 @@ async def read_notes(
 
     - **skip**: Number of items to skip (default: 0)
     - **limit**: Maximum items per page (default: 10, max: 100)
-    - **search**: Search in title and description fields
+    - **search**: Full-text search in title and description, best matches first
+    - **highlight**: With search, add a `snippet` with matches in `<mark>` tags
     - **completed**: Filter by completion status (true/false)
-    - **tag**: Filter notes that contain this specific tag
+    - **tag**: Filter notes that contain this tag; may be repeated
+    - **tag_mode**: `all` (default) requires every tag, `any` requires one
+    - **cursor**: Continue after a previous page (takes precedence over skip)
+
+    When a page is full, the `X-Next-Cursor` response header carries the
+    cursor for the next page. Search results are ranked by relevance and page
+    with `skip` only.
+
+    `X-Total-Count` carries the number of matching notes. With `search` or
+    `tag` it is capped, and `X-Total-Count-Exact: false` marks a capped count.
+
+    The `ETag` changes whenever any of the user's notes is written; sending
+    it back in `If-None-Match` returns `304 Not Modified` without running the
+    listing query.
     """
+    if cursor and search:
+        raise HTTPException(
+            status_code=400, detail="Cursor pagination is not supported with search"
+        )
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
     try:
-        return await crud.get_notes(
+        version = await crud.get_notes_version(session, current_user.id)
+        etag = list_etag(
+            current_user.id,
+            version,
+            skip,
+            limit,
+            search,
+            highlight,
+            completed,
+            tag,
+            tag_mode,
+            cursor,
+        )
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+
+        result = await crud.get_notes(
             session,
             owner_id=current_user.id,
             skip=skip,
             limit=limit,
             search=search,
             completed=completed,
-            tag=tag,
+            tags=tag,
+            tag_mode=tag_mode,
+            after=after,
+            highlight=highlight,
+        )
+        total, exact = await crud.count_notes(
+            session,
+            owner_id=current_user.id,
+            search=search,
+            completed=completed,
+            tags=tag,
+            tag_mode=tag_mode,
+            limit=settings.note_count_limit,
         )
     except Exception as e:
         raise HTTPException(
             status_code=400, detail=f"Failed to retrieve notes: {str(e)}"
         )
 
+    headers = validator_headers(etag)
+    headers["X-Total-Count"] = str(total)
+    if not exact:
+        headers["X-Total-Count-Exact"] = "false"
+    if len(result) == limit and not search:
+        last = result[-1]
+        headers["X-Next-Cursor"] = encode_cursor(last["created_date"], last["id"])
+    return _json_response(dump_notes(result), headers=headers)
+
+
+@router.get(
+    "/export",
+    response_class=StreamingResponse,
+    responses={
+        200: {
+            "content": {media_type: {} for media_type in MEDIA_TYPES.values()},
+            "description": "All matching notes",
+        }
+    },
+)
+async def export_notes(
+    format: Literal["ndjson", "csv"] = Query("ndjson", description="Export format"),
+    search: Optional[str] = Query(
+        None, max_length=100, description="Search term for title/description"
+    ),
+    completed: Optional[bool] = Query(None, description="Filter by completion status"),
+    tag: Optional[List[str]] = Query(
+        None, description="Filter by tag, case-sensitive (repeat to filter by several)"
+    ),
+    tag_mode: Literal["all", "any"] = Query(
+        "all", description="Match notes with all or any of the given tags"
+    ),
+    session: AsyncSession = Depends(get_db),
+    current_user: UserDB = Depends(get_current_active_user),
+):
+    """
+    Stream every note of the current user as NDJSON or CSV.
+
+    Accepts the same filters as `GET /notes/`. Rows are read from a
+    server-side cursor in batches, so memory use stays flat.
+    """
+    batches = crud.stream_notes(
+        session,
+        owner_id=current_user.id,
+        search=search,
+        completed=completed,
+        tags=tag,
+        tag_mode=tag_mode,
+        batch_size=settings.export_batch_size,
+    )
+    return StreamingResponse(
+        encode_export(batches, format),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="notes.{format}"'},
+    )
+
+
+@router.get(
+    "/stats",
+    response_model=NoteStats,
+    responses={304: {"description": "Not modified"}, 400: {"model": ErrorResponse}},
+)
+async def read_note_stats(
+    days: int = Query(
+        30, ge=1, le=366, description="Days of created_per_day, ending today (UTC)"
+    ),
+    if_none_match: Optional[str] = Header(None),
+    session: AsyncSession = Depends(get_read_db),
+    current_user: UserDB = Depends(get_current_active_user),
+):
+    """
+    Retrieve counts of the current user's notes for a dashboard.
+
+    Served from counters that every note write keeps up to date, so the cost
+    does not depend on how many notes the user has. Answers `If-None-Match`
+    like `GET /notes/`.
+    """
+    since = datetime.now(timezone.utc).date() - timedelta(days=days - 1)
+    try:
+        version = await crud.get_notes_version(session, current_user.id)
+        etag = list_etag(current_user.id, version, "stats", since)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+        stats = await crud.get_note_stats(session, current_user.id, since=since)
+    except Exception as e:
+        raise HTTPException(
+            status_code=400, detail=f"Failed to retrieve note statistics: {str(e)}"
+        )
+    body = NoteStats.model_validate(stats).model_dump_json().encode()
+    return _json_response(body, headers=validator_headers(etag))
+
 
 @router.get(
     "/{id}",
     response_model=NoteDB,
-    responses={404: {"model": ErrorResponse}, 422: {"description": "Invalid note ID"}},
+    responses={
+        304: {"description": "Not modified"},
+        404: {"model": ErrorResponse},
+        422: {"description": "Invalid note ID"},
+    },
 )
 async def read_note(
     id: int = Path(..., gt=0, description="Note ID"),
-    session: AsyncSession = Depends(get_db),
+    if_none_match: Optional[str] = Header(None),
+    session: AsyncSession = Depends(get_read_db),
     current_user: UserDB = Depends(get_current_active_user),
 ):
-    """Retrieve a specific note by ID"""
+    """
+    Retrieve a specific note by ID.
+
+    Answers `If-None-Match` with the current `ETag` by `304 Not Modified`.
+    """
     try:
         note = await crud.get(session, id)
         if not note or note["owner_id"] != current_user.id:
             raise HTTPException(status_code=404, detail=f"Note with id {id} not found")
-        return note
+        etag = note_etag(id, note.pop("version", 0))
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+        return _json_response(dump_note(note), headers=validator_headers(etag))
     except HTTPException:
         raise
     except Exception as e:
@@ -105,12 +429,11 @@ async def update_note(
 ):
     """Update an existing note"""
     try:
-        note = await crud.get(session, id)
-        if not note or note["owner_id"] != current_user.id:
+        note = await crud.put(session, id, payload, owner_id=current_user.id)
+        if not note:
             raise HTTPException(status_code=404, detail=f"Note with id {id} not found")
-        await crud.put(session, id, payload)
-        response = await crud.get(session, id)
-        return response
+        etag = note_etag(id, note.pop("version", 0))
+        return _json_response(dump_note(note), headers=validator_headers(etag))
     except HTTPException:
         raise
     except Exception as e:
@@ -129,11 +452,11 @@ async def delete_note(
 ):
     """Delete a note by ID"""
     try:
-        note = await crud.get(session, id)
-        if not note or note["owner_id"] != current_user.id:
+        note = await crud.delete_note(session, id, owner_id=current_user.id)
+        if not note:
             raise HTTPException(status_code=404, detail=f"Note with id {id} not found")
-        await crud.delete_note(session, id)
-        return note
+        note.pop("version", None)
+        return _json_response(dump_note(note))
     except HTTPException:
         raise
     except Exception as e:
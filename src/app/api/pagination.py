@@ -0,0 +1,26 @@
+import base64
+import json
+from datetime import datetime
+from typing import Tuple, Union
+
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor cannot be decoded"""
+
+
+def encode_cursor(created_date: Union[datetime, str], id: int) -> str:
+    """Encode a (created_date, id) keyset position as an opaque cursor"""
+    if isinstance(created_date, datetime):
+        created_date = created_date.isoformat()
+    raw = json.dumps({"d": created_date, "i": id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Decode an opaque cursor back into a (created_date, id) keyset position"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(data["d"]), int(data["i"])
+    except (ValueError, KeyError, TypeError) as e:
+        raise InvalidCursor("Invalid pagination cursor") from e
@@ -1,8 +1,12 @@
+from typing import Any, Dict
+
 from fastapi import APIRouter, Depends
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
-from app.db import get_db
+from app.db import get_read_db
+from app.health import get_health_checker
 
 router = APIRouter()
 
@@ -14,13 +18,28 @@ class PingResponse(BaseModel):
     message: str
 
 
+class LivenessResponse(BaseModel):
+    """Liveness response schema"""
+
+    status: str
+
+
+class ReadinessResponse(BaseModel):
+    """Readiness response schema"""
+
+    status: str
+    database: Dict[str, Any]
+    pool: Dict[str, int]
+    replicas: Dict[str, int]
+
+
 @router.get(
     "/ping",
     response_model=PingResponse,
     tags=["health"],
     summary="Health check endpoint",
 )
-async def pong(session: AsyncSession = Depends(get_db)):
+async def pong(session: AsyncSession = Depends(get_read_db)):
     """
     Health check endpoint to verify API and database connectivity.
 
@@ -40,3 +59,38 @@ async def pong(session: AsyncSession = Depends(get_db)):
         )
 
     return PingResponse(status="healthy", message="API and database are operational")
+
+
+@router.get(
+    "/healthz",
+    response_model=LivenessResponse,
+    tags=["health"],
+    summary="Liveness probe",
+)
+async def healthz():
+    """
+    Liveness probe: answers as long as the event loop is serving requests.
+
+    Never touches the database, so a saturated pool can't get the process
+    restarted.
+    """
+    return LivenessResponse(status="alive")
+
+
+@router.get(
+    "/readyz",
+    response_model=ReadinessResponse,
+    tags=["health"],
+    summary="Readiness probe",
+    responses={503: {"model": ReadinessResponse}},
+)
+async def readyz():
+    """
+    Readiness probe served from the background database check.
+
+    Returns 503 when the last check failed, timed out waiting for a pooled
+    connection, or is stale. Reports check latency and pool headroom.
+    """
+    report = get_health_checker().report()
+    status_code = 200 if report["status"] == "ready" else 503
+    return JSONResponse(report, status_code=status_code)
@@ -0,0 +1,73 @@
+from typing import NamedTuple, Optional
+
+import sqlalchemy as sa
+from sqlalchemy.sql import ColumnElement, Select
+
+from app.db import notes, notes_fts, search_vector
+
+HIGHLIGHT_START = "<mark>"
+HIGHLIGHT_STOP = "</mark>"
+
+
+class SearchPlan(NamedTuple):
+    """Dialect specific pieces of a full-text search query"""
+
+    query: Select
+    rank: ColumnElement
+    snippet: Optional[ColumnElement]
+
+
+def _fts5_query(term: str) -> str:
+    """Quote every token so user input can't inject FTS5 query syntax"""
+    tokens = term.split()
+    return " ".join('"' + token.replace('"', '""') + '"' for token in tokens)
+
+
+def apply_search(
+    query: Select, dialect: str, term: str, highlight: bool = False
+) -> SearchPlan:
+    """Restrict ``query`` to notes matching ``term`` using the backend's index
+
+    Postgres matches against the GIN-indexed ``search_vector`` column, SQLite
+    against the ``notes_fts`` FTS5 table. Any other backend falls back to a
+    case-insensitive substring scan. ``rank`` sorts best matches first.
+    """
+    if dialect == "postgresql":
+        tsquery = sa.func.websearch_to_tsquery("english", term)
+        query = query.where(search_vector.op("@@")(tsquery))
+        rank = sa.desc(sa.func.ts_rank_cd(search_vector, tsquery))
+        snippet = None
+        if highlight:
+            snippet = sa.func.ts_headline(
+                "english",
+                notes.c.title + ". " + notes.c.description,
+                tsquery,
+                f"StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_STOP}, "
+                "MaxFragments=2",
+            )
+        return SearchPlan(query, rank, snippet)
+
+    if dialect == "sqlite":
+        query = query.join(notes_fts, notes_fts.c.rowid == notes.c.id).where(
+            sa.literal_column("notes_fts").op("MATCH")(_fts5_query(term))
+        )
+        # bm25() is lower for better matches
+        rank = sa.asc(sa.func.bm25(sa.literal_column("notes_fts")))
+        snippet = None
+        if highlight:
+            snippet = sa.func.snippet(
+                sa.literal_column("notes_fts"),
+                -1,
+                HIGHLIGHT_START,
+                HIGHLIGHT_STOP,
+                "…",
+                16,
+            )
+        return SearchPlan(query, rank, snippet)
+
+    pattern = f"%{term}%"
+    query = query.where(
+        sa.or_(notes.c.title.ilike(pattern), notes.c.description.ilike(pattern))
+    )
+    snippet = notes.c.description if highlight else None
+    return SearchPlan(query, sa.desc(notes.c.created_date), snippet)
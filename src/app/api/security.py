@@ -1,20 +1,158 @@
+import asyncio
+import hashlib
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import Union
-from jose import jwt
-from passlib.context import CryptContext
+from functools import lru_cache
+from typing import Any, Callable, Dict, Optional, Union
+from jose import jwk, jwt
+from app import metrics
+from app.cache import TTLCache
 from app.config import get_settings
 
 settings = get_settings()
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Built once so encoding and verifying tokens skip parsing the secret
+signing_key = jwk.construct(settings.secret_key, settings.algorithm)
+
+# Verified token claims keyed by the token's SHA-256 digest
+token_cache = TTLCache(
+    maxsize=settings.token_cache_max_size, ttl=settings.token_cache_ttl_seconds
+)
+metrics.register_cache("token", token_cache)
+
+password_hash_duration = metrics.registry.histogram(
+    "password_hash_duration_seconds",
+    "Time to hash or verify a password, including queueing for the pool",
+)
+
+
+@lru_cache()
+def get_pwd_context():
+    """The bcrypt CryptContext, built on the first hash or verify
+
+    passlib is only needed by the auth endpoints, so workers don't load it
+    at startup.
+    """
+    from passlib.context import CryptContext
+
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+class PasswordHashingBusy(RuntimeError):
+    """Raised when the password hashing pool has no queue capacity left"""
+
+
+class PasswordHashPool:
+    """Size-limited thread pool that keeps bcrypt off the event loop
+
+    bcrypt releases the GIL, so hashes run in parallel with request handling.
+    At most ``workers`` hashes run at once and ``max_queue`` more may wait;
+    anything beyond that is rejected with :class:`PasswordHashingBusy`.
+    """
+
+    def __init__(self, workers: int, max_queue: int):
+        self.workers = max(1, workers)
+        self.max_queue = max(0, max_queue)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.in_flight = 0
+        self.rejected = 0
+        self.completed = 0
+        self.latency_seconds_total = 0.0
+        self.latency_seconds_max = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        return max(0, self.in_flight - self.workers)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="password-hash"
+            )
+        return self._executor
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        if self.in_flight >= self.workers + self.max_queue:
+            self.rejected += 1
+            raise PasswordHashingBusy("Password hashing queue is full")
+
+        self.in_flight += 1
+        start = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), fn, *args)
+        finally:
+            self.in_flight -= 1
+            elapsed = time.perf_counter() - start
+            self.completed += 1
+            self.latency_seconds_total += elapsed
+            self.latency_seconds_max = max(self.latency_seconds_max, elapsed)
+            password_hash_duration.observe(elapsed)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "rejected": self.rejected,
+            "completed": self.completed,
+            "latency_seconds_total": self.latency_seconds_total,
+            "latency_seconds_max": self.latency_seconds_max,
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+hash_pool = PasswordHashPool(
+    workers=settings.password_hash_workers,
+    max_queue=settings.password_hash_max_queue,
+)
+
+
+def _collect_hash_pool():
+    yield (
+        "password_hash_in_flight",
+        "gauge",
+        "Password hashes running or queued",
+        [({}, hash_pool.in_flight)],
+    )
+    yield (
+        "password_hash_queue_depth",
+        "gauge",
+        "Password hashes waiting for a pool thread",
+        [({}, hash_pool.queue_depth)],
+    )
+    yield (
+        "password_hash_rejected_total",
+        "counter",
+        "Password hashes rejected because the queue was full",
+        [({}, hash_pool.rejected)],
+    )
+
+
+metrics.registry.register_collector(_collect_hash_pool)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password on the hashing pool; raises PasswordHashingBusy"""
+    return await hash_pool.run(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """get_password_hash on the hashing pool; raises PasswordHashingBusy"""
+    return await hash_pool.run(get_password_hash, password)
 
 
 def create_access_token(
@@ -28,7 +166,23 @@ def create_access_token(
             minutes=settings.access_token_expire_minutes
         )
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(
-        to_encode, settings.secret_key, algorithm=settings.algorithm
-    )
+    encoded_jwt = jwt.encode(to_encode, signing_key, algorithm=settings.algorithm)
     return encoded_jwt
+
+
+def decode_access_token(token: str) -> Dict[str, Any]:
+    """Verify ``token`` and return its claims; raises JWTError if invalid
+
+    Verified claims are cached until the token's ``exp`` (or
+    token_cache_ttl_seconds, if sooner), so repeat requests with the same
+    token skip signature verification and claim parsing. The returned dict
+    is shared and must not be modified.
+    """
+    digest = hashlib.sha256(token.encode()).digest()
+    claims = token_cache.get(digest)
+    if claims is None:
+        claims = jwt.decode(token, signing_key, algorithms=[settings.algorithm])
+        expires = claims.get("exp")
+        ttl = expires - time.time() if isinstance(expires, (int, float)) else None
+        token_cache.set(digest, claims, ttl=ttl)
+    return claims
@@ -0,0 +1,81 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from pydantic import TypeAdapter
+from typing_extensions import NotRequired, TypedDict
+
+from app import timing
+from app.api.models import NoteListItem
+
+
+class NoteRow(TypedDict):
+    """Shape of a note row as rendered by NoteDB/NoteListItem
+
+    Keys must stay in the models' field order, which is the order the JSON
+    is written in.
+    """
+
+    title: str
+    description: str
+    completed: bool
+    tags: List[str]
+    id: int
+    created_date: datetime
+    is_deleted: bool
+    owner_id: int
+    snippet: NotRequired[Optional[str]]
+
+
+class CachedNoteRow(NoteRow):
+    """A note row plus the version its ETag is built from"""
+
+    version: int
+
+
+NOTE_FIELDS = tuple(NoteListItem.model_fields)
+
+_note_adapter = TypeAdapter(NoteRow)
+_note_list_adapter = TypeAdapter(List[NoteRow])
+_cached_note_adapter = TypeAdapter(CachedNoteRow)
+
+
+def _in_field_order(row: Dict[str, Any]) -> bool:
+    return tuple(row) == NOTE_FIELDS[: len(row)]
+
+
+def _ordered(row: Dict[str, Any]) -> Dict[str, Any]:
+    return {field: row[field] for field in NOTE_FIELDS if field in row}
+
+
+def dump_note(row: Dict[str, Any]) -> bytes:
+    """Serialize one note row to the same JSON bytes as ``response_model=NoteDB``
+
+    Rows read from the database were validated on the way in, so they are
+    written out directly without building and re-validating models. crud
+    selects columns in field order; other rows are reordered first.
+    """
+    with timing.measure("serialize"):
+        if not _in_field_order(row):
+            row = _ordered(row)
+        return _note_adapter.dump_json(row, warnings=False)
+
+
+def dump_notes(rows: List[Dict[str, Any]]) -> bytes:
+    """Serialize note rows like ``response_model=List[NoteListItem]``
+
+    Rows of one query share their key order, so only the first is checked.
+    """
+    with timing.measure("serialize"):
+        if rows and not _in_field_order(rows[0]):
+            rows = [_ordered(row) for row in rows]
+        return _note_list_adapter.dump_json(rows, warnings=False)
+
+
+def dump_cached_note(row: Dict[str, Any]) -> bytes:
+    """Encode a versioned note row for an external cache"""
+    return _cached_note_adapter.dump_json(row, warnings=False)
+
+
+def load_cached_note(data: bytes) -> Dict[str, Any]:
+    """Decode ``dump_cached_note`` output back into a row with datetimes"""
+    return _cached_note_adapter.validate_json(data)
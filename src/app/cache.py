@@ -0,0 +1,278 @@
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Protocol
+
+
+class TTLCache:
+    """Bounded in-process LRU cache whose entries expire after ``ttl`` seconds
+
+    Operations never await, so a cache shared by coroutines on one event loop
+    needs no locking. A ``ttl`` or ``maxsize`` of 0 disables caching.
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0 and self.ttl > 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key)
+        if entry is not None:
+            value, expires_at = entry
+            if expires_at > self._clock():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._data[key]
+        self.misses += 1
+        return default
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        if not self.enabled:
+            return
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+        self._data[key] = (value, self._clock() + ttl)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class CacheBackend(Protocol):
+    """Async storage behind a ``ReadThroughCache``
+
+    ``invalidate`` leaves a tombstone for ``ttl`` seconds: the keys read as
+    missing, and ``add`` only stores a value under a key holding neither a
+    value nor a tombstone.
+    """
+
+    async def get(self, key: str) -> Optional[Any]: ...
+
+    async def add(self, key: str, value: Any, ttl: float) -> None: ...
+
+    async def invalidate(self, keys: Iterable[str], ttl: float) -> None: ...
+
+
+_TOMBSTONE = object()
+
+
+class MemoryBackend:
+    """In-process backend on a ``TTLCache``; returns copies of stored dicts"""
+
+    def __init__(
+        self, maxsize: int, ttl: float, clock: Callable[[], float] = time.monotonic
+    ):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl, clock=clock)
+
+    async def get(self, key: str) -> Optional[Any]:
+        value = self._cache.get(key)
+        if value is None or value is _TOMBSTONE:
+            return None
+        return dict(value)
+
+    async def add(self, key: str, value: Any, ttl: float) -> None:
+        if self._cache.get(key) is None:
+            self._cache.set(key, dict(value), ttl=ttl)
+
+    async def invalidate(self, keys: Iterable[str], ttl: float) -> None:
+        for key in keys:
+            self._cache.set(key, _TOMBSTONE, ttl=ttl)
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+
+class KeyValueBackend:
+    """Backend on an external key-value store such as Redis
+
+    ``client`` needs async ``get(key)`` and ``set(key, value, ex=seconds,
+    nx=bool)``, and ``pipeline()`` batching ``set`` calls until ``execute()``,
+    as ``redis.asyncio.Redis`` provides. Values pass through ``dumps``/
+    ``loads`` to and from bytes; a tombstone is stored as an empty value.
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        dumps: Callable[[Any], bytes],
+        loads: Callable[[bytes], Any],
+        prefix: str = "",
+    ):
+        self.client = client
+        self.dumps = dumps
+        self.loads = loads
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs: Any) -> "KeyValueBackend":
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:  # pragma: no cover - optional dependency
+            raise RuntimeError(
+                "The redis package is required for a Redis cache backend"
+            ) from e
+        return cls(redis.Redis.from_url(url), **kwargs)
+
+    async def get(self, key: str) -> Optional[Any]:
+        raw = await self.client.get(self.prefix + key)
+        return self.loads(raw) if raw else None
+
+    async def add(self, key: str, value: Any, ttl: float) -> None:
+        await self.client.set(
+            self.prefix + key, self.dumps(value), ex=max(1, int(ttl)), nx=True
+        )
+
+    async def invalidate(self, keys: Iterable[str], ttl: float) -> None:
+        keys = list(keys)
+        if not keys:
+            return
+        async with self.client.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.set(self.prefix + key, b"", ex=max(1, int(ttl)))
+            await pipe.execute()
+
+
+class LocalKeyValueStore:
+    """In-memory stand-in for the Redis client used by ``KeyValueBackend``"""
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self._data: Dict[str, tuple] = {}
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= self._clock():
+            del self._data[key]
+            return None
+        return value
+
+    async def set(
+        self, key: str, value: bytes, ex: Optional[int] = None, nx: bool = False
+    ) -> Optional[bool]:
+        if nx and await self.get(key) is not None:
+            return None
+        expires_at = self._clock() + ex if ex is not None else None
+        self._data[key] = (value, expires_at)
+        return True
+
+    async def delete(self, *keys: str) -> int:
+        return sum(self._data.pop(key, None) is not None for key in keys)
+
+    def pipeline(self, transaction: bool = True) -> "_LocalPipeline":
+        return _LocalPipeline(self)
+
+
+class _LocalPipeline:
+    """Queues ``set`` calls on a ``LocalKeyValueStore`` until ``execute``"""
+
+    def __init__(self, store: LocalKeyValueStore):
+        self.store = store
+        self.calls: List[tuple] = []
+
+    async def __aenter__(self) -> "_LocalPipeline":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        self.calls.clear()
+
+    def set(self, key: str, value: bytes, **kwargs: Any) -> "_LocalPipeline":
+        self.calls.append((key, value, kwargs))
+        return self
+
+    async def execute(self) -> List[Any]:
+        calls, self.calls = self.calls, []
+        return [await self.store.set(k, v, **kw) for k, v, kw in calls]
+
+
+class ReadThroughCache:
+    """Counts hits and misses over a pluggable async backend
+
+    A value loaded while a write was being invalidated may already be stale,
+    and with a shared backend the write may have happened in another process.
+    ``invalidate`` therefore leaves a tombstone for ``tombstone_ttl`` seconds
+    and ``set`` never overwrites one, so a load racing the write can't put
+    the old value back; the key is cached again by the first load after.
+    """
+
+    def __init__(
+        self,
+        backend: Optional[CacheBackend],
+        ttl: float,
+        name: str = "",
+        tombstone_ttl: float = 5.0,
+    ):
+        self.backend = backend
+        self.ttl = ttl
+        self.name = name
+        self.tombstone_ttl = tombstone_ttl
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None and self.ttl > 0
+
+    async def get(self, key: str) -> Optional[Any]:
+        if not self.enabled:
+            return None
+        value = await self.backend.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, key: str, value: Any) -> None:
+        """Cache ``value`` unless ``key`` is cached or was just invalidated"""
+        if self.enabled:
+            await self.backend.add(key, value, self.ttl)
+
+    async def invalidate(self, keys: Iterable[str]) -> None:
+        if self.enabled:
+            await self.backend.invalidate(list(keys), self.tombstone_ttl)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        backend = self.backend
+        return {
+            "backend": type(backend).__name__ if backend is not None else None,
+            "size": len(backend) if hasattr(backend, "__len__") else None,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from functools import lru_cache
+from typing import Literal
 
 
 class Settings(BaseSettings):
@@ -10,11 +11,101 @@ class Settings(BaseSettings):
     allowed_origins: str = (
         "http://localhost,http://localhost:8080,http://localhost:5173"
     )
+    # Launcher (src/main.py): worker processes (0 = one per CPU), bind
+    # address, and seconds in-flight requests get to finish on shutdown or
+    # restart
+    web_concurrency: int = 0
+    host: str = "0.0.0.0"
+    port: int = 8000
+    shutdown_drain_seconds: int = 30
+    # Primary connections all workers together may open (0 = no cap); each
+    # worker's pool settings below are scaled down to its share
+    db_connection_budget: int = 0
     db_pool_size: int = 5
     db_max_overflow: int = 10
+    # Adaptive pool: the connection limit starts at pool_size + max_overflow
+    # and moves between db_pool_size and db_pool_max_connections based on
+    # checkout wait and statement latency, checked every adjust interval; the
+    # pool is rebuilt to hold the limit as persistent connections on each change
+    db_pool_adaptive: bool = True
+    db_pool_max_connections: int = 30
+    db_pool_adjust_interval_seconds: float = 5.0
+    db_pool_target_wait_ms: float = 5.0
+    db_pool_max_latency_ms: float = 100.0
+    # Connections opened at startup, pre-ping on checkout, and max connection
+    # age in seconds (-1 keeps connections forever)
+    db_pool_warm_connections: int = 5
+    db_pool_pre_ping: bool = False
+    db_pool_recycle_seconds: int = 1800
+    # Comma-separated read replica URLs for GET endpoints (empty: primary only).
+    # Replicas lagging more than replica_max_lag_seconds or failing are skipped
+    # (failures for replica_retry_seconds); users read from the primary for
+    # read_your_writes_seconds after writing their notes, in every worker
+    # (a signed cookie carries the write)
+    database_read_urls: str = ""
+    replica_max_lag_seconds: float = 5.0
+    replica_retry_seconds: float = 30.0
+    replica_check_interval_seconds: float = 5.0
+    read_your_writes_seconds: float = 5.0
     secret_key: str = "your-secret-key-for-jwt-change-this-in-production"
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
+    # Verified JWT claims cache; entries never outlive the token's exp
+    # (0 disables it)
+    token_cache_ttl_seconds: float = 300.0
+    token_cache_max_size: int = 10000
+    # POST /notes/bulk: rows per multi-row INSERT, items per request and body
+    # size in bytes (larger bodies are refused before they are read in full)
+    bulk_insert_chunk_size: int = 1000
+    bulk_max_items: int = 50000
+    bulk_max_bytes: int = 32 * 1024 * 1024
+    # GET /notes/ with search or tag filters counts at most this many matches
+    # for X-Total-Count; larger totals are reported as this limit
+    note_count_limit: int = 1000
+    # GET /notes/export: rows fetched from the server-side cursor per chunk
+    export_batch_size: int = 500
+    # bcrypt runs on a dedicated thread pool; requests beyond
+    # workers + queue get a 503 instead of piling up
+    password_hash_workers: int = 4
+    password_hash_max_queue: int = 32
+    # Authenticated user cache (0 disables it)
+    user_cache_ttl_seconds: float = 60.0
+    user_cache_max_size: int = 10000
+    # Read-through cache in front of single-note lookups: in-process LRU,
+    # Redis at note_cache_url (needs the redis package) or none
+    note_cache_backend: Literal["memory", "redis", "none"] = "memory"
+    note_cache_url: str = "redis://localhost:6379/0"
+    note_cache_ttl_seconds: float = 30.0
+    note_cache_max_size: int = 10000
+    # Check a memory-cached note's version against the database before
+    # serving it, so writes through other workers are never served stale (the
+    # launcher turns this on for several workers)
+    note_cache_validate: bool = False
+    # Soft-deleted notes are hard-deleted after note_retention_days (0 keeps
+    # them), checked every purge interval in throttled chunks
+    note_retention_days: float = 30.0
+    purge_interval_seconds: float = 3600.0
+    purge_batch_size: int = 500
+    purge_batch_pause_seconds: float = 0.5
+    # Background DB check behind /readyz: period and per-check timeout
+    health_check_interval_seconds: float = 5.0
+    health_check_timeout_seconds: float = 2.0
+    # Admission control: concurrent requests per route class (0 leaves the
+    # class unlimited); up to max_queue more wait, each for at most
+    # max_wait_ms, and the rest get a 503 with Retry-After
+    admission_control_enabled: bool = True
+    admission_auth_limit: int = 16
+    admission_read_limit: int = 64
+    admission_write_limit: int = 32
+    admission_max_queue: int = 100
+    admission_max_wait_ms: float = 1000.0
+    # Server-Timing header (auth/db/serialize/total) on every response
+    server_timing_enabled: bool = True
+    # Requests sending X-Profile-Token equal to this are run under the
+    # sampling profiler (empty disables it); folded stacks go to profile_dir
+    profile_token: str = ""
+    profile_dir: str = "profiles"
+    profile_interval_ms: float = 1.0
 
     model_config = SettingsConfigDict(
         env_file=".env", env_file_encoding="utf-8", extra="ignore"
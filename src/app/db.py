@@ -1,3 +1,8 @@
+import time
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Callable, Dict, Optional
+
 from sqlalchemy import (
     Column,
     Integer,
@@ -5,31 +10,205 @@ from sqlalchemy import (
     Table,
     MetaData,
     Boolean,
+    Date,
     DateTime,
     JSON,
     ForeignKey,
+    Index,
+    DDL,
+    event,
+    table,
+    literal_column,
+)
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import InterfaceError, OperationalError
+from sqlalchemy.ext.asyncio import (
+    create_async_engine,
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
 )
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from sqlalchemy.sql import func
+from sqlalchemy.util.queue import AsyncAdaptedQueue
 
+from app import metrics
+from app.cache import TTLCache
 from app.config import get_settings
+from app.pool import PoolManager
+from app.replicas import ReplicaSet
 
 settings = get_settings()
 
+
 # SQLAlchemy engine and metadata
-# Convert "postgresql://" to "postgresql+asyncpg://" if it isn't already
-db_url = settings.database_url
-if db_url.startswith("postgresql://"):
-    db_url = db_url.replace("postgresql://", "postgresql+asyncpg://", 1)
+def _async_url(url: str) -> str:
+    # Convert "postgresql://" to "postgresql+asyncpg://" if it isn't already
+    if url.startswith("postgresql://"):
+        return url.replace("postgresql://", "postgresql+asyncpg://", 1)
+    return url
+
+
+db_url = _async_url(settings.database_url)
+
+
+class _TimedQueue(AsyncAdaptedQueue):
+    """Idle-connection queue that reports how long each get waited"""
+
+    on_get: Callable[[float], None] = staticmethod(lambda seconds: None)
+
+    def get(self, block=True, timeout=None):
+        start = time.perf_counter()
+        try:
+            return super().get(block, timeout)
+        finally:
+            self.on_get(time.perf_counter() - start)
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long each checkout waits for a connection
+
+    Only the wait for an idle connection is timed, not opening a new one, so
+    a slow connect doesn't read as pool contention. Waits are labelled with
+    ``engine_name`` so the primary's pool manager can tell them from the
+    replicas'.
+    """
+
+    _queue_class = _TimedQueue
+    engine_name = "primary"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._draining = False
+        self._pool.on_get = self._record_wait
+
+    def _record_wait(self, seconds: float) -> None:
+        if not self._draining:
+            metrics.db_pool_checkout_wait.labels(self.engine_name).observe(seconds)
+
+    def dispose(self):
+        # Emptying the queue to close idle connections isn't a checkout
+        self._draining = True
+        try:
+            super().dispose()
+        finally:
+            self._draining = False
+
+    def recreate(
+        self, pool_size: Optional[int] = None, max_overflow: Optional[int] = None
+    ) -> "TimedQueuePool":
+        """A new, empty pool like this one, optionally with other limits
+
+        Like ``QueuePool.recreate`` (which ``Engine.dispose`` uses), the copy
+        keeps this pool's event listeners and dialect.
+        """
+        pool = self.__class__(
+            self._creator,
+            pool_size=self.size() if pool_size is None else pool_size,
+            max_overflow=self._max_overflow if max_overflow is None else max_overflow,
+            pre_ping=self._pre_ping,
+            use_lifo=self._pool.use_lifo,
+            timeout=self._timeout,
+            recycle=self._recycle,
+            echo=self.echo,
+            logging_name=self._orig_logging_name,
+            reset_on_return=self._reset_on_return,
+            _dispatch=self.dispatch,
+            dialect=self._dialect,
+        )
+        pool.engine_name = self.engine_name
+        return pool
+
+
+def _create_engine(url: str, name: str = "primary", **kwargs):
+    options = dict(
+        echo=False,
+        poolclass=TimedQueuePool,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_pre_ping=settings.db_pool_pre_ping,
+        pool_recycle=settings.db_pool_recycle_seconds,
+    )
+    options.update(kwargs)
+    engine = create_async_engine(url, **options)
+    engine.sync_engine.pool.engine_name = name
+    metrics.instrument_engine(engine, name=name)
+    return engine
+
+
+# Engines, the pool manager and replicas are built on first use (normally in
+# the app's lifespan) rather than at import, so importing the app, its models
+# or the migrations loads no database driver and opens no pool
+@lru_cache()
+def get_engine() -> AsyncEngine:
+    """The primary engine"""
+    return _create_engine(db_url)
+
+
+@lru_cache()
+def get_pool_manager() -> PoolManager:
+    """Adaptive sizing for the primary engine's pool"""
+    pool_manager = PoolManager(
+        get_engine(),
+        min_connections=settings.db_pool_size,
+        baseline=settings.db_pool_size + settings.db_max_overflow,
+        max_connections=settings.db_pool_max_connections,
+        target_wait=settings.db_pool_target_wait_ms / 1000,
+        max_latency=settings.db_pool_max_latency_ms / 1000,
+        interval=settings.db_pool_adjust_interval_seconds,
+    )
+    metrics.registry.register_collector(pool_manager.collect)
+    return pool_manager
+
+
+# Read replica URLs are known without building anything, so checks for
+# whether replicas are configured stay free
+read_urls = [
+    _async_url(url.strip())
+    for url in settings.database_read_urls.split(",")
+    if url.strip()
+]
+
+
+@lru_cache()
+def get_replicas() -> ReplicaSet:
+    """The read replicas (empty without database_read_urls)
+
+    Replica engines pre-ping, so a restarted replica's stale connections are
+    replaced instead of failing the first query.
+    """
+    read_engines = [
+        _create_engine(url, name=f"replica{index}", pool_pre_ping=True)
+        for index, url in enumerate(read_urls)
+    ]
+    return ReplicaSet(
+        read_engines,
+        max_lag=settings.replica_max_lag_seconds,
+        retry_after=settings.replica_retry_seconds,
+        check_interval=settings.replica_check_interval_seconds,
+        timeout=settings.health_check_timeout_seconds,
+    )
+
+
+async def dispose_engines() -> None:
+    """Close the pools of every engine built so far"""
+    if get_replicas.cache_info().currsize:
+        for replica in get_replicas().replicas:
+            await replica.engine.dispose()
+    if get_engine.cache_info().currsize:
+        await get_engine().dispose()
+
 
-engine = create_async_engine(
-    db_url,
-    echo=False,
-    pool_size=settings.db_pool_size,
-    max_overflow=settings.db_max_overflow,
-)
 metadata = MetaData()
 
+# SQLite stores server-side CURRENT_TIMESTAMP without microseconds; bind
+# datetimes in the same format so range comparisons (keyset cursors) agree
+Timestamp = DateTime().with_variant(
+    sqlite.DATETIME(truncate_microseconds=True), "sqlite"
+)
+
 # Users table for authentication
 users = Table(
     "users",
@@ -40,6 +219,9 @@ users = Table(
     Column("hashed_password", String(255), nullable=False),
     Column("is_active", Boolean, default=True, nullable=False),
     Column("created_date", DateTime, default=func.now(), nullable=False),
+    # Bumped by every write to the user's notes; stamped onto the written
+    # notes and used as the cheap validator for note list ETags
+    Column("notes_version", Integer, default=1, server_default="1", nullable=False),
 )
 
 # Notes table with proper constraints
@@ -49,17 +231,250 @@ notes = Table(
     Column("id", Integer, primary_key=True, autoincrement=True),
     Column("title", String(255), nullable=False),
     Column("description", String(1000), nullable=False),
-    Column("completed", Boolean, default=False, nullable=False, index=True),
-    Column("is_deleted", Boolean, default=False, nullable=False, index=True),
+    Column("completed", Boolean, default=False, nullable=False),
+    Column("is_deleted", Boolean, default=False, nullable=False),
     Column("tags", JSON, default=[], nullable=False),
-    Column("created_date", DateTime, default=func.now(), nullable=False, index=True),
+    Column("created_date", Timestamp, default=func.now(), nullable=False, index=True),
     Column("owner_id", Integer, ForeignKey("users.id"), nullable=False),
+    # users.notes_version at the note's last write, used for its ETag
+    Column("version", Integer, default=1, server_default="1", nullable=False),
+    # When the note was soft deleted; the purge job hard-deletes after that
+    Column("deleted_date", Timestamp, nullable=True),
 )
 
-# Async session maker
-async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+# Every read filters on this exact expression so the partial indexes below,
+# which only contain live notes, match it (SQLite requires the same term)
+note_is_live = sa.not_(notes.c.is_deleted)
+note_is_deleted = notes.c.is_deleted == sa.true()
+
+# Owner's note listing and keyset pagination, and the same with the
+# completed filter
+Index(
+    "ix_notes_owner_live",
+    notes.c.owner_id,
+    notes.c.created_date.desc(),
+    notes.c.id.desc(),
+    postgresql_where=note_is_live,
+    sqlite_where=note_is_live,
+)
+Index(
+    "ix_notes_owner_completed_live",
+    notes.c.owner_id,
+    notes.c.completed,
+    notes.c.created_date.desc(),
+    notes.c.id.desc(),
+    postgresql_where=note_is_live,
+    sqlite_where=note_is_live,
+)
+# Owner's soft-deleted notes, for rebuilding their statistics
+Index(
+    "ix_notes_owner_deleted",
+    notes.c.owner_id,
+    postgresql_where=note_is_deleted,
+    sqlite_where=note_is_deleted,
+)
+# Purge candidates: soft-deleted notes by deletion time
+Index(
+    "ix_notes_deleted_date",
+    notes.c.deleted_date,
+    postgresql_where=note_is_deleted,
+    sqlite_where=note_is_deleted,
+)
+
+# Normalized note tags; notes.tags stays the source of truth for responses
+note_tags = Table(
+    "note_tags",
+    metadata,
+    Column(
+        "note_id",
+        Integer,
+        ForeignKey("notes.id", ondelete="CASCADE"),
+        primary_key=True,
+    ),
+    Column("tag", String(100), primary_key=True),
+    Column("owner_id", Integer, ForeignKey("users.id"), nullable=False),
+    Index("ix_note_tags_owner_tag", "owner_id", "tag", "note_id"),
+)
+
+# Note statistics per owner, adjusted in the transaction of every note write
+# so listing totals and GET /notes/stats never aggregate the notes table.
+# Live, completed (and live) and soft-deleted note counts:
+note_counts = Table(
+    "note_counts",
+    metadata,
+    Column("owner_id", Integer, ForeignKey("users.id"), primary_key=True),
+    Column("total", Integer, default=0, server_default="0", nullable=False),
+    Column("completed", Integer, default=0, server_default="0", nullable=False),
+    Column("deleted", Integer, default=0, server_default="0", nullable=False),
+)
+# Live notes per tag
+note_tag_counts = Table(
+    "note_tag_counts",
+    metadata,
+    Column("owner_id", Integer, ForeignKey("users.id"), primary_key=True),
+    Column("tag", String(100), primary_key=True),
+    Column("count", Integer, default=0, server_default="0", nullable=False),
+)
+# Live notes per day of created_date
+note_day_counts = Table(
+    "note_day_counts",
+    metadata,
+    Column("owner_id", Integer, ForeignKey("users.id"), primary_key=True),
+    Column("day", Date, primary_key=True),
+    Column("count", Integer, default=0, server_default="0", nullable=False),
+)
+
+# Full-text search structures live outside the Table definition because they
+# are dialect specific: a generated, GIN-indexed tsvector column on Postgres
+# and an external-content FTS5 table kept in sync by triggers on SQLite.
+search_vector = literal_column("notes.search_vector", type_=postgresql.TSVECTOR)
+notes_fts = table("notes_fts", literal_column("rowid"))
+
+POSTGRES_SEARCH_DDL = [
+    """
+    ALTER TABLE notes ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(description, '')), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX ix_notes_search_vector ON notes USING gin (search_vector)",
+]
+
+SQLITE_SEARCH_DDL = [
+    """
+    CREATE VIRTUAL TABLE notes_fts USING fts5(
+        title, description, content='notes', content_rowid='id',
+        tokenize='porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER notes_fts_ai AFTER INSERT ON notes BEGIN
+        INSERT INTO notes_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER notes_fts_ad AFTER DELETE ON notes BEGIN
+        INSERT INTO notes_fts(notes_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER notes_fts_au AFTER UPDATE OF title, description ON notes BEGIN
+        INSERT INTO notes_fts(notes_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO notes_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+]
+
+for statement in POSTGRES_SEARCH_DDL:
+    event.listen(notes, "after_create", DDL(statement).execute_if(dialect="postgresql"))
+for statement in SQLITE_SEARCH_DDL:
+    event.listen(notes, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+event.listen(
+    notes, "before_drop", DDL("DROP TABLE IF EXISTS notes_fts").execute_if(dialect="sqlite")
+)
+
+# Users who wrote notes within read_your_writes_seconds read from the primary.
+# This only covers writes made in this process; ReadYourWritesMiddleware
+# carries them to other workers in a signed cookie.
+recent_writers = TTLCache(maxsize=100000, ttl=settings.read_your_writes_seconds)
+# Authenticated user of the current request, set by get_current_user
+current_user_id: ContextVar[Optional[int]] = ContextVar(
+    "current_user_id", default=None
+)
+# User named by the request's valid read-your-writes cookie, and where the
+# request's own write is reported for the response cookie; both set by
+# ReadYourWritesMiddleware
+cookie_writer_id: ContextVar[Optional[int]] = ContextVar(
+    "cookie_writer_id", default=None
+)
+request_writes: ContextVar[Optional[Dict[str, int]]] = ContextVar(
+    "request_writes", default=None
+)
+
+
+def mark_write(user_id: int) -> None:
+    """Route the user's reads to the primary for read_your_writes_seconds"""
+    if read_urls:
+        recent_writers.set(user_id, True)
+        writes = request_writes.get()
+        if writes is not None:
+            writes["user_id"] = user_id
+
+
+def wrote_recently(user_id: int) -> bool:
+    """Whether the user wrote within read_your_writes_seconds, in any worker"""
+    return bool(recent_writers.get(user_id)) or cookie_writer_id.get() == user_id
+
+
+class ReadSession(Session):
+    """Session that sends its statements to a read replica when it can
+
+    The replica is picked on first use rather than at creation, because the
+    requesting user is only known once authentication has run. Statements
+    failing on a replica with a connection error take it out of rotation and
+    are retried once on the primary.
+    """
+
+    def _read_bind(self):
+        bind = self.info.get("read_bind")
+        if bind is None:
+            user_id = current_user_id.get()
+            replica = None
+            if user_id is None or not wrote_recently(user_id):
+                replica = get_replicas().choose()
+            bind = (replica or get_engine()).sync_engine
+            self.info["read_bind"] = bind
+        return bind
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        return self._read_bind()
+
+    def execute(self, statement, *args, **kwargs):
+        bind = self._read_bind()
+        try:
+            return super().execute(statement, *args, **kwargs)
+        except (OperationalError, InterfaceError, OSError):
+            primary = get_engine().sync_engine
+            if bind is primary:
+                raise
+            get_replicas().mark_down(bind)
+            self.rollback()
+            self.info["read_bind"] = primary
+            return super().execute(statement, *args, **kwargs)
+
+
+# Async session makers; primary sessions are bound on creation through
+# async_session()
+_primary_sessions = async_sessionmaker(class_=AsyncSession, expire_on_commit=False)
+async_read_session = async_sessionmaker(
+    class_=AsyncSession, sync_session_class=ReadSession, expire_on_commit=False
+)
+
+
+def async_session() -> AsyncSession:
+    """New session on the primary engine"""
+    return _primary_sessions(bind=get_engine())
 
 
 async def get_db():
     async with async_session() as session:
         yield session
+
+
+async def get_read_db():
+    """Session for read-only endpoints, served by a replica when configured
+
+    Replica lag is measured by the background health check; requests only
+    read its last result.
+    """
+    if not read_urls:
+        async with async_session() as session:
+            yield session
+        return
+    async with async_read_session() as session:
+        yield session
@@ -0,0 +1,129 @@
+"""
+Background database checks backing the readiness probe
+
+``HealthChecker`` runs ``SELECT 1`` on the primary every ``interval``
+seconds (bounded by ``timeout``), refreshes replica lag, and keeps the last
+result. ``/readyz`` only reads that result, so probes never take a pooled
+connection or queue behind request traffic.
+"""
+
+import asyncio
+import logging
+import time
+from functools import lru_cache
+from typing import Any, Dict, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.config import get_settings
+from app.db import get_engine, get_pool_manager, get_replicas
+from app.pool import PoolManager
+from app.replicas import ReplicaSet
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+class HealthChecker:
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        pool_manager: PoolManager,
+        replicas: ReplicaSet,
+        interval: float = 5.0,
+        timeout: float = 2.0,
+    ):
+        self.engine = engine
+        self.pool_manager = pool_manager
+        self.replicas = replicas
+        self.interval = interval
+        self.timeout = timeout
+        self.database: Dict[str, Any] = {"status": "unknown"}
+        self.checked_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def _ping(self) -> None:
+        async with self.engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    async def check(self) -> None:
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._ping(), self.timeout)
+            self.database = {
+                "status": "ok",
+                "latency_ms": round((time.perf_counter() - start) * 1000, 2),
+            }
+        except asyncio.TimeoutError:
+            # Usually an exhausted pool rather than a dead database
+            self.database = {
+                "status": "timeout",
+                "error": f"No connection within {self.timeout}s",
+            }
+        except Exception as e:
+            self.database = {"status": "error", "error": str(e)}
+        self.checked_at = time.monotonic()
+        if self.replicas:
+            await self.replicas.refresh()
+
+    @property
+    def ready(self) -> bool:
+        """Last check succeeded and is recent enough to trust"""
+        if self.checked_at is None or self.database["status"] != "ok":
+            return False
+        return time.monotonic() - self.checked_at <= 3 * self.interval
+
+    def report(self) -> Dict[str, Any]:
+        pool = self.pool_manager.stats()
+        age = (
+            round(time.monotonic() - self.checked_at, 3)
+            if self.checked_at is not None
+            else None
+        )
+        return {
+            "status": "ready" if self.ready else "unavailable",
+            "database": {**self.database, "checked_seconds_ago": age},
+            "pool": {
+                "size": pool["size"],
+                "checked_out": pool["checked_out"],
+                "limit": pool["limit"],
+                "headroom": max(0, pool["limit"] - pool["checked_out"]),
+            },
+            "replicas": {
+                "total": len(self.replicas),
+                "usable": self.replicas.usable_count(),
+            },
+        }
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.check()
+            except Exception:
+                logger.exception("Health check failed")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+@lru_cache()
+def get_health_checker() -> HealthChecker:
+    return HealthChecker(
+        get_engine(),
+        get_pool_manager(),
+        get_replicas(),
+        interval=settings.health_check_interval_seconds,
+        timeout=settings.health_check_timeout_seconds,
+    )
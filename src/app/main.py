@@ -2,17 +2,41 @@ from fastapi import FastAPI
 from starlette.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 
-from app.api import notes, ping, auth
-from app.db import engine
+from app import metrics as app_metrics
+from app.admission import AdmissionLimiter, collect_limiters
+from app.api import notes, ping, auth, security, metrics
+from app.db import dispose_engines, get_pool_manager, read_urls
+from app.health import get_health_checker
+from app.purge import note_purger
 from app.config import get_settings
+from app.middleware import (
+    AdmissionControlMiddleware,
+    MetricsMiddleware,
+    ReadYourWritesMiddleware,
+    ServerTimingMiddleware,
+)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     print("Starting up...")
+    # Builds the primary engine; until now nothing has touched the database
+    pool_manager = get_pool_manager()
+    # Started first: it sizes the pool, which would drop warmed connections
+    if settings.db_pool_adaptive:
+        pool_manager.start()
+    await pool_manager.warm(settings.db_pool_warm_connections)
+    health_checker = get_health_checker()
+    health_checker.start()
+    if settings.note_retention_days > 0:
+        note_purger.start()
     yield
     print("Shutting down...")
-    await engine.dispose()
+    await note_purger.stop()
+    await health_checker.stop()
+    await pool_manager.stop()
+    security.hash_pool.shutdown()
+    await dispose_engines()
 
 
 app = FastAPI(
@@ -28,14 +52,64 @@ settings = get_settings()
 # CORS configuration - only allow specific origins in production
 allowed_origins = settings.allowed_origins.split(",")
 
+if settings.admission_control_enabled:
+    class_limits = {
+        "auth": settings.admission_auth_limit,
+        "read": settings.admission_read_limit,
+        "write": settings.admission_write_limit,
+    }
+    limiters = {
+        name: AdmissionLimiter(
+            limit,
+            max_queue=settings.admission_max_queue,
+            max_wait=settings.admission_max_wait_ms / 1000,
+        )
+        for name, limit in class_limits.items()
+        if limit > 0
+    }
+    app_metrics.registry.register_collector(collect_limiters(limiters))
+    # Innermost, so shed responses still carry CORS headers and are counted
+    # by the metrics middleware
+    app.add_middleware(
+        AdmissionControlMiddleware,
+        limiters=limiters,
+        exempt_paths=frozenset({"/healthz", "/readyz", "/metrics"}),
+    )
+if read_urls and settings.read_your_writes_seconds > 0:
+    # Workers share no memory, so a user's recent write travels with their
+    # requests to whichever worker serves them next
+    app.add_middleware(
+        ReadYourWritesMiddleware,
+        secret=settings.secret_key,
+        ttl=settings.read_your_writes_seconds,
+    )
 app.add_middleware(
     CORSMiddleware,
     allow_origins=allowed_origins,
     allow_credentials=True,
     allow_methods=["DELETE", "GET", "POST", "PUT"],
     allow_headers=["*"],
+    expose_headers=[
+        "X-Next-Cursor",
+        "X-Total-Count",
+        "X-Total-Count-Exact",
+        "ETag",
+        "Server-Timing",
+        "X-Profile",
+    ],
 )
+if settings.server_timing_enabled or settings.profile_token:
+    app.add_middleware(
+        ServerTimingMiddleware,
+        server_timing=settings.server_timing_enabled,
+        profile_token=settings.profile_token,
+        profile_dir=settings.profile_dir,
+        profile_interval=settings.profile_interval_ms / 1000,
+    )
+# Outermost, so recorded latency covers every other middleware
+app.add_middleware(MetricsMiddleware, router=app.router)
 
 app.include_router(ping.router)
+app.include_router(metrics.router)
 app.include_router(auth.router, prefix="/auth", tags=["auth"])
 app.include_router(notes.router, prefix="/notes", tags=["notes"])
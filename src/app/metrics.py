@@ -0,0 +1,381 @@
+"""
+Minimal in-process metrics with Prometheus text exposition
+
+Counters, gauges and histograms are plain Python objects updated without
+locks (the app runs on one event loop per process), so recording a sample on
+the hot path costs a dict lookup and a couple of additions. Values that are
+cheaper to read on demand, like pool statistics, are registered as collectors
+and evaluated only when /metrics is scraped.
+"""
+
+import re
+import time
+from bisect import bisect_left
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Sequence, Tuple
+
+from sqlalchemy import event
+
+from app import timing
+
+# Latency buckets in seconds, from sub-millisecond DB calls to slow requests
+DEFAULT_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+Labels = Tuple[str, ...]
+Sample = Tuple[str, Dict[str, str], float]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    pairs = (f'{key}="{_escape(value)}"' for key, value in labels.items())
+    return "{" + ",".join(pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _format_sample(name: str, labels: Dict[str, str], value: float) -> str:
+    return f"{name}{_format_labels(labels)} {_format_value(value)}"
+
+
+class _Metric:
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Labels, object] = {}
+
+    @property
+    def family(self) -> str:
+        """Name on the HELP and TYPE lines, matching the sample names"""
+        return self.name
+
+    def labels(self, *values: str):
+        """Return the child for these label values, creating it on first use"""
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = self._new_child()
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _label_dict(self, values: Labels) -> Dict[str, str]:
+        return dict(zip(self.labelnames, values))
+
+    def samples(self) -> Iterable[Sample]:
+        raise NotImplementedError
+
+
+class _Value:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1) -> None:
+        self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    @property
+    def family(self) -> str:
+        return self.name + "_total"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1) -> None:
+        self.labels().inc(amount)
+
+    def samples(self) -> Iterable[Sample]:
+        for values, child in self._children.items():
+            yield self.family, self._label_dict(values), child.value
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    @property
+    def family(self) -> str:
+        return self.name
+
+    def set(self, value: float) -> None:
+        self.labels().set(value)
+
+    def dec(self, amount: float = 1) -> None:
+        self.labels().dec(amount)
+
+    def samples(self) -> Iterable[Sample]:
+        for values, child in self._children.items():
+            yield self.name, self._label_dict(values), child.value
+
+
+class _HistogramValue:
+    __slots__ = ("upper_bounds", "counts", "sum", "count")
+
+    def __init__(self, upper_bounds: Sequence[float]):
+        self.upper_bounds = upper_bounds
+        self.counts = [0] * (len(upper_bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.upper_bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def totals(self, **labels: str) -> Tuple[float, int]:
+        """Sum and count of observations with the given label values
+
+        Labels not given match any value, so no arguments sums everything.
+        """
+        positions = [(self.labelnames.index(n), v) for n, v in labels.items()]
+        total, count = 0.0, 0
+        for values, child in list(self._children.items()):
+            if any(values[i] != value for i, value in positions):
+                continue
+            total += child.sum
+            count += child.count
+        return total, count
+
+    def samples(self) -> Iterable[Sample]:
+        for values, child in self._children.items():
+            labels = self._label_dict(values)
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), child.counts):
+                cumulative += count
+                bucket_labels = {**labels, "le": _format_value(bound)}
+                yield self.name + "_bucket", bucket_labels, cumulative
+            yield self.name + "_sum", labels, child.sum
+            yield self.name + "_count", labels, child.count
+
+
+# A collector yields (name, type, help, [(labels, value), ...]) at scrape time
+Collector = Callable[
+    [], Iterable[Tuple[str, str, str, Iterable[Tuple[Dict[str, str], float]]]]
+]
+
+
+class Registry:
+    """Holds metrics and scrape-time collectors and renders them as text"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Collector] = []
+
+    def _add(self, metric: _Metric) -> _Metric:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames=()) -> Counter:
+        return self._add(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames=()) -> Gauge:
+        return self._add(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._add(Histogram(name, documentation, labelnames, buckets))
+
+    def register_collector(self, collector: Collector) -> None:
+        """Add a callable yielding ``(name, type, help, [(labels, value)])``"""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.family} {metric.documentation}")
+            lines.append(f"# TYPE {metric.family} {metric.type}")
+            for name, labels, value in metric.samples():
+                lines.append(_format_sample(name, labels, value))
+        for collector in self._collectors:
+            for name, type_, documentation, samples in collector():
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {type_}")
+                for labels, value in samples:
+                    lines.append(_format_sample(name, labels, value))
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+# --- HTTP ---
+
+http_requests = registry.counter(
+    "http_requests",
+    "Requests handled, by route template and status code",
+    ("method", "route", "status"),
+)
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds",
+    "Request latency from first byte received to response complete",
+    ("method", "route"),
+)
+http_requests_in_flight = registry.gauge(
+    "http_requests_in_flight", "Requests currently being handled", ("method", "route")
+)
+
+# --- Database ---
+
+db_statement_duration = registry.histogram(
+    "db_statement_duration_seconds",
+    "Time spent executing SQL statements, by engine, operation and table",
+    ("engine", "operation", "table"),
+)
+db_pool_checkout_wait = registry.histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for an idle pooled connection at checkout, by engine",
+    ("engine",),
+)
+
+
+_TABLE = re.compile(r"\b(?:FROM|INTO|UPDATE)\s+\"?(\w+)", re.IGNORECASE)
+
+
+@lru_cache(maxsize=1024)
+def statement_labels(statement: str) -> Tuple[str, str]:
+    """Classify SQL as (operation, first table) for low-cardinality labels"""
+    words = statement.split(None, 1)
+    operation = words[0].lower() if words else ""
+    match = _TABLE.search(statement)
+    return operation, match[1].lower() if match else ""
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["metrics_query_start"].pop()
+    engine = _engine_names.get(conn.engine, "")
+    db_statement_duration.labels(engine, *statement_labels(statement)).observe(
+        elapsed
+    )
+    timing.record("db", elapsed)
+
+
+def _handle_error(exception_context):
+    starts = exception_context.connection and exception_context.connection.info.get(
+        "metrics_query_start"
+    )
+    if starts:
+        starts.pop()
+
+
+_POOL_GAUGES = (
+    ("db_pool_size", "size", "Configured number of pooled connections"),
+    ("db_pool_checked_out", "checkedout", "Connections currently in use"),
+    ("db_pool_checked_in", "checkedin", "Idle connections in the pool"),
+    ("db_pool_overflow", "overflow", "Connections open beyond pool_size"),
+)
+_instrumented_engines: Dict[str, Any] = {}
+# Sync engine to its name, for the engine label on statement timings
+_engine_names: Dict[Any, str] = {}
+
+
+def _collect_pools():
+    for name, attribute, documentation in _POOL_GAUGES:
+        samples = [
+            ({"engine": engine_name}, getattr(sync_engine.pool, attribute)())
+            for engine_name, sync_engine in _instrumented_engines.items()
+            if hasattr(sync_engine.pool, attribute)
+        ]
+        if samples:
+            yield name, "gauge", documentation, samples
+
+
+def instrument_engine(engine: Any, name: str = "primary") -> None:
+    """Time every statement on ``engine`` and export its pool statistics"""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _handle_error)
+    if not _instrumented_engines:
+        registry.register_collector(_collect_pools)
+    _instrumented_engines[name] = sync_engine
+    _engine_names[sync_engine] = name
+
+
+_CACHE_FAMILIES = (
+    ("cache_size", "gauge", "Entries held", "size"),
+    ("cache_hits_total", "counter", "Lookups served", "hits"),
+    ("cache_misses_total", "counter", "Lookups missed", "misses"),
+)
+_registered_caches: Dict[str, Any] = {}
+
+
+def _collect_caches():
+    stats = {name: cache.stats() for name, cache in _registered_caches.items()}
+    for family, type_, documentation, key in _CACHE_FAMILIES:
+        samples = [
+            ({"cache": name}, cache_stats[key])
+            for name, cache_stats in stats.items()
+            if cache_stats[key] is not None
+        ]
+        if samples:
+            yield family, type_, documentation, samples
+
+
+def register_cache(name: str, cache: Any) -> None:
+    """Export a cache's size and hit/miss counters under ``cache=name``"""
+    if not _registered_caches:
+        registry.register_collector(_collect_caches)
+    _registered_caches[name] = cache
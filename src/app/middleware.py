@@ -0,0 +1,295 @@
+import asyncio
+import hashlib
+import hmac
+import math
+import os
+import time
+from datetime import datetime, timezone
+from typing import Dict, FrozenSet, Optional, Tuple
+
+from starlette.datastructures import MutableHeaders
+from starlette.responses import JSONResponse
+from starlette.routing import Match, Router
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app import db, metrics, timing
+from app.admission import AdmissionLimiter, RequestShed, requests_shed
+from app.profiling import SamplingProfiler
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+class MetricsMiddleware:
+    """Record per-route latency, status counts and in-flight requests
+
+    Requests are labelled with the route template (``/notes/{id}``), never
+    the raw path, so label cardinality stays bounded.
+    """
+
+    def __init__(self, app: ASGIApp, router: Router, max_cached_paths: int = 4096):
+        self.app = app
+        self.router = router
+        self.max_cached_paths = max_cached_paths
+        self._route_cache: Dict[Tuple[str, str], str] = {}
+
+    def _route_template(self, scope: Scope) -> str:
+        key = (scope["method"], scope["path"])
+        template = self._route_cache.get(key)
+        if template is None:
+            template = UNMATCHED_ROUTE
+            for route in self.router.routes:
+                match, _ = route.matches(scope)
+                if match != Match.NONE:
+                    template = getattr(route, "path", UNMATCHED_ROUTE)
+                    if match == Match.FULL:
+                        break
+            if len(self._route_cache) >= self.max_cached_paths:
+                self._route_cache.clear()
+            self._route_cache[key] = template
+        return template
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = self._route_template(scope)
+        in_flight = metrics.http_requests_in_flight.labels(method, route)
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            in_flight.dec()
+            metrics.http_request_duration.labels(method, route).observe(
+                time.perf_counter() - start
+            )
+            metrics.http_requests.labels(method, route, str(status_code)).inc()
+
+
+PROFILE_TOKEN_HEADER = b"x-profile-token"
+
+
+def _write_profile(directory: str, name: str, folded: str) -> None:
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, name), "w", encoding="utf-8") as f:
+        f.write(folded)
+
+
+class ServerTimingMiddleware:
+    """Break each response's time down in a ``Server-Timing`` header
+
+    Reports whatever phases were recorded through ``app.timing`` (``auth``,
+    ``db``, ``serialize``) plus ``total``, measured up to the start of the
+    response. Requests carrying ``X-Profile-Token`` equal to
+    ``profile_token`` are also run under the sampling profiler; the folded
+    stacks are written to ``profile_dir`` and the file name is returned in
+    ``X-Profile``. An empty ``profile_token`` disables profiling.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        server_timing: bool = True,
+        profile_token: str = "",
+        profile_dir: str = "profiles",
+        profile_interval: float = 0.001,
+    ):
+        self.app = app
+        self.server_timing = server_timing
+        self.profile_token = profile_token.encode()
+        self.profile_dir = profile_dir
+        self.profile_interval = profile_interval
+
+    def _wants_profile(self, scope: Scope) -> bool:
+        if not self.profile_token:
+            return False
+        for name, value in scope["headers"]:
+            if name == PROFILE_TOKEN_HEADER:
+                return hmac.compare_digest(value, self.profile_token)
+        return False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profiler: Optional[SamplingProfiler] = None
+        profile_name = None
+        if self._wants_profile(scope):
+            profiler = SamplingProfiler(self.profile_interval)
+            stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+            path = scope["path"].strip("/").replace("/", "_") or "root"
+            profile_name = f"{stamp}-{scope['method']}-{path}.folded"
+
+        start = time.perf_counter()
+        with timing.collect() as timings:
+
+            async def send_wrapper(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    headers = MutableHeaders(scope=message)
+                    if self.server_timing:
+                        headers.append(
+                            "Server-Timing",
+                            timings.header(total=time.perf_counter() - start),
+                        )
+                    if profile_name is not None:
+                        headers.append("X-Profile", profile_name)
+                await send(message)
+
+            if profiler is None:
+                await self.app(scope, receive, send_wrapper)
+                return
+
+            profiler.start()
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                profiler.stop()
+                await asyncio.to_thread(
+                    _write_profile, self.profile_dir, profile_name, profiler.folded()
+                )
+
+
+READ_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+
+class AdmissionControlMiddleware:
+    """Limit concurrent requests per route class and shed the excess
+
+    Requests under ``auth_prefix`` are class ``auth``, other safe methods
+    ``read`` and everything else ``write``; each class has its own
+    :class:`AdmissionLimiter` (classes missing from ``limiters`` are not
+    limited). Shed requests get ``503`` with ``Retry-After`` and are counted
+    in ``http_requests_shed_total``. Paths in ``exempt_paths`` (probes,
+    metrics) always pass so an overloaded process still reports on itself.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        limiters: Dict[str, AdmissionLimiter],
+        auth_prefix: str = "/auth",
+        exempt_paths: FrozenSet[str] = frozenset(),
+    ):
+        self.app = app
+        self.limiters = limiters
+        self.auth_prefix = auth_prefix
+        self.exempt_paths = exempt_paths
+
+    def route_class(self, scope: Scope) -> str:
+        if scope["path"].startswith(self.auth_prefix):
+            return "auth"
+        return "read" if scope["method"] in READ_METHODS else "write"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] in self.exempt_paths:
+            await self.app(scope, receive, send)
+            return
+
+        route_class = self.route_class(scope)
+        limiter = self.limiters.get(route_class)
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            async with limiter.slot():
+                await self.app(scope, receive, send)
+        except RequestShed as shed:
+            requests_shed.labels(route_class, shed.reason).inc()
+            response = JSONResponse(
+                {"detail": "Server is busy, please retry"},
+                status_code=503,
+                headers={"Retry-After": str(max(1, math.ceil(limiter.max_wait)))},
+            )
+            await response(scope, receive, send)
+
+
+class ReadYourWritesMiddleware:
+    """Carry read-your-writes routing to every worker in a signed cookie
+
+    A response to a request that wrote notes (``db.mark_write``) sets
+    ``cookie_name`` to the user ID and an expiry ``ttl`` seconds ahead,
+    signed with ``secret``. Requests bringing back a valid, unexpired cookie
+    publish its user in ``db.cookie_writer_id``, so whichever worker serves
+    them reads that user's data from the primary.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        secret: str,
+        ttl: float,
+        cookie_name: str = "primary_until",
+        clock=time.time,
+    ):
+        self.app = app
+        self.secret = secret.encode()
+        self.ttl = ttl
+        self.cookie_name = cookie_name
+        self._clock = clock
+
+    def _sign(self, payload: str) -> str:
+        return hmac.new(self.secret, payload.encode(), hashlib.sha256).hexdigest()
+
+    def cookie_value(self, user_id: int) -> str:
+        payload = f"{user_id}.{math.ceil(self._clock() + self.ttl)}"
+        return f"{payload}.{self._sign(payload)}"
+
+    def cookie_user(self, value: str) -> Optional[int]:
+        """The user of a genuine, unexpired cookie value, else None"""
+        payload, _, signature = value.rpartition(".")
+        user_id, _, expires = payload.partition(".")
+        if not (user_id.isdigit() and expires.isdigit()):
+            return None
+        if not hmac.compare_digest(signature, self._sign(payload)):
+            return None
+        if int(expires) <= self._clock():
+            return None
+        return int(user_id)
+
+    def _request_cookie(self, scope: Scope) -> Optional[str]:
+        prefix = self.cookie_name + "="
+        for name, value in scope["headers"]:
+            if name != b"cookie":
+                continue
+            for part in value.decode("latin-1").split(";"):
+                part = part.strip()
+                if part.startswith(prefix):
+                    return part[len(prefix) :]
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        cookie = self._request_cookie(scope)
+        writes: Dict[str, int] = {}
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start" and "user_id" in writes:
+                MutableHeaders(scope=message).append(
+                    "Set-Cookie",
+                    f"{self.cookie_name}={self.cookie_value(writes['user_id'])}; "
+                    f"Max-Age={math.ceil(self.ttl)}; Path=/; HttpOnly; SameSite=Lax",
+                )
+            await send(message)
+
+        reader = db.cookie_writer_id.set(self.cookie_user(cookie) if cookie else None)
+        recorder = db.request_writes.set(writes)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            db.request_writes.reset(recorder)
+            db.cookie_writer_id.reset(reader)
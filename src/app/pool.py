@@ -0,0 +1,186 @@
+"""
+Adaptive sizing for the primary engine's connection pool
+
+``PoolManager`` moves the connection limit between bounds, once per
+``interval``:
+
+- when the database itself is slow (mean statement latency above
+  ``max_latency``), more connections would only add load, so the limit is
+  cut multiplicatively, down to ``min_connections``;
+- when requests wait for a connection (mean checkout wait above
+  ``target_wait``) while the database is fast, the limit grows by ``step``,
+  up to ``max_connections``;
+- when the pool is idle, the limit decays one at a time back to
+  ``baseline``.
+
+Both signals are deltas of the histograms in ``app.metrics`` over the last
+interval, counting only samples labelled with this engine's ``name`` so
+replica traffic doesn't steer the primary's pool.
+
+The limit is applied as persistent capacity: when it changes, the engine's
+pool is swapped for one of ``limit`` connections without overflow, the way
+``Engine.dispose`` swaps in a fresh pool. The old pool's idle connections
+are closed; connections checked out from it finish their requests and are
+closed once that pool is dropped. The pool must support
+``recreate(pool_size=..., max_overflow=...)`` (``app.db.TimedQueuePool``).
+"""
+
+import asyncio
+import logging
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class PoolManager:
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        min_connections: int,
+        baseline: int,
+        max_connections: int,
+        target_wait: float = 0.005,
+        max_latency: float = 0.1,
+        interval: float = 5.0,
+        step: int = 2,
+        name: str = "primary",
+    ):
+        self.engine = engine
+        self.name = name
+        self.min_connections = min_connections
+        self.max_connections = max(max_connections, baseline)
+        self.baseline = min(max(baseline, min_connections), self.max_connections)
+        self.target_wait = target_wait
+        self.max_latency = max_latency
+        self.interval = interval
+        self.step = step
+        self.limit = self.baseline
+        self.applied_limit: Optional[int] = None
+        self.adjustments = 0
+        self.last_wait = 0.0
+        self.last_latency = 0.0
+        self._wait_totals = metrics.db_pool_checkout_wait.totals(engine=name)
+        self._latency_totals = metrics.db_statement_duration.totals(engine=name)
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def pool(self) -> Any:
+        return self.engine.sync_engine.pool
+
+    def _apply(self) -> None:
+        if self.limit == self.applied_limit:
+            return
+        old_pool = self.pool
+        sync_engine = self.engine.sync_engine
+        sync_engine.pool = old_pool.recreate(pool_size=self.limit, max_overflow=0)
+        old_pool.dispose()
+        self.applied_limit = self.limit
+
+    def decide(self, wait: float, latency: float, checked_out: int) -> int:
+        """Return the connection limit for the observed mean wait and latency"""
+        if latency > self.max_latency:
+            return max(self.min_connections, int(self.limit * 0.75))
+        if wait > self.target_wait:
+            return min(self.max_connections, self.limit + self.step)
+        if wait < self.target_wait / 4 and checked_out <= self.limit // 2:
+            if self.limit > self.baseline:
+                return self.limit - 1
+            if self.limit < self.baseline:
+                return self.limit + 1
+        return self.limit
+
+    def _window_mean(self, histogram: metrics.Histogram, previous) -> Tuple:
+        totals = histogram.totals(engine=self.name)
+        count = totals[1] - previous[1]
+        mean = (totals[0] - previous[0]) / count if count > 0 else 0.0
+        return mean, totals
+
+    def tick(self) -> None:
+        self.last_wait, self._wait_totals = self._window_mean(
+            metrics.db_pool_checkout_wait, self._wait_totals
+        )
+        self.last_latency, self._latency_totals = self._window_mean(
+            metrics.db_statement_duration, self._latency_totals
+        )
+        limit = self.decide(self.last_wait, self.last_latency, self.pool.checkedout())
+        if limit != self.limit:
+            logger.info(
+                "Resizing DB pool limit %d -> %d (wait %.1fms, latency %.1fms)",
+                self.limit,
+                limit,
+                self.last_wait * 1000,
+                self.last_latency * 1000,
+            )
+            self.limit = limit
+            self.adjustments += 1
+        self._apply()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                self.tick()
+            except Exception:
+                logger.exception("DB pool adjustment failed")
+
+    def start(self) -> None:
+        self._apply()
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def warm(self, connections: int) -> int:
+        """Open up to ``connections`` pooled connections concurrently
+
+        They are returned to the pool idle, so the first requests after
+        startup skip connection setup. Returns how many were opened.
+        """
+        connections = min(connections, self.pool.size())
+
+        async def open_one():
+            async with self.engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+
+        results = await asyncio.gather(
+            *(open_one() for _ in range(connections)), return_exceptions=True
+        )
+        failures = [r for r in results if isinstance(r, Exception)]
+        if failures:
+            logger.warning("DB pool warm-up failed: %s", failures[0])
+        return connections - len(failures)
+
+    def collect(self):
+        """Metrics collector for the current limit and adjustment count"""
+        yield "db_pool_limit", "gauge", "Adaptive connection limit", [
+            ({}, self.limit)
+        ]
+        yield "db_pool_adjustments_total", "counter", "Pool limit changes", [
+            ({}, self.adjustments)
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        pool = self.pool
+        return {
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "limit": self.limit,
+            "min_connections": self.min_connections,
+            "max_connections": self.max_connections,
+            "adjustments": self.adjustments,
+            "checkout_wait_seconds": self.last_wait,
+            "statement_latency_seconds": self.last_latency,
+        }
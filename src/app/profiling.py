@@ -0,0 +1,68 @@
+"""
+Stdlib sampling profiler for profiling a single request on demand
+
+A background thread snapshots the event loop thread's stack every
+``interval`` seconds and counts identical stacks. The result is written in
+the folded ("collapsed") format read by flamegraph.pl, speedscope and
+inferno: one ``frame;frame;frame count`` line per distinct stack, root first.
+
+Samples come from the whole event loop thread, so requests running
+concurrently with the profiled one show up too.
+"""
+
+import os
+import sys
+import threading
+from collections import Counter
+from types import FrameType
+from typing import Dict, Optional, Tuple
+
+
+def _frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    filename = os.path.basename(code.co_filename)
+    # ';' separates frames and ' ' precedes the count in the folded format
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})".replace(";", ":")
+
+
+class SamplingProfiler:
+    def __init__(self, interval: float = 0.001, thread_id: Optional[int] = None):
+        self.interval = interval
+        self.thread_id = thread_id or threading.get_ident()
+        self.samples: Counter = Counter()
+        self._labels: Dict[object, str] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _stack(self, frame: Optional[FrameType]) -> Tuple[str, ...]:
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            label = self._labels.get(code)
+            if label is None:
+                label = self._labels[code] = _frame_label(frame)
+            stack.append(label)
+            frame = frame.f_back
+        stack.reverse()
+        return tuple(stack)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.samples[self._stack(frame)] += 1
+
+    def start(self) -> None:
+        self._thread = threading.Thread(
+            target=self._run, name="request-profiler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def folded(self) -> str:
+        lines = [f"{';'.join(stack)} {count}" for stack, count in self.samples.items()]
+        return "\n".join(lines) + "\n" if lines else ""
@@ -0,0 +1,84 @@
+"""
+Background hard-delete of notes soft-deleted longer than the retention period
+
+Each run removes expired notes in chunks of ``batch_size``, one short
+transaction per chunk with ``pause`` seconds between chunks, so a large
+backlog never holds long locks or saturates the database.
+"""
+
+import asyncio
+import logging
+from datetime import timedelta
+from typing import Callable, Optional
+
+from app.api import crud
+from app.config import get_settings
+from app.db import async_session
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+class NotePurger:
+    def __init__(
+        self,
+        session_factory: Callable,
+        retention: timedelta,
+        batch_size: int = 500,
+        pause: float = 0.5,
+        interval: float = 3600.0,
+    ):
+        self.session_factory = session_factory
+        self.retention = retention
+        self.batch_size = batch_size
+        self.pause = pause
+        self.interval = interval
+        self.purged = 0
+        self._task: Optional[asyncio.Task] = None
+
+    async def run_once(self) -> int:
+        """Purge every expired note now and return how many were removed"""
+        total = 0
+        while True:
+            async with self.session_factory() as session:
+                removed = await crud.purge_deleted_notes(
+                    session, self.retention, batch_size=self.batch_size
+                )
+            total += removed
+            if removed < self.batch_size:
+                break
+            await asyncio.sleep(self.pause)
+        self.purged += total
+        if total:
+            logger.info("Purged %d soft-deleted notes", total)
+        return total
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except Exception:
+                logger.exception("Purging soft-deleted notes failed")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+note_purger = NotePurger(
+    async_session,
+    retention=timedelta(days=settings.note_retention_days),
+    batch_size=settings.purge_batch_size,
+    pause=settings.purge_batch_pause_seconds,
+    interval=settings.purge_interval_seconds,
+)
@@ -0,0 +1,113 @@
+"""
+Read replica selection
+
+``ReplicaSet`` hands out replica engines round-robin, skipping any that
+recently failed or whose replication lag exceeds ``max_lag`` seconds. Lag is
+measured at most every ``check_interval`` seconds per replica by ``refresh``,
+which the background health check calls; a check taking longer than
+``timeout`` counts as a failure, and a successful one brings a failed replica
+back. Callers fall back to
+the primary when ``choose`` returns None.
+"""
+
+import asyncio
+import itertools
+import time
+from typing import Any, Callable, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+# Seconds since the last replayed transaction, or 0 when every received WAL
+# record has been replayed (an idle primary would otherwise look like lag)
+POSTGRES_LAG_SQL = text(
+    """
+    SELECT CASE
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(
+            EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0
+        )
+    END
+    """
+)
+
+
+class Replica:
+    __slots__ = ("engine", "lag", "checked_at", "down_until")
+
+    def __init__(self, engine: AsyncEngine):
+        self.engine = engine
+        self.lag = 0.0
+        self.checked_at: Optional[float] = None
+        self.down_until = 0.0
+
+
+class ReplicaSet:
+    def __init__(
+        self,
+        engines: List[AsyncEngine],
+        max_lag: float = 5.0,
+        retry_after: float = 30.0,
+        check_interval: float = 5.0,
+        timeout: float = 2.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.replicas = [Replica(engine) for engine in engines]
+        self.max_lag = max_lag
+        self.retry_after = retry_after
+        self.check_interval = check_interval
+        self.timeout = timeout
+        self._clock = clock
+        self._next = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self.replicas)
+
+    def _usable(self, replica: Replica, now: float) -> bool:
+        return replica.down_until <= now and replica.lag <= self.max_lag
+
+    def usable_count(self) -> int:
+        now = self._clock()
+        return sum(self._usable(replica, now) for replica in self.replicas)
+
+    def choose(self) -> Optional[AsyncEngine]:
+        """Return the next usable replica engine, or None to use the primary"""
+        now = self._clock()
+        count = len(self.replicas)
+        start = next(self._next)
+        for offset in range(count):
+            replica = self.replicas[(start + offset) % count]
+            if self._usable(replica, now):
+                return replica.engine
+        return None
+
+    def mark_down(self, engine: Any) -> None:
+        """Take the replica owning ``engine`` out of rotation for retry_after"""
+        for replica in self.replicas:
+            if engine in (replica.engine, replica.engine.sync_engine):
+                replica.down_until = self._clock() + self.retry_after
+
+    async def _measure_lag(self, engine: AsyncEngine) -> float:
+        async with engine.connect() as conn:
+            if conn.dialect.name != "postgresql":
+                await conn.execute(text("SELECT 1"))
+                return 0.0
+            return float(await conn.scalar(POSTGRES_LAG_SQL) or 0)
+
+    async def refresh(self) -> None:
+        """Re-measure lag of replicas not checked within check_interval"""
+        now = self._clock()
+        for replica in self.replicas:
+            if replica.checked_at is not None and (
+                now - replica.checked_at < self.check_interval
+            ):
+                continue
+            # Failed checks count too: the next one is due after check_interval
+            replica.checked_at = now
+            try:
+                replica.lag = await asyncio.wait_for(
+                    self._measure_lag(replica.engine), self.timeout
+                )
+                replica.down_until = 0.0
+            except Exception:
+                replica.down_until = self._clock() + self.retry_after
@@ -0,0 +1,91 @@
+"""
+Rebuild the note statistics tables from the notes themselves
+
+Listing totals and ``GET /notes/stats`` read counters that every note write
+adjusts in its own transaction. Should they drift (notes edited by hand, a
+partial restore), this recomputes them, one user per short transaction. Run
+from ``src``:
+
+    python -m app.stats [--user ID ...]
+"""
+
+import argparse
+import asyncio
+import logging
+from typing import Callable, Iterable, Optional
+
+from sqlalchemy.exc import NoResultFound
+
+from app.api import crud
+from app.db import async_session, dispose_engines
+
+logger = logging.getLogger(__name__)
+
+
+async def rebuild(
+    session_factory: Callable,
+    owner_ids: Optional[Iterable[int]] = None,
+    batch_size: int = 500,
+) -> int:
+    """Rebuild the statistics of ``owner_ids`` (all users by default)
+
+    Returns the number of users rebuilt; raises ValueError for an unknown
+    user ID.
+    """
+    rebuilt = 0
+    async for batch in _owner_batches(session_factory, owner_ids, batch_size):
+        for owner_id in batch:
+            async with session_factory() as session:
+                try:
+                    await crud.rebuild_note_stats(session, owner_id)
+                except NoResultFound:
+                    raise ValueError(f"No user with id {owner_id}") from None
+            rebuilt += 1
+        logger.info("Rebuilt note statistics of %d users so far", rebuilt)
+    return rebuilt
+
+
+async def _owner_batches(
+    session_factory: Callable, owner_ids: Optional[Iterable[int]], batch_size: int
+):
+    if owner_ids is not None:
+        yield list(owner_ids)
+        return
+    after = 0
+    while True:
+        async with session_factory() as session:
+            batch = await crud.get_user_ids(session, after=after, limit=batch_size)
+        if not batch:
+            return
+        yield batch
+        after = batch[-1]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--user",
+        type=int,
+        action="append",
+        dest="users",
+        help="only rebuild this user's statistics (repeatable)",
+    )
+    args = parser.parse_args()
+    logging.basicConfig(format="%(message)s")
+    logger.setLevel(logging.INFO)
+
+    async def run() -> int:
+        try:
+            return await rebuild(async_session, args.users)
+        finally:
+            await dispose_engines()
+
+    try:
+        rebuilt = asyncio.run(run())
+    except ValueError as e:
+        parser.exit(1, f"{e}\n")
+    print(f"Rebuilt note statistics of {rebuilt} users")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Per-request phase timings, reported in the Server-Timing header
+
+ServerTimingMiddleware opens a ``RequestTimings`` for each request with
+``collect`` and keeps it in a context variable. Code anywhere below it
+(dependencies, crud, the SQLAlchemy cursor events, which run in a greenlet
+that inherits the request context) adds to it with ``record`` or ``measure``;
+outside a request both are no-ops.
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional
+
+
+class RequestTimings:
+    __slots__ = ("durations", "counts")
+
+    def __init__(self):
+        self.durations: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+
+    def add(self, name: str, seconds: float) -> None:
+        self.durations[name] = self.durations.get(name, 0.0) + seconds
+        self.counts[name] = self.counts.get(name, 0) + 1
+
+    def header(self, total: Optional[float] = None) -> str:
+        """Render as a Server-Timing value; durations are in milliseconds"""
+        entries = [
+            f'{name};dur={seconds * 1000:.2f};desc="{self.counts[name]}x"'
+            for name, seconds in self.durations.items()
+        ]
+        if total is not None:
+            entries.append(f"total;dur={total * 1000:.2f}")
+        return ", ".join(entries)
+
+
+_current: ContextVar[Optional[RequestTimings]] = ContextVar(
+    "request_timings", default=None
+)
+
+
+@contextmanager
+def collect() -> Iterator[RequestTimings]:
+    """Make a fresh ``RequestTimings`` current for the duration of the block"""
+    timings = RequestTimings()
+    token = _current.set(timings)
+    try:
+        yield timings
+    finally:
+        _current.reset(token)
+
+
+def record(name: str, seconds: float) -> None:
+    timings = _current.get()
+    if timings is not None:
+        timings.add(name, seconds)
+
+
+@contextmanager
+def measure(name: str) -> Iterator[None]:
+    """Add the time spent in the block to the current request's ``name``"""
+    if _current.get() is None:
+        yield
+        return
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start_time)
@@ -0,0 +1,124 @@
+"""
+Production launcher running the app in several uvicorn worker processes
+
+``run`` starts ``web_concurrency`` workers (one per available CPU when 0) on
+uvloop and httptools. Uvicorn's supervisor handles the signals: SIGTERM and
+SIGINT stop accepting connections and give in-flight requests up to
+``shutdown_drain_seconds`` before exiting, SIGHUP restarts the workers one at
+a time (each replacement serves before the worker it replaces is drained),
+and SIGTTIN/SIGTTOU add or remove a worker.
+
+Every worker has its own primary connection pool, so with
+``db_connection_budget`` set the per-worker pool settings are scaled down
+until all workers together stay within the budget. They reach the workers as
+environment variables, which take precedence over ``.env``.
+
+Workers share no memory either. A write only invalidates the in-process note
+cache of the worker that handled it, so with several workers the memory note
+cache checks each hit's version against the database before serving it
+(the Redis backend is shared and needs no check). Read-your-writes routing
+travels between workers in a signed cookie set on the write's response.
+"""
+
+import logging
+import os
+from typing import Dict
+
+import uvicorn
+
+from app.config import Settings, get_settings
+
+logger = logging.getLogger(__name__)
+
+APP = "app.main:app"
+
+
+def available_cpus() -> int:
+    """CPUs this process may run on, honoring affinity where supported"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def worker_count(settings: Settings) -> int:
+    if settings.web_concurrency > 0:
+        return settings.web_concurrency
+    return available_cpus()
+
+
+def worker_pool_limits(settings: Settings, workers: int) -> Dict[str, int]:
+    """Per-worker pool settings that keep every worker within the budget
+
+    Returns only the settings that have to change, as field name to value;
+    empty without a budget or when the configured pools already fit.
+    """
+    budget = settings.db_connection_budget
+    if budget <= 0:
+        return {}
+    share = budget // workers
+    if share < 1:
+        raise ValueError(
+            f"db_connection_budget={budget} can't give {workers} workers "
+            "a connection each; raise it or lower web_concurrency"
+        )
+    configured = max(
+        settings.db_pool_max_connections,
+        settings.db_pool_size + settings.db_max_overflow,
+    )
+    if configured <= share:
+        return {}
+    pool_size = min(settings.db_pool_size, share)
+    return {
+        "db_pool_size": pool_size,
+        "db_max_overflow": min(settings.db_max_overflow, share - pool_size),
+        "db_pool_max_connections": share,
+    }
+
+
+def worker_state_overrides(settings: Settings, workers: int) -> Dict[str, str]:
+    """Settings to change so that per-process state stays consistent
+
+    Returns field name to value, empty when nothing has to change.
+    """
+    if workers <= 1:
+        return {}
+    if settings.note_cache_backend == "memory" and not settings.note_cache_validate:
+        return {"note_cache_validate": "true"}
+    return {}
+
+
+def run() -> None:
+    settings = get_settings()
+    workers = worker_count(settings)
+    limits = worker_pool_limits(settings, workers)
+    for name, value in limits.items():
+        os.environ[name.upper()] = str(value)
+    if limits:
+        logger.warning(
+            "Scaled each worker's DB pool to %s to fit db_connection_budget=%d "
+            "across %d workers",
+            limits,
+            settings.db_connection_budget,
+            workers,
+        )
+    overrides = worker_state_overrides(settings, workers)
+    for name, value in overrides.items():
+        os.environ[name.upper()] = value
+    if overrides:
+        logger.warning(
+            "Validating in-process note cache hits against the database: %d "
+            "workers can't invalidate each other's copies; set "
+            "NOTE_CACHE_BACKEND=redis to share one cache instead",
+            workers,
+        )
+
+    uvicorn.run(
+        APP,
+        host=settings.host,
+        port=settings.port,
+        workers=workers,
+        loop="uvloop",
+        http="httptools",
+        timeout_graceful_shutdown=settings.shutdown_drain_seconds,
+    )
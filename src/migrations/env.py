@@ -34,6 +34,16 @@ if config.config_file_name is not None:
 # for 'autogenerate' support
 target_metadata = metadata
 
+# Dialect specific full-text search objects are managed by hand in migrations
+# and are not part of ``metadata``; keep autogenerate from dropping them.
+SEARCH_OBJECTS = {"search_vector", "ix_notes_search_vector"}
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    if name in SEARCH_OBJECTS or (type_ == "table" and name.startswith("notes_fts")):
+        return False
+    return True
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -56,6 +66,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -65,7 +76,11 @@ def run_migrations_offline() -> None:
 
 
 def do_run_migrations(connection: Connection) -> None:
-    context.configure(connection=connection, target_metadata=target_metadata)
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        include_object=include_object,
+    )
 
     with context.begin_transaction():
         context.run_migrations()
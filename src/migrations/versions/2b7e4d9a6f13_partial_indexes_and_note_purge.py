@@ -0,0 +1,79 @@
+"""Replace note flag indexes with partial indexes and track deletion time
+
+Revision ID: 2b7e4d9a6f13
+Revises: 9d3f6a1c2e54
+Create Date: 2026-10-17 16:08:44.730152
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "2b7e4d9a6f13"
+down_revision: Union[str, Sequence[str], None] = "9d3f6a1c2e54"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Must render exactly like app.db.note_is_live / note_is_deleted, or SQLite
+# won't use the partial indexes
+notes = sa.table(
+    "notes", sa.column("is_deleted", sa.Boolean), sa.column("deleted_date")
+)
+live = sa.not_(notes.c.is_deleted)
+deleted = notes.c.is_deleted == sa.true()
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("notes", sa.Column("deleted_date", sa.DateTime(), nullable=True))
+    # Existing soft-deleted notes start their retention period now
+    op.execute(notes.update().where(deleted).values(deleted_date=sa.func.now()))
+
+    op.drop_index("ix_notes_owner_listing", table_name="notes")
+    op.drop_index(op.f("ix_notes_is_deleted"), table_name="notes")
+    op.drop_index(op.f("ix_notes_completed"), table_name="notes")
+
+    op.create_index(
+        "ix_notes_owner_live",
+        "notes",
+        ["owner_id", sa.text("created_date DESC"), sa.text("id DESC")],
+        unique=False,
+        postgresql_where=live,
+        sqlite_where=live,
+    )
+    op.create_index(
+        "ix_notes_owner_completed_live",
+        "notes",
+        ["owner_id", "completed", sa.text("created_date DESC"), sa.text("id DESC")],
+        unique=False,
+        postgresql_where=live,
+        sqlite_where=live,
+    )
+    op.create_index(
+        "ix_notes_deleted_date",
+        "notes",
+        ["deleted_date"],
+        unique=False,
+        postgresql_where=deleted,
+        sqlite_where=deleted,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_notes_deleted_date", table_name="notes")
+    op.drop_index("ix_notes_owner_completed_live", table_name="notes")
+    op.drop_index("ix_notes_owner_live", table_name="notes")
+
+    op.create_index(op.f("ix_notes_completed"), "notes", ["completed"], unique=False)
+    op.create_index(op.f("ix_notes_is_deleted"), "notes", ["is_deleted"], unique=False)
+    op.create_index(
+        "ix_notes_owner_listing",
+        "notes",
+        ["owner_id", "is_deleted", sa.text("created_date DESC"), sa.text("id DESC")],
+        unique=False,
+    )
+    op.drop_column("notes", "deleted_date")
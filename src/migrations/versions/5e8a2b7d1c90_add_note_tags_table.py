@@ -0,0 +1,85 @@
+"""Add normalized note_tags table
+
+Revision ID: 5e8a2b7d1c90
+Revises: c4e1f0a9b237
+Create Date: 2026-10-17 12:03:18.226471
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "5e8a2b7d1c90"
+down_revision: Union[str, Sequence[str], None] = "c4e1f0a9b237"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "note_tags",
+        sa.Column("note_id", sa.Integer(), nullable=False),
+        sa.Column("tag", sa.String(length=100), nullable=False),
+        sa.Column("owner_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["note_id"], ["notes.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["owner_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("note_id", "tag"),
+    )
+    op.create_index(
+        "ix_note_tags_owner_tag",
+        "note_tags",
+        ["owner_id", "tag", "note_id"],
+        unique=False,
+    )
+
+    # Backfill from the JSON tags column. Tags longer than the column predate
+    # the API's 100 character limit; they stay in notes.tags but can't be
+    # filtered on
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        op.execute(
+            """
+            INSERT INTO note_tags (note_id, owner_id, tag)
+            SELECT DISTINCT notes.id, notes.owner_id, t.tag
+            FROM notes, json_array_elements_text(notes.tags) AS t(tag)
+            WHERE json_typeof(notes.tags) = 'array'
+                AND char_length(t.tag) BETWEEN 1 AND 100
+            ON CONFLICT DO NOTHING
+            """
+        )
+    elif dialect == "sqlite":
+        op.execute(
+            """
+            INSERT OR IGNORE INTO note_tags (note_id, owner_id, tag)
+            SELECT DISTINCT notes.id, notes.owner_id, json_each.value
+            FROM notes, json_each(notes.tags)
+            WHERE json_each.type = 'text'
+                AND length(json_each.value) BETWEEN 1 AND 100
+            """
+        )
+    else:
+        bind = op.get_bind()
+        notes = sa.table(
+            "notes", sa.column("id"), sa.column("owner_id"), sa.column("tags", sa.JSON)
+        )
+        note_tags = sa.table(
+            "note_tags", sa.column("note_id"), sa.column("owner_id"), sa.column("tag")
+        )
+        rows = [
+            {"note_id": note.id, "owner_id": note.owner_id, "tag": tag}
+            for note in bind.execute(sa.select(notes))
+            for tag in dict.fromkeys(note.tags or [])
+            if isinstance(tag, str) and 1 <= len(tag) <= 100
+        ]
+        if rows:
+            op.bulk_insert(note_tags, rows)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_note_tags_owner_tag", table_name="note_tags")
+    op.drop_table("note_tags")
@@ -0,0 +1,61 @@
+"""Add per-owner note counts for listing totals
+
+Revision ID: 6a4f1c8e3b70
+Revises: 2b7e4d9a6f13
+Create Date: 2026-10-17 18:41:12.305918
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "6a4f1c8e3b70"
+down_revision: Union[str, Sequence[str], None] = "2b7e4d9a6f13"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+notes = sa.table(
+    "notes",
+    sa.column("owner_id", sa.Integer),
+    sa.column("completed", sa.Boolean),
+    sa.column("is_deleted", sa.Boolean),
+)
+note_counts = sa.table(
+    "note_counts",
+    sa.column("owner_id", sa.Integer),
+    sa.column("total", sa.Integer),
+    sa.column("completed", sa.Integer),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "note_counts",
+        sa.Column("owner_id", sa.Integer(), nullable=False),
+        sa.Column("total", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("completed", sa.Integer(), server_default="0", nullable=False),
+        sa.ForeignKeyConstraint(["owner_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("owner_id"),
+    )
+    # Seed the counters from the live notes; writes keep them current from here
+    op.execute(
+        note_counts.insert().from_select(
+            ["owner_id", "total", "completed"],
+            sa.select(
+                notes.c.owner_id,
+                sa.func.count(),
+                sa.func.sum(sa.case((notes.c.completed, 1), else_=0)),
+            )
+            .where(sa.not_(notes.c.is_deleted))
+            .group_by(notes.c.owner_id),
+        )
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("note_counts")
@@ -0,0 +1,38 @@
+"""Add composite owner listing index for keyset pagination
+
+Revision ID: 7b2d9c41e8a3
+Revises: 3fcc41254e35
+Create Date: 2026-10-17 09:12:04.318275
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "7b2d9c41e8a3"
+down_revision: Union[str, Sequence[str], None] = "3fcc41254e35"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        "ix_notes_owner_listing",
+        "notes",
+        [
+            "owner_id",
+            "is_deleted",
+            sa.text("created_date DESC"),
+            sa.text("id DESC"),
+        ],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_notes_owner_listing", table_name="notes")
@@ -0,0 +1,37 @@
+"""Add note versions for ETags
+
+Revision ID: 9d3f6a1c2e54
+Revises: 5e8a2b7d1c90
+Create Date: 2026-10-17 14:22:05.418337
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "9d3f6a1c2e54"
+down_revision: Union[str, Sequence[str], None] = "5e8a2b7d1c90"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Constant server defaults backfill existing rows, including on SQLite
+    op.add_column(
+        "users",
+        sa.Column("notes_version", sa.Integer(), server_default="1", nullable=False),
+    )
+    op.add_column(
+        "notes",
+        sa.Column("version", sa.Integer(), server_default="1", nullable=False),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("notes", "version")
+    op.drop_column("users", "notes_version")
@@ -0,0 +1,87 @@
+"""Add full-text search index for notes
+
+Revision ID: c4e1f0a9b237
+Revises: 7b2d9c41e8a3
+Create Date: 2026-10-17 10:41:37.902114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c4e1f0a9b237"
+down_revision: Union[str, Sequence[str], None] = "7b2d9c41e8a3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        # Generated column: Postgres keeps it current and backfills on ADD
+        op.execute(
+            """
+            ALTER TABLE notes ADD COLUMN search_vector tsvector
+            GENERATED ALWAYS AS (
+                setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+                setweight(to_tsvector('english', coalesce(description, '')), 'B')
+            ) STORED
+            """
+        )
+        op.execute(
+            "CREATE INDEX ix_notes_search_vector ON notes USING gin (search_vector)"
+        )
+    elif dialect == "sqlite":
+        op.execute(
+            """
+            CREATE VIRTUAL TABLE notes_fts USING fts5(
+                title, description, content='notes', content_rowid='id',
+                tokenize='porter unicode61'
+            )
+            """
+        )
+        op.execute(
+            """
+            CREATE TRIGGER notes_fts_ai AFTER INSERT ON notes BEGIN
+                INSERT INTO notes_fts(rowid, title, description)
+                VALUES (new.id, new.title, new.description);
+            END
+            """
+        )
+        op.execute(
+            """
+            CREATE TRIGGER notes_fts_ad AFTER DELETE ON notes BEGIN
+                INSERT INTO notes_fts(notes_fts, rowid, title, description)
+                VALUES ('delete', old.id, old.title, old.description);
+            END
+            """
+        )
+        op.execute(
+            """
+            CREATE TRIGGER notes_fts_au AFTER UPDATE OF title, description ON notes
+            BEGIN
+                INSERT INTO notes_fts(notes_fts, rowid, title, description)
+                VALUES ('delete', old.id, old.title, old.description);
+                INSERT INTO notes_fts(rowid, title, description)
+                VALUES (new.id, new.title, new.description);
+            END
+            """
+        )
+        # Index the notes that already exist
+        op.execute("INSERT INTO notes_fts(notes_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        op.execute("DROP INDEX IF EXISTS ix_notes_search_vector")
+        op.execute("ALTER TABLE notes DROP COLUMN IF EXISTS search_vector")
+    elif dialect == "sqlite":
+        op.execute("DROP TRIGGER IF EXISTS notes_fts_au")
+        op.execute("DROP TRIGGER IF EXISTS notes_fts_ad")
+        op.execute("DROP TRIGGER IF EXISTS notes_fts_ai")
+        op.execute("DROP TABLE IF EXISTS notes_fts")
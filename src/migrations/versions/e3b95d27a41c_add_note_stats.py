@@ -0,0 +1,132 @@
+"""Add deleted, per-tag and per-day note counts for note statistics
+
+Revision ID: e3b95d27a41c
+Revises: 6a4f1c8e3b70
+Create Date: 2026-10-17 20:12:37.581046
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e3b95d27a41c"
+down_revision: Union[str, Sequence[str], None] = "6a4f1c8e3b70"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+notes = sa.table(
+    "notes",
+    sa.column("id", sa.Integer),
+    sa.column("owner_id", sa.Integer),
+    sa.column("completed", sa.Boolean),
+    sa.column("is_deleted", sa.Boolean),
+    sa.column("created_date", sa.DateTime),
+)
+note_tags = sa.table(
+    "note_tags",
+    sa.column("note_id", sa.Integer),
+    sa.column("owner_id", sa.Integer),
+    sa.column("tag", sa.String),
+)
+note_counts = sa.table(
+    "note_counts",
+    sa.column("owner_id", sa.Integer),
+    sa.column("total", sa.Integer),
+    sa.column("completed", sa.Integer),
+    sa.column("deleted", sa.Integer),
+)
+note_tag_counts = sa.table(
+    "note_tag_counts",
+    sa.column("owner_id", sa.Integer),
+    sa.column("tag", sa.String),
+    sa.column("count", sa.Integer),
+)
+note_day_counts = sa.table(
+    "note_day_counts",
+    sa.column("owner_id", sa.Integer),
+    sa.column("day", sa.Date),
+    sa.column("count", sa.Integer),
+)
+# Must render exactly like app.db.note_is_live / note_is_deleted
+live = sa.not_(notes.c.is_deleted)
+deleted = notes.c.is_deleted == sa.true()
+
+
+def _count_if(condition):
+    return sa.func.sum(sa.case((condition, 1), else_=0))
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "note_counts",
+        sa.Column("deleted", sa.Integer(), server_default="0", nullable=False),
+    )
+    op.create_index(
+        "ix_notes_owner_deleted",
+        "notes",
+        ["owner_id"],
+        unique=False,
+        postgresql_where=deleted,
+        sqlite_where=deleted,
+    )
+    op.create_table(
+        "note_tag_counts",
+        sa.Column("owner_id", sa.Integer(), nullable=False),
+        sa.Column("tag", sa.String(length=100), nullable=False),
+        sa.Column("count", sa.Integer(), server_default="0", nullable=False),
+        sa.ForeignKeyConstraint(["owner_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("owner_id", "tag"),
+    )
+    op.create_table(
+        "note_day_counts",
+        sa.Column("owner_id", sa.Integer(), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("count", sa.Integer(), server_default="0", nullable=False),
+        sa.ForeignKeyConstraint(["owner_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("owner_id", "day"),
+    )
+
+    # Owners with only soft-deleted notes have no counter row yet, so the
+    # counters are rebuilt from the notes rather than extended in place
+    op.execute(note_counts.delete())
+    op.execute(
+        note_counts.insert().from_select(
+            ["owner_id", "total", "completed", "deleted"],
+            sa.select(
+                notes.c.owner_id,
+                _count_if(live),
+                _count_if(sa.and_(live, notes.c.completed)),
+                _count_if(deleted),
+            ).group_by(notes.c.owner_id),
+        )
+    )
+    op.execute(
+        note_tag_counts.insert().from_select(
+            ["owner_id", "tag", "count"],
+            sa.select(note_tags.c.owner_id, note_tags.c.tag, sa.func.count())
+            .select_from(note_tags.join(notes, notes.c.id == note_tags.c.note_id))
+            .where(live)
+            .group_by(note_tags.c.owner_id, note_tags.c.tag),
+        )
+    )
+    day = sa.func.date(notes.c.created_date)
+    op.execute(
+        note_day_counts.insert().from_select(
+            ["owner_id", "day", "count"],
+            sa.select(notes.c.owner_id, day, sa.func.count())
+            .where(live)
+            .group_by(notes.c.owner_id, day),
+        )
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("note_day_counts")
+    op.drop_table("note_tag_counts")
+    op.drop_index("ix_notes_owner_deleted", table_name="notes")
+    op.drop_column("note_counts", "deleted")
@@ -43,6 +43,7 @@ def token_headers(test_user):
 @pytest.fixture(autouse=True)
 def override_auth_dependencies(test_user):
     from app.api.dependencies import get_current_active_user, get_db
+    from app.db import get_read_db
 
     async def override_get_db():
         yield AsyncMock()
@@ -51,8 +52,31 @@ def override_auth_dependencies(test_user):
         return test_user
 
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
     app.dependency_overrides[get_current_active_user] = override_get_current_user
 
     yield
 
     app.dependency_overrides = {}
+
+
+@pytest.fixture(autouse=True)
+def mock_notes_version(monkeypatch):
+    """Fixed notes version for list ETags; tests may patch it again"""
+    from app.api import crud
+
+    async def get_notes_version(session, owner_id):
+        return 1
+
+    monkeypatch.setattr(crud, "get_notes_version", get_notes_version)
+
+
+@pytest.fixture(autouse=True)
+def mock_note_count(monkeypatch):
+    """Fixed exact listing total; tests may patch it again"""
+    from app.api import crud
+
+    async def count_notes(session, owner_id, **kwargs):
+        return 0, True
+
+    monkeypatch.setattr(crud, "count_notes", count_notes)
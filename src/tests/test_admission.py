@@ -0,0 +1,156 @@
+"""
+Tests for admission control and load shedding
+"""
+
+import asyncio
+
+import httpx
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+from app import admission
+from app.admission import AdmissionLimiter, RequestShed, requests_shed
+from app.middleware import AdmissionControlMiddleware
+
+
+def test_waiters_are_admitted_in_order():
+    limiter = AdmissionLimiter(1, max_queue=5, max_wait=1)
+    order = []
+
+    async def request(name, hold):
+        async with limiter.slot():
+            order.append(name)
+            await asyncio.sleep(hold)
+
+    async def scenario():
+        first = asyncio.create_task(request("first", 0.05))
+        await asyncio.sleep(0)
+        rest = [asyncio.create_task(request(name, 0)) for name in ("a", "b", "c")]
+        await asyncio.gather(first, *rest)
+
+    asyncio.run(scenario())
+    assert order == ["first", "a", "b", "c"]
+    assert limiter.in_flight == 0
+    assert limiter.queued == 0
+
+
+def test_full_queue_sheds_immediately():
+    limiter = AdmissionLimiter(1, max_queue=1, max_wait=1)
+
+    async def scenario():
+        release = asyncio.Event()
+
+        async def hold():
+            async with limiter.slot():
+                await release.wait()
+
+        tasks = [asyncio.create_task(hold()) for _ in range(2)]
+        await asyncio.sleep(0)
+        with pytest.raises(RequestShed) as shed:
+            await limiter._acquire()
+        release.set()
+        await asyncio.gather(*tasks)
+        return shed.value.reason
+
+    assert asyncio.run(scenario()) == "queue_full"
+
+
+def test_unreachable_deadline_sheds_without_waiting():
+    limiter = AdmissionLimiter(2, max_queue=10, max_wait=0.5)
+    limiter.in_flight = 2
+    limiter.service_time = 1.2  # each slot frees up every 1.2s on average
+
+    async def scenario():
+        with pytest.raises(RequestShed) as shed:
+            await limiter._acquire()
+        return shed.value.reason
+
+    assert asyncio.run(scenario()) == "deadline"
+    assert limiter.queued == 0
+
+
+def test_waiter_timing_out_is_shed_and_leaves_the_queue():
+    limiter = AdmissionLimiter(1, max_queue=10, max_wait=0.01)
+
+    async def scenario():
+        release = asyncio.Event()
+
+        async def hold():
+            async with limiter.slot():
+                await release.wait()
+
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        with pytest.raises(RequestShed) as shed:
+            await limiter._acquire()
+        queued = limiter.queued
+        release.set()
+        await holder
+        return shed.value.reason, queued
+
+    assert asyncio.run(scenario()) == ("deadline", 0)
+    assert limiter.in_flight == 0
+
+
+def test_slot_handed_over_as_the_deadline_passes_is_kept(monkeypatch):
+    """Test that a waiter timing out in the tick it gets the slot holds it"""
+    limiter = AdmissionLimiter(1, max_queue=10, max_wait=1)
+    limiter.in_flight = 1
+
+    async def release_then_time_out(waiter, timeout):
+        limiter._release()
+        raise asyncio.TimeoutError
+
+    monkeypatch.setattr(admission.asyncio, "wait_for", release_then_time_out)
+
+    async def scenario():
+        await limiter._acquire()
+        admitted = limiter.in_flight, limiter.queued
+        limiter._release()
+        return admitted
+
+    assert asyncio.run(scenario()) == (1, 0)
+    assert limiter.in_flight == 0
+
+
+def test_middleware_returns_503_with_retry_after():
+    started = asyncio.Event()
+
+    async def slow(request):
+        started.set()
+        await asyncio.sleep(0.2)
+        return PlainTextResponse("done")
+
+    async def health(request):
+        return PlainTextResponse("ok")
+
+    app = Starlette(routes=[Route("/notes", slow), Route("/healthz", health)])
+    limiter = AdmissionLimiter(1, max_queue=0, max_wait=0.5)
+    app = AdmissionControlMiddleware(
+        app, {"read": limiter}, exempt_paths=frozenset({"/healthz"})
+    )
+    shed_before = requests_shed.labels("read", "queue_full").value
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://t") as client:
+            first = asyncio.create_task(client.get("/notes"))
+            await started.wait()
+            shed = await client.get("/notes")
+            health = await client.get("/healthz")
+            return (await first), shed, health
+
+    first, shed, health = asyncio.run(scenario())
+    assert first.status_code == 200
+    assert shed.status_code == 503
+    assert shed.headers["Retry-After"] == "1"
+    assert health.status_code == 200
+    assert requests_shed.labels("read", "queue_full").value == shed_before + 1
+
+
+def test_metrics_endpoint_exports_shed_requests(test_app):
+    response = test_app.get("/metrics")
+    assert "# TYPE http_requests_shed_total counter" in response.text
+    assert 'admission_in_flight{class="read"}' in response.text
@@ -1,4 +1,12 @@
+import asyncio
+import hashlib
+from datetime import timedelta
+
+import pytest
+from jose import JWTError
+
 from app.api import crud, security
+from app.api.dependencies import get_current_user
 
 
 class TestAuth:
@@ -84,3 +92,89 @@ class TestAuth:
             "/auth/token", data={"username": "wrong", "password": "wrong"}
         )
         assert response.status_code == 401
+
+    def test_login_hashing_pool_saturated(self, test_app, monkeypatch):
+        test_user_data = {
+            "id": 1,
+            "username": "testuser",
+            "hashed_password": "not-checked",
+        }
+
+        async def mock_get_user(session, username):
+            return test_user_data
+
+        monkeypatch.setattr(crud, "get_user_by_username", mock_get_user)
+        pool = security.hash_pool
+        monkeypatch.setattr(pool, "in_flight", pool.workers + pool.max_queue)
+        rejected = pool.rejected
+
+        response = test_app.post(
+            "/auth/token", data={"username": "testuser", "password": "password123"}
+        )
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "1"
+        assert pool.rejected == rejected + 1
+
+    def test_current_user_is_cached(self, monkeypatch):
+        calls = []
+
+        async def mock_get_user(session, username):
+            calls.append(username)
+            return {
+                "id": 1,
+                "username": username,
+                "email": "cached@example.com",
+                "is_active": True,
+                "created_date": "2024-01-01T00:00:00",
+            }
+
+        monkeypatch.setattr(crud, "get_user_by_username", mock_get_user)
+        crud.user_cache.clear()
+        token = security.create_access_token(data={"sub": "cacheduser"})
+
+        first = asyncio.run(get_current_user(token=token, session=None))
+        second = asyncio.run(get_current_user(token=token, session=None))
+        assert first == second
+        assert first.username == "cacheduser"
+        assert calls == ["cacheduser"]
+        crud.user_cache.clear()
+
+    def test_verified_token_is_cached(self, monkeypatch):
+        token = security.create_access_token(data={"sub": "cacheduser"})
+        security.token_cache.clear()
+        calls = []
+        decode = security.jwt.decode
+
+        def counting_decode(*args, **kwargs):
+            calls.append(args[0])
+            return decode(*args, **kwargs)
+
+        monkeypatch.setattr(security.jwt, "decode", counting_decode)
+        first = security.decode_access_token(token)
+        second = security.decode_access_token(token)
+        assert first["sub"] == second["sub"] == "cacheduser"
+        assert calls == [token]
+        security.token_cache.clear()
+
+    def test_cached_token_expires_with_exp(self, monkeypatch):
+        security.token_cache.clear()
+        clock = [1000.0]
+        monkeypatch.setattr(security.token_cache, "_clock", lambda: clock[0])
+        token = security.create_access_token(
+            data={"sub": "shortlived"}, expires_delta=timedelta(seconds=5)
+        )
+        security.decode_access_token(token)
+        digest = hashlib.sha256(token.encode()).digest()
+
+        clock[0] += 4
+        assert security.token_cache.get(digest)["sub"] == "shortlived"
+        clock[0] += 2
+        assert security.token_cache.get(digest) is None
+        security.token_cache.clear()
+
+    def test_tampered_token_is_rejected(self):
+        token = security.create_access_token(data={"sub": "cacheduser"})
+        header, claims, signature = token.split(".")
+        forged = f"{header}.{claims}.{signature[:-4]}AAAA"
+        with pytest.raises(JWTError):
+            security.decode_access_token(forged)
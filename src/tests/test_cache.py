@@ -0,0 +1,256 @@
+"""
+Tests for the in-process TTL/LRU cache and the read-through note cache
+"""
+
+import asyncio
+from datetime import datetime
+from types import SimpleNamespace
+
+from app.api.serializers import dump_cached_note, load_cached_note
+from app.cache import (
+    KeyValueBackend,
+    LocalKeyValueStore,
+    MemoryBackend,
+    ReadThroughCache,
+    TTLCache,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_cache_hit_and_miss_counters():
+    cache = TTLCache(maxsize=2, ttl=10)
+    assert cache.get("a") is None
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["hit_ratio"] == 0.5
+
+
+def test_cache_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2, ttl=10)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_cache_entries_expire():
+    clock = FakeClock()
+    cache = TTLCache(maxsize=2, ttl=10, clock=clock)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=5)
+    clock.now = 6
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    clock.now = 11
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_cache_pop_and_disabled():
+    cache = TTLCache(maxsize=2, ttl=10)
+    cache.set("a", 1)
+    cache.pop("a")
+    assert cache.get("a") is None
+
+    disabled = TTLCache(maxsize=2, ttl=0)
+    disabled.set("a", 1)
+    assert disabled.get("a") is None
+
+
+def test_read_through_cache_memory_backend_returns_copies():
+    cache = ReadThroughCache(MemoryBackend(maxsize=10, ttl=30), ttl=30)
+
+    async def scenario():
+        assert await cache.get("1") is None
+        await cache.set("1", {"id": 1, "version": 2})
+        first = await cache.get("1")
+        first.pop("version")
+        return await cache.get("1")
+
+    assert asyncio.run(scenario()) == {"id": 1, "version": 2}
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (2, 1, 1)
+
+
+def test_read_through_cache_drops_values_loaded_across_invalidation():
+    clock = FakeClock()
+    backends = [
+        MemoryBackend(maxsize=10, ttl=30, clock=clock),
+        KeyValueBackend(
+            LocalKeyValueStore(clock=clock),
+            dumps=dump_cached_note,
+            loads=load_cached_note,
+        ),
+    ]
+    note = {
+        "title": "title",
+        "description": "description",
+        "completed": False,
+        "tags": [],
+        "id": 1,
+        "created_date": datetime(2024, 1, 2),
+        "is_deleted": False,
+        "owner_id": 1,
+        "version": 1,
+    }
+
+    async def scenario(cache):
+        await cache.set("1", note)
+        # Another worker commits and invalidates while this one loads
+        await cache.invalidate(["1"])
+        after_write = await cache.get("1")
+        await cache.set("1", note)
+        stale = await cache.get("1")
+        clock.now += 6
+        await cache.set("1", dict(note, version=2))
+        return after_write, stale, await cache.get("1")
+
+    for backend in backends:
+        clock.now = 0
+        cache = ReadThroughCache(backend, ttl=30, tombstone_ttl=5)
+        after_write, stale, reloaded = asyncio.run(scenario(cache))
+        assert after_write is None
+        assert stale is None
+        assert reloaded["version"] == 2
+
+
+def test_key_value_backend_with_local_store():
+    clock = FakeClock()
+    backend = KeyValueBackend(
+        LocalKeyValueStore(clock=clock),
+        dumps=dump_cached_note,
+        loads=load_cached_note,
+        prefix="note:",
+    )
+    cache = ReadThroughCache(backend, ttl=5)
+    note = {
+        "title": "title",
+        "description": "description",
+        "completed": False,
+        "tags": ["a"],
+        "id": 1,
+        "created_date": datetime(2024, 1, 2, 3, 4, 5),
+        "is_deleted": False,
+        "owner_id": 1,
+        "version": 3,
+    }
+
+    async def scenario():
+        await cache.set("1", note)
+        cached = await cache.get("1")
+        clock.now = 6
+        expired = await cache.get("1")
+        return cached, expired
+
+    cached, expired = asyncio.run(scenario())
+    assert cached == note
+    assert expired is None
+    assert cache.stats()["size"] is None
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def mappings(self):
+        return self
+
+    def first(self):
+        return self.rows[0] if self.rows else None
+
+    def scalars(self):
+        return iter(self.rows)
+
+    def scalar_one(self):
+        return self.rows[0]
+
+    def scalar(self):
+        return self.rows[0] if self.rows else None
+
+    def all(self):
+        return self.rows
+
+
+class FakeSession:
+    """Answers every execute with the next queued result"""
+
+    def __init__(self, *results):
+        self.results = list(results)
+        self.executed = 0
+
+    async def execute(self, query, params=None):
+        self.executed += 1
+        return FakeResult(self.results.pop(0))
+
+    def get_bind(self):
+        return SimpleNamespace(dialect=SimpleNamespace(name="sqlite"))
+
+    async def commit(self):
+        pass
+
+    async def rollback(self):
+        pass
+
+
+def test_crud_get_reads_through_and_delete_all_invalidates(monkeypatch):
+    from app.api import crud
+
+    cache = ReadThroughCache(MemoryBackend(maxsize=10, ttl=30), ttl=30)
+    monkeypatch.setattr(crud, "note_cache", cache)
+    row = {"id": 1, "owner_id": 1, "version": 1}
+
+    async def scenario():
+        created = datetime(2026, 1, 1)
+        deleted = [
+            SimpleNamespace(id=1, completed=False, tags=[], created_date=created),
+            SimpleNamespace(id=4, completed=True, tags=[], created_date=created),
+        ]
+        # get, version bump, soft delete, note/day counter upserts, then get
+        # again
+        session = FakeSession([row], [2], deleted, [], [], [dict(row, version=3)])
+        await crud.get(session, 1)
+        await crud.get(session, 1)
+        reads_while_cached = session.executed
+        assert await crud.delete_all(session, owner_id=1) == 2
+        note = await crud.get(session, 1)
+        return reads_while_cached, note
+
+    reads_while_cached, note = asyncio.run(scenario())
+    assert reads_while_cached == 1
+    assert note["version"] == 3
+    assert cache.stats()["hits"] == 1
+
+
+def test_crud_get_validates_cached_versions(monkeypatch):
+    from app.api import crud
+
+    cache = ReadThroughCache(MemoryBackend(maxsize=10, ttl=30), ttl=30)
+    monkeypatch.setattr(crud, "note_cache", cache)
+    monkeypatch.setattr(crud.settings, "note_cache_validate", True)
+    row = {"id": 1, "owner_id": 1, "version": 1}
+
+    async def scenario():
+        # load, matching version check, then another worker's write bumps
+        # the version: stale check and reload, then the note is deleted
+        session = FakeSession([row], [1], [2], [dict(row, version=2)], [])
+        notes = [await crud.get(session, 1) for _ in range(3)]
+        notes.append(await crud.get(session, 1))
+        return notes, session
+
+    notes, session = asyncio.run(scenario())
+    assert [note["version"] for note in notes[:3]] == [1, 1, 2]
+    assert notes[3] is None
+    assert session.executed == 5
+    assert cache.stats()["hits"] == 2
@@ -0,0 +1,75 @@
+"""
+Tests for the Prometheus metrics registry and endpoint
+"""
+
+from app.metrics import Registry, statement_labels
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = Registry()
+    latency = registry.histogram("latency_seconds", "Latency", ("route",), (0.1, 1))
+    latency.labels("/a").observe(0.05)
+    latency.labels("/a").observe(0.5)
+    latency.labels("/a").observe(5)
+
+    text = registry.render()
+    assert '# TYPE latency_seconds histogram' in text
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{route="/a",le="1"} 2' in text
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 3' in text
+    assert 'latency_seconds_count{route="/a"} 3' in text
+
+
+def test_counter_and_collector_render():
+    registry = Registry()
+    registry.counter("jobs", "Jobs run", ("kind",)).labels('say "hi"').inc(2)
+    registry.register_collector(lambda: [("pool_size", "gauge", "Size", [({}, 5)])])
+
+    text = registry.render()
+    assert "# TYPE jobs_total counter" in text
+    assert 'jobs_total{kind="say \\"hi\\""} 2' in text
+    assert "pool_size 5" in text
+
+
+def test_statement_labels():
+    assert statement_labels("SELECT notes.id FROM notes WHERE x") == ("select", "notes")
+    assert statement_labels('UPDATE "notes" SET title=?') == ("update", "notes")
+    assert statement_labels("INSERT INTO note_tags VALUES (?)") == ("insert", "note_tags")
+
+
+def test_metrics_endpoint_labels_route_template(test_app, token_headers, monkeypatch):
+    from app.api import crud
+
+    async def mock_get(session, id):
+        return None
+
+    monkeypatch.setattr(crud, "get", mock_get)
+    test_app.get("/notes/12345", headers=token_headers)
+
+    response = test_app.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert (
+        'http_requests_total{method="GET",route="/notes/{id}",status="404"}'
+        in response.text
+    )
+    assert "/notes/12345" not in response.text
+    assert "db_pool_checkout_wait_seconds" in response.text
+
+
+def test_metrics_endpoint_declares_each_family_once(test_app):
+    """Test that every family has one TYPE line and every sample a family"""
+    text = test_app.get("/metrics").text
+    declared = [line.split()[2] for line in text.splitlines() if line.startswith("# TYPE")]
+    assert len(declared) == len(set(declared))
+    assert {"cache_size", "cache_hits_total", "cache_misses_total"} <= set(declared)
+
+    suffixes = ("_bucket", "_count", "_sum")
+    for line in text.splitlines():
+        if not line or line.startswith("#"):
+            continue
+        name = line.split("{")[0].split(" ")[0]
+        families = {name} | {name[: -len(s)] for s in suffixes if name.endswith(s)}
+        assert families & set(declared), name
+    assert 'cache_hits_total{cache="user"}' in text
+    assert 'cache_hits_total{cache="token"}' in text
@@ -0,0 +1,303 @@
+"""
+Tests for per-owner note statistics and listing totals
+"""
+
+import asyncio
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from sqlalchemy import event, func, select, update
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app import stats
+from app.api import crud
+from app.api.models import NoteSchema
+from app.db import metadata, note_counts, note_tag_counts, notes, users
+
+# conftest patches crud.count_notes for the API tests
+count_notes = crud.count_notes
+# SQLite stamps created_date in UTC
+TODAY = datetime.now(timezone.utc).date()
+
+
+def _payload(title="a note", completed=False, tags=()):
+    return NoteSchema(
+        title=title, description="body text", completed=completed, tags=list(tags)
+    )
+
+
+async def _exact_counts(session, owner_id):
+    """The counts the counters must agree with, by COUNT(*)"""
+    live = select(func.count()).where(
+        notes.c.owner_id == owner_id, ~notes.c.is_deleted
+    )
+    total = await session.scalar(live)
+    completed = await session.scalar(live.where(notes.c.completed))
+    return total, completed
+
+
+async def _setup(engine, owners=(1,)):
+    async with engine.begin() as conn:
+        await conn.run_sync(metadata.create_all)
+        await conn.execute(
+            users.insert(),
+            [
+                {
+                    "id": owner,
+                    "username": f"user{owner}",
+                    "email": f"user{owner}@example.com",
+                    "hashed_password": "x",
+                }
+                for owner in owners
+            ],
+        )
+
+
+def test_counters_follow_every_write(tmp_path):
+    """Test that post, post_many, put and deletes keep the counters exact"""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'counts.db'}")
+    session_factory = async_sessionmaker(engine, class_=AsyncSession)
+    observed = []
+
+    async def check(session, label):
+        row = (
+            await session.execute(
+                select(note_counts.c.total, note_counts.c.completed).where(
+                    note_counts.c.owner_id == 1
+                )
+            )
+        ).one_or_none()
+        observed.append((label, tuple(row or (0, 0)), await _exact_counts(session, 1)))
+
+    async def scenario():
+        await _setup(engine, owners=(1, 2))
+        async with session_factory() as session:
+            first = await crud.post(session, _payload(completed=True), 1)
+            await check(session, "post")
+            ids = await crud.post_many(
+                session, [_payload(), _payload(completed=True), _payload()], 1
+            )
+            await crud.post(session, _payload(), 2)
+            await check(session, "post_many")
+            await crud.put(session, ids[0], _payload(completed=True), 1)
+            await crud.put(session, first["id"], _payload(completed=True), 1)
+            await check(session, "put")
+            assert await crud.put(session, 999, _payload(completed=True), 1) is None
+            await check(session, "put missing")
+            await crud.delete_note(session, ids[1], 1)
+            await check(session, "delete_note")
+            assert await crud.delete_note(session, ids[1], 1) is None
+            await check(session, "delete_note again")
+            assert await count_notes(session, 1, completed=False) == (1, True)
+            await crud.delete_all(session, 1)
+            await check(session, "delete_all")
+            assert await count_notes(session, 2) == (1, True)
+        await engine.dispose()
+
+    asyncio.run(scenario())
+    for label, counters, exact in observed:
+        assert counters == exact, label
+    assert [counters for _, counters, _ in observed] == [
+        (1, 1),
+        (4, 2),
+        (4, 3),
+        (4, 3),
+        (3, 2),
+        (3, 2),
+        (0, 0),
+    ]
+
+
+def test_filtered_counts_are_capped(tmp_path):
+    """Test that search and tag counts stop at the limit"""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'counts.db'}")
+    session_factory = async_sessionmaker(engine, class_=AsyncSession)
+
+    async def scenario():
+        await _setup(engine)
+        async with session_factory() as session:
+            await crud.post_many(
+                session,
+                [_payload("meeting notes", tags=["work"]) for _ in range(5)]
+                + [_payload("shopping list", tags=["home"]) for _ in range(3)],
+                1,
+            )
+            counts = (
+                await count_notes(session, 1, search="meeting", limit=10),
+                await count_notes(session, 1, search="meeting", limit=4),
+                await count_notes(session, 1, tags=["home"], limit=3),
+                await count_notes(session, 1, tags=["work", "home"], tag_mode="any"),
+                await count_notes(session, 1, search="  "),
+            )
+        await engine.dispose()
+        return counts
+
+    counts = asyncio.run(scenario())
+    assert counts == ((5, True), (4, False), (3, True), (8, True), (8, True))
+
+
+def test_stats_match_a_rebuild_after_every_kind_of_write(tmp_path):
+    """Test that incremental tag, day and deleted counts equal recomputed ones"""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'stats.db'}")
+    session_factory = async_sessionmaker(engine, class_=AsyncSession)
+    since = TODAY - timedelta(days=7)
+
+    async def scenario():
+        await _setup(engine)
+        async with session_factory() as session:
+            first = await crud.post(
+                session, _payload(tags=["work", "urgent", "work"]), 1
+            )
+            ids = await crud.post_many(
+                session,
+                [
+                    _payload(tags=["work"]),
+                    _payload(completed=True, tags=["home"]),
+                    _payload(tags=["home", "ideas"]),
+                ],
+                1,
+            )
+            await crud.put(session, ids[0], _payload(completed=True, tags=["home"]), 1)
+            await crud.delete_note(session, first["id"], 1)
+            await crud.delete_note(session, ids[2], 1)
+            # The first deletion is past retention
+            await session.execute(
+                update(notes)
+                .where(notes.c.id == first["id"])
+                .values(deleted_date=func.datetime("now", "-2 days"))
+            )
+            await session.commit()
+            await crud.purge_deleted_notes(session, timedelta(days=1))
+            incremental = await crud.get_note_stats(session, 1, since=since)
+            await crud.rebuild_note_stats(session, 1)
+            rebuilt = await crud.get_note_stats(session, 1, since=since)
+        await engine.dispose()
+        return incremental, rebuilt
+
+    incremental, rebuilt = asyncio.run(scenario())
+    assert incremental == rebuilt
+    assert incremental["total"] == 2
+    assert incremental["completed"] == 2
+    assert incremental["deleted"] == 1
+    # "work" and "urgent" left with the deleted notes; zero counts are hidden
+    assert incremental["tags"] == {"home": 2}
+    assert sum(day["count"] for day in incremental["created_per_day"]) == 2
+
+
+def test_rebuild_command_repairs_every_user(tmp_path):
+    """Test that the rebuild pages through all users and fixes drift"""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'stats.db'}")
+    session_factory = async_sessionmaker(engine, class_=AsyncSession)
+
+    async def scenario():
+        await _setup(engine, owners=(1, 2, 3))
+        async with session_factory() as session:
+            await crud.post(session, _payload(tags=["work"]), 1)
+            await crud.post(session, _payload(completed=True), 3)
+            await session.execute(update(note_counts).values(total=99, completed=7))
+            await session.execute(
+                note_tag_counts.insert().values(owner_id=2, tag="stale", count=5)
+            )
+            await session.commit()
+        rebuilt = await stats.rebuild(session_factory, batch_size=2)
+        async with session_factory() as session:
+            result = [
+                await crud.get_note_stats(session, owner, since=TODAY)
+                for owner in (1, 2, 3)
+            ]
+        await engine.dispose()
+        return rebuilt, result
+
+    rebuilt, result = asyncio.run(scenario())
+    assert rebuilt == 3
+    assert [(s["total"], s["completed"], s["tags"]) for s in result] == [
+        (1, 0, {"work": 1}),
+        (0, 0, {}),
+        (1, 1, {}),
+    ]
+    assert result[0]["created_per_day"] == [{"day": TODAY, "count": 1}]
+
+
+def test_legacy_tags_outside_note_tags_leave_stats_alone(tmp_path):
+    """Test that writes to notes with tags the backfill skipped keep stats exact"""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'stats.db'}")
+    session_factory = async_sessionmaker(engine, class_=AsyncSession)
+
+    async def scenario():
+        await _setup(engine, owners=(1,))
+        async with session_factory() as session:
+            first = await crud.post(session, _payload(tags=["work"]), 1)
+            second = await crud.post(session, _payload(tags=["work"]), 1)
+            # As left by the note_tags backfill for pre-limit data
+            await session.execute(
+                update(notes)
+                .where(notes.c.id.in_([first["id"], second["id"]]))
+                .values(tags=["work", "x" * 150, 7])
+            )
+            await session.commit()
+            await crud.put(session, first["id"], _payload(tags=["home"]), 1)
+            await crud.delete_note(session, second["id"], 1)
+            incremental = await crud.get_note_stats(session, 1, since=TODAY)
+            await crud.rebuild_note_stats(session, 1)
+            rebuilt = await crud.get_note_stats(session, 1, since=TODAY)
+        await engine.dispose()
+        return incremental, rebuilt
+
+    incremental, rebuilt = asyncio.run(scenario())
+    assert incremental == rebuilt
+    assert incremental["tags"] == {"home": 1}
+
+
+def test_writes_send_only_the_statements_they_need(tmp_path):
+    """Test that creating skips the tag DELETE and unchanged tags aren't rewritten"""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'counts.db'}")
+    session_factory = async_sessionmaker(engine, class_=AsyncSession)
+    statements = []
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement.split(None, 3)[:3])
+
+    async def scenario():
+        await _setup(engine)
+        async with session_factory() as session:
+            statements.clear()
+            note = await crud.post(session, _payload(tags=["work"]), 1)
+            created = list(statements)
+            statements.clear()
+            await crud.put(session, note["id"], _payload(tags=["work"]), 1)
+            updated = list(statements)
+        await engine.dispose()
+        return created, updated
+
+    created, updated = asyncio.run(scenario())
+    # version bump, note, tag row, then note, tag and day counters
+    assert len(created) == 6
+    assert not any(words[:2] == ["DELETE", "FROM"] for words in created)
+    # version bump, previous row, note; tags and counters are unchanged
+    assert [words[0] for words in updated] == ["UPDATE", "SELECT", "UPDATE"]
+
+
+def test_postgres_sends_a_write_and_its_statistics_as_one_statement():
+    sent = []
+
+    class PostgresSession:
+        def get_bind(self):
+            return SimpleNamespace(dialect=SimpleNamespace(name="postgresql"))
+
+        async def execute(self, statement, *args):
+            sent.append(str(statement.compile(dialect=postgresql.dialect())))
+
+    session = PostgresSession()
+    tags = Counter({"work": 1, "home": -1})
+    statements = [
+        *crud._tag_changes(session, 5, 1, tags),
+        *crud._note_stats_changes(session, 1, completed=1, tags=tags),
+    ]
+    asyncio.run(crud._execute_all(session, statements))
+
+    assert len(statements) == 4
+    assert len(sent) == 1
+    assert sent[0].startswith("WITH write_0 AS")
@@ -2,8 +2,12 @@
 Comprehensive tests for the Notes API endpoints
 """
 
+import csv
+import io
+import json
+
 import pytest
-from datetime import datetime
+from datetime import date, datetime, timedelta, timezone
 from app.api import crud
 
 
@@ -35,13 +39,9 @@ class TestCreateNote:
         }
 
         async def mock_post(session, payload, owner_id):
-            return 1
-
-        async def mock_get(session, id):
             return test_response_payload
 
         monkeypatch.setattr(crud, "post", mock_post)
-        monkeypatch.setattr(crud, "get", mock_get)
 
         response = test_app.post("/notes/", json=test_request_payload)
         assert response.status_code == 201
@@ -70,27 +70,109 @@ class TestCreateNote:
         """Test note creation with invalid payloads"""
 
         async def mock_post(session, payload, owner_id):
-            return 1
-
-        async def mock_get(session, id):
             return {
                 "id": 1,
-                "title": test_payload.get("title", ""),
-                "description": test_payload.get("description", ""),
-                "completed": test_payload.get("completed", False),
+                "title": payload.title,
+                "description": payload.description,
+                "completed": payload.completed,
                 "is_deleted": False,
-                "tags": test_payload.get("tags", []),
-                "owner_id": test_user.id,
+                "tags": payload.tags,
+                "owner_id": owner_id,
                 "created_date": get_iso_date(),
             }
 
         monkeypatch.setattr(crud, "post", mock_post)
-        monkeypatch.setattr(crud, "get", mock_get)
 
         response = test_app.post("/notes/", json=test_payload)
         assert response.status_code == expected_status
 
 
+class TestBulkCreateNotes:
+    """Tests for bulk note creation"""
+
+    def test_bulk_create_json_array(self, test_app, monkeypatch, test_user):
+        """Test that valid items are created and invalid ones reported by index"""
+        seen = {}
+
+        async def mock_post_many(session, payloads, owner_id, chunk_size=1000):
+            seen["titles"] = [payload.title for payload in payloads]
+            seen["owner_id"] = owner_id
+            return list(range(10, 10 + len(payloads)))
+
+        monkeypatch.setattr(crud, "post_many", mock_post_many)
+
+        response = test_app.post(
+            "/notes/bulk",
+            json=[
+                {"title": "first", "description": "first note"},
+                {"title": "x", "description": "too short title"},
+                {"title": "third", "description": "third note", "tags": ["a"]},
+            ],
+        )
+        assert response.status_code == 201
+        data = response.json()
+        assert data["created_ids"] == [10, 11]
+        assert [error["index"] for error in data["errors"]] == [1]
+        assert data["errors"][0]["detail"][0]["loc"] == ["title"]
+        assert seen == {"titles": ["first", "third"], "owner_id": test_user.id}
+
+    def test_bulk_create_ndjson(self, test_app, monkeypatch):
+        """Test NDJSON bodies, including a line that isn't JSON"""
+
+        async def mock_post_many(session, payloads, owner_id, chunk_size=1000):
+            return [1] * len(payloads)
+
+        monkeypatch.setattr(crud, "post_many", mock_post_many)
+
+        body = (
+            '{"title": "first", "description": "first note"}\n'
+            "not json\n"
+            "\n"
+            '{"title": "third", "description": "third note"}\n'
+        )
+        response = test_app.post(
+            "/notes/bulk",
+            content=body,
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+        assert response.status_code == 201
+        data = response.json()
+        assert data["created_ids"] == [1, 1]
+        assert data["errors"][0]["index"] == 1
+        assert data["errors"][0]["detail"][0]["type"] == "json_invalid"
+
+    def test_bulk_create_rejects_non_array(self, test_app):
+        """Test that a JSON body that isn't an array is rejected"""
+        response = test_app.post("/notes/bulk", json={"title": "foo"})
+        assert response.status_code == 400
+
+    def test_bulk_create_rejects_oversized_body(self, test_app, monkeypatch):
+        """Test that bodies over bulk_max_bytes get 413, with or without a length"""
+        from app.api import notes
+
+        monkeypatch.setattr(notes.settings, "bulk_max_bytes", 64)
+        body = b'{"title": "first", "description": "first note"}\n' * 4
+
+        response = test_app.post(
+            "/notes/bulk",
+            content=body,
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+        assert response.status_code == 413
+
+        def chunks():
+            yield body[:40]
+            yield body[40:]
+
+        response = test_app.post(
+            "/notes/bulk",
+            content=chunks(),
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+        assert response.status_code == 413
+        assert "content-length" not in response.request.headers
+
+
 class TestReadNotes:
     """Tests for reading notes"""
 
@@ -162,7 +244,16 @@ class TestReadNotes:
         ]
 
         async def mock_get_notes(
-            session, owner_id, skip=0, limit=10, search=None, completed=None, tag=None
+            session,
+            owner_id,
+            skip=0,
+            limit=10,
+            search=None,
+            completed=None,
+            tags=None,
+            tag_mode="all",
+            after=None,
+            highlight=False,
         ):
             return test_data
 
@@ -189,7 +280,16 @@ class TestReadNotes:
         ]
 
         async def mock_get_notes(
-            session, owner_id, skip=0, limit=10, search=None, completed=None, tag=None
+            session,
+            owner_id,
+            skip=0,
+            limit=10,
+            search=None,
+            completed=None,
+            tags=None,
+            tag_mode="all",
+            after=None,
+            highlight=False,
         ):
             return test_data if skip == 0 and limit == 1 else []
 
@@ -203,7 +303,16 @@ class TestReadNotes:
         """Test that limit exceeding maximum is rejected"""
 
         async def mock_get_notes(
-            session, owner_id, skip=0, limit=10, search=None, completed=None, tag=None
+            session,
+            owner_id,
+            skip=0,
+            limit=10,
+            search=None,
+            completed=None,
+            tags=None,
+            tag_mode="all",
+            after=None,
+            highlight=False,
         ):
             return []
 
@@ -228,7 +337,16 @@ class TestReadNotes:
         ]
 
         async def mock_get_notes(
-            session, owner_id, skip=0, limit=10, search=None, completed=None, tag=None
+            session,
+            owner_id,
+            skip=0,
+            limit=10,
+            search=None,
+            completed=None,
+            tags=None,
+            tag_mode="all",
+            after=None,
+            highlight=False,
         ):
             if completed is True:
                 return completed_notes
@@ -257,7 +375,16 @@ class TestReadNotes:
         ]
 
         async def mock_get_notes(
-            session, owner_id, skip=0, limit=10, search=None, completed=None, tag=None
+            session,
+            owner_id,
+            skip=0,
+            limit=10,
+            search=None,
+            completed=None,
+            tags=None,
+            tag_mode="all",
+            after=None,
+            highlight=False,
         ):
             if search and "unique" in search:
                 return search_results
@@ -270,11 +397,89 @@ class TestReadNotes:
         assert len(response.json()) == 1
         assert "unique" in response.json()[0]["title"].lower()
 
+    def test_read_notes_filter_by_tags(self, test_app, monkeypatch, test_user):
+        """Test that repeated tag parameters and tag_mode reach the query"""
+        seen = {}
+
+        async def mock_get_notes(
+            session,
+            owner_id,
+            skip=0,
+            limit=10,
+            search=None,
+            completed=None,
+            tags=None,
+            tag_mode="all",
+            after=None,
+            highlight=False,
+        ):
+            seen["tags"], seen["tag_mode"] = tags, tag_mode
+            return []
+
+        monkeypatch.setattr(crud, "get_notes", mock_get_notes)
+
+        response = test_app.get("/notes/?tag=work&tag=urgent&tag_mode=any")
+        assert response.status_code == 200
+        assert seen == {"tags": ["work", "urgent"], "tag_mode": "any"}
+
+        response = test_app.get("/notes/?tag=work&tag_mode=either")
+        assert response.status_code == 422
+
+    def test_read_notes_search_highlight(self, test_app, monkeypatch, test_user):
+        """Test that highlighted search results carry a snippet"""
+        search_results = [
+            {
+                "title": "unique title",
+                "description": "desc 1",
+                "id": 1,
+                "completed": False,
+                "is_deleted": False,
+                "tags": [],
+                "owner_id": test_user.id,
+                "created_date": get_iso_date(),
+                "snippet": "<mark>unique</mark> title",
+            }
+        ]
+
+        async def mock_get_notes(
+            session,
+            owner_id,
+            skip=0,
+            limit=10,
+            search=None,
+            completed=None,
+            tags=None,
+            tag_mode="all",
+            after=None,
+            highlight=False,
+        ):
+            return search_results if highlight else []
+
+        monkeypatch.setattr(crud, "get_notes", mock_get_notes)
+
+        response = test_app.get("/notes/?search=unique&highlight=true")
+        assert response.status_code == 200
+        assert response.json() == search_results
+
+    def test_read_notes_search_rejects_cursor(self, test_app):
+        """Test that ranked search results can't be paged with a cursor"""
+        response = test_app.get("/notes/?search=unique&cursor=abc")
+        assert response.status_code == 400
+
     def test_read_notes_combined_filters(self, test_app, monkeypatch, test_user):
         """Test combining search and completion filters"""
 
         async def mock_get_notes(
-            session, owner_id, skip=0, limit=10, search=None, completed=None, tag=None
+            session,
+            owner_id,
+            skip=0,
+            limit=10,
+            search=None,
+            completed=None,
+            tags=None,
+            tag_mode="all",
+            after=None,
+            highlight=False,
         ):
             if search == "test" and completed is True:
                 return [
@@ -297,6 +502,252 @@ class TestReadNotes:
         assert response.status_code == 200
         assert len(response.json()) == 1
 
+    def test_read_notes_cursor_pagination(self, test_app, monkeypatch, test_user):
+        """Test that a full page returns a cursor that resumes after its last row"""
+        created = datetime(2024, 1, 15, 10, 30)
+        page = [
+            {
+                "title": "note 5",
+                "description": "desc 5",
+                "id": 5,
+                "completed": False,
+                "is_deleted": False,
+                "tags": [],
+                "owner_id": test_user.id,
+                "created_date": created.isoformat(),
+            }
+        ]
+        seen = {}
+
+        async def mock_get_notes(
+            session,
+            owner_id,
+            skip=0,
+            limit=10,
+            search=None,
+            completed=None,
+            tags=None,
+            tag_mode="all",
+            after=None,
+            highlight=False,
+        ):
+            seen["after"] = after
+            return page if after is None else []
+
+        monkeypatch.setattr(crud, "get_notes", mock_get_notes)
+
+        response = test_app.get("/notes/?limit=1")
+        assert response.status_code == 200
+        cursor = response.headers["X-Next-Cursor"]
+
+        response = test_app.get(f"/notes/?limit=1&cursor={cursor}")
+        assert response.status_code == 200
+        assert response.json() == []
+        assert seen["after"] == (created, 5)
+        assert "X-Next-Cursor" not in response.headers
+
+    def test_read_notes_invalid_cursor(self, test_app, monkeypatch):
+        """Test that a malformed cursor is rejected"""
+        response = test_app.get("/notes/?cursor=not-a-cursor")
+        assert response.status_code == 400
+        assert "cursor" in response.json()["detail"].lower()
+
+    def test_read_single_note_etag(self, test_app, monkeypatch, test_user):
+        """Test that a matching If-None-Match returns 304 without a body"""
+        note = {
+            "title": "something",
+            "description": "something else",
+            "completed": False,
+            "tags": [],
+            "id": 1,
+            "created_date": get_iso_date(),
+            "is_deleted": False,
+            "owner_id": test_user.id,
+        }
+        versions = {"current": 3}
+
+        async def mock_get(session, id):
+            return {**note, "version": versions["current"]}
+
+        monkeypatch.setattr(crud, "get", mock_get)
+
+        response = test_app.get("/notes/1")
+        assert response.status_code == 200
+        assert "version" not in response.json()
+        etag = response.headers["ETag"]
+
+        response = test_app.get("/notes/1", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["ETag"] == etag
+
+        response = test_app.get("/notes/1", headers={"If-None-Match": f"W/{etag}"})
+        assert response.status_code == 304
+
+        versions["current"] = 4
+        response = test_app.get("/notes/1", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+
+    def test_read_notes_total_count(self, test_app, monkeypatch):
+        """Test that listings carry the total and flag capped counts"""
+        counted = []
+
+        async def mock_get_notes(session, owner_id, **kwargs):
+            return []
+
+        async def mock_count_notes(session, owner_id, **kwargs):
+            counted.append(kwargs)
+            return (1000, False) if kwargs["search"] else (42, True)
+
+        monkeypatch.setattr(crud, "get_notes", mock_get_notes)
+        monkeypatch.setattr(crud, "count_notes", mock_count_notes)
+
+        response = test_app.get("/notes/?completed=true&skip=10")
+        assert response.headers["X-Total-Count"] == "42"
+        assert "X-Total-Count-Exact" not in response.headers
+        assert counted[0]["completed"] is True
+
+        response = test_app.get("/notes/?search=meeting")
+        assert response.headers["X-Total-Count"] == "1000"
+        assert response.headers["X-Total-Count-Exact"] == "false"
+
+    def test_read_note_stats(self, test_app, monkeypatch):
+        """Test the stats dashboard payload and its ETag"""
+        calls = []
+
+        async def mock_get_note_stats(session, owner_id, since):
+            calls.append(since)
+            return {
+                "total": 3,
+                "completed": 1,
+                "deleted": 2,
+                "tags": {"work": 2, "home": 1},
+                "created_per_day": [{"day": date(2026, 10, 16), "count": 3}],
+            }
+
+        monkeypatch.setattr(crud, "get_note_stats", mock_get_note_stats)
+
+        response = test_app.get("/notes/stats?days=7")
+        assert response.status_code == 200
+        assert response.json() == {
+            "total": 3,
+            "completed": 1,
+            "deleted": 2,
+            "tags": {"work": 2, "home": 1},
+            "created_per_day": [{"day": "2026-10-16", "count": 3}],
+        }
+        # Seven days including today (UTC)
+        assert datetime.now(timezone.utc).date() - calls[0] == timedelta(days=6)
+
+        response = test_app.get(
+            "/notes/stats?days=7", headers={"If-None-Match": response.headers["ETag"]}
+        )
+        assert response.status_code == 304
+        assert len(calls) == 1
+        assert test_app.get("/notes/stats?days=0").status_code == 422
+
+    def test_read_notes_etag_skips_query(self, test_app, monkeypatch):
+        """Test that an unchanged notes version answers 304 before querying"""
+        calls = []
+        versions = {"current": 7}
+
+        async def mock_get_notes_version(session, owner_id):
+            return versions["current"]
+
+        async def mock_get_notes(session, owner_id, **kwargs):
+            calls.append(kwargs)
+            return []
+
+        monkeypatch.setattr(crud, "get_notes_version", mock_get_notes_version)
+        monkeypatch.setattr(crud, "get_notes", mock_get_notes)
+
+        response = test_app.get("/notes/?completed=true")
+        assert response.status_code == 200
+        etag = response.headers["ETag"]
+
+        response = test_app.get(
+            "/notes/?completed=true", headers={"If-None-Match": etag}
+        )
+        assert response.status_code == 304
+        assert len(calls) == 1
+
+        # Different parameters or a newer version need a fresh page
+        response = test_app.get(
+            "/notes/?completed=false", headers={"If-None-Match": etag}
+        )
+        assert response.status_code == 200
+        versions["current"] = 8
+        response = test_app.get(
+            "/notes/?completed=true", headers={"If-None-Match": etag}
+        )
+        assert response.status_code == 200
+        assert len(calls) == 3
+
+
+class TestExportNotes:
+    """Tests for streaming note exports"""
+
+    @staticmethod
+    def _mock_stream(test_user, seen):
+        async def mock_stream_notes(
+            session,
+            owner_id,
+            search=None,
+            completed=None,
+            tags=None,
+            tag_mode="all",
+            batch_size=500,
+        ):
+            seen.update(owner_id=owner_id, completed=completed, tags=tags)
+            for start in (1, 3):
+                yield [
+                    {
+                        "id": id,
+                        "title": f"note {id}",
+                        "description": "a, b",
+                        "completed": True,
+                        "is_deleted": False,
+                        "tags": ["work"],
+                        "owner_id": test_user.id,
+                        "created_date": datetime(2024, 1, 15, 10, 30),
+                    }
+                    for id in (start, start + 1)
+                ]
+
+        return mock_stream_notes
+
+    def test_export_ndjson(self, test_app, monkeypatch, test_user):
+        """Test that every streamed row becomes one JSON line"""
+        seen = {}
+        monkeypatch.setattr(crud, "stream_notes", self._mock_stream(test_user, seen))
+
+        response = test_app.get("/notes/export?completed=true&tag=work")
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert [line["id"] for line in lines] == [1, 2, 3, 4]
+        assert lines[0]["created_date"] == "2024-01-15T10:30:00"
+        assert seen == {"owner_id": test_user.id, "completed": True, "tags": ["work"]}
+
+    def test_export_csv(self, test_app, monkeypatch, test_user):
+        """Test CSV export has one header row and quotes embedded commas"""
+        monkeypatch.setattr(crud, "stream_notes", self._mock_stream(test_user, {}))
+
+        response = test_app.get("/notes/export?format=csv")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/csv")
+        rows = list(csv.reader(io.StringIO(response.text)))
+        assert rows[0][:3] == ["id", "title", "description"]
+        assert len(rows) == 5
+        assert rows[1][2] == "a, b"
+        assert rows[1][3] == "true"
+
+    def test_export_invalid_format(self, test_app):
+        """Test that unknown export formats are rejected"""
+        response = test_app.get("/notes/export?format=xml")
+        assert response.status_code == 422
+
 
 class TestUpdateNote:
     """Tests for updating notes"""
@@ -320,13 +771,9 @@ class TestUpdateNote:
             "created_date": get_iso_date(),
         }
 
-        async def mock_get(session, id):
-            return test_response if id == 1 else None
+        async def mock_put(session, id, payload, owner_id):
+            return test_response if id == 1 and owner_id == test_user.id else None
 
-        async def mock_put(session, id, payload):
-            return 1
-
-        monkeypatch.setattr(crud, "get", mock_get)
         monkeypatch.setattr(crud, "put", mock_put)
 
         response = test_app.put("/notes/1", json=test_update_data)
@@ -336,10 +783,10 @@ class TestUpdateNote:
     def test_update_note_not_found(self, test_app, monkeypatch):
         """Test updating non-existent note returns 404"""
 
-        async def mock_get(session, id):
+        async def mock_put(session, id, payload, owner_id):
             return None
 
-        monkeypatch.setattr(crud, "get", mock_get)
+        monkeypatch.setattr(crud, "put", mock_put)
 
         response = test_app.put(
             "/notes/999", json={"title": "foo", "description": "bar"}
@@ -364,23 +811,23 @@ class TestUpdateNote:
     ):
         """Test note update with invalid data"""
 
-        async def mock_get(session, note_id):
+        async def mock_put(session, note_id, payload, owner_id):
             return (
                 None
                 if note_id == 999 or note_id <= 0
                 else {
                     "id": note_id,
-                    "title": "existing",
-                    "description": "existing",
-                    "completed": False,
+                    "title": payload.title,
+                    "description": payload.description,
+                    "completed": payload.completed,
                     "is_deleted": False,
-                    "tags": [],
-                    "owner_id": test_user.id,
+                    "tags": payload.tags,
+                    "owner_id": owner_id,
                     "created_date": get_iso_date(),
                 }
             )
 
-        monkeypatch.setattr(crud, "get", mock_get)
+        monkeypatch.setattr(crud, "put", mock_put)
 
         response = test_app.put(f"/notes/{id}", json=payload)
         assert response.status_code == expected_status
@@ -396,19 +843,15 @@ class TestDeleteNote:
             "description": "something else",
             "id": 1,
             "completed": False,
-            "is_deleted": False,
+            "is_deleted": True,
             "tags": [],
             "owner_id": test_user.id,
             "created_date": get_iso_date(),
         }
 
-        async def mock_get(session, id):
-            return test_data if id == 1 else None
-
-        async def mock_delete_note(session, id):
-            return 1
+        async def mock_delete_note(session, id, owner_id):
+            return test_data if id == 1 and owner_id == test_user.id else None
 
-        monkeypatch.setattr(crud, "get", mock_get)
         monkeypatch.setattr(crud, "delete_note", mock_delete_note)
 
         response = test_app.delete("/notes/1")
@@ -418,10 +861,10 @@ class TestDeleteNote:
     def test_delete_note_not_found(self, test_app, monkeypatch):
         """Test deleting non-existent note returns 404"""
 
-        async def mock_get(session, id):
+        async def mock_delete_note(session, id, owner_id):
             return None
 
-        monkeypatch.setattr(crud, "get", mock_get)
+        monkeypatch.setattr(crud, "delete_note", mock_delete_note)
 
         response = test_app.delete("/notes/999")
         assert response.status_code == 404
@@ -438,13 +881,9 @@ class TestDeleteNote:
     def test_delete_note_already_deleted(self, test_app, monkeypatch):
         """Test that already soft-deleted note cannot be deleted again (regression)"""
 
-        async def mock_get(session, id):
+        async def mock_delete_note(session, id, owner_id):
             return None
 
-        async def mock_delete_note(session, id):
-            return 0
-
-        monkeypatch.setattr(crud, "get", mock_get)
         monkeypatch.setattr(crud, "delete_note", mock_delete_note)
 
         response = test_app.delete("/notes/1")
@@ -23,3 +23,77 @@ def test_ping_response_schema(test_app):
     assert isinstance(data["status"], str)
     assert isinstance(data["message"], str)
     assert len(data["message"]) > 0
+
+
+def test_healthz_does_not_touch_database(test_app):
+    """Test that liveness answers without a database session"""
+    from app.main import app
+    from app.db import get_read_db
+
+    async def failing_db():
+        raise AssertionError("liveness must not use the database")
+        yield  # pragma: no cover
+
+    app.dependency_overrides[get_read_db] = failing_db
+    response = test_app.get("/healthz")
+    assert response.status_code == 200
+    assert response.json() == {"status": "alive"}
+
+
+def test_readyz_reports_cached_check(test_app, monkeypatch):
+    """Test readiness before and after a successful background check"""
+    import time
+
+    from app.health import get_health_checker
+
+    health_checker = get_health_checker()
+    monkeypatch.setattr(health_checker, "checked_at", None)
+    monkeypatch.setattr(health_checker, "database", {"status": "unknown"})
+    response = test_app.get("/readyz")
+    assert response.status_code == 503
+    assert response.json()["status"] == "unavailable"
+
+    monkeypatch.setattr(health_checker, "checked_at", time.monotonic())
+    monkeypatch.setattr(
+        health_checker, "database", {"status": "ok", "latency_ms": 1.5}
+    )
+    response = test_app.get("/readyz")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["status"] == "ready"
+    assert data["database"]["latency_ms"] == 1.5
+    assert data["pool"]["headroom"] == data["pool"]["limit"]
+
+
+def test_health_checker_times_out_on_exhausted_pool(tmp_path):
+    """Test that a check waiting on a saturated pool reports a timeout"""
+    import asyncio
+
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+    from app.health import HealthChecker
+    from app.pool import PoolManager
+    from app.replicas import ReplicaSet
+
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'health.db'}",
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+    )
+    manager = PoolManager(engine, min_connections=1, baseline=1, max_connections=1)
+    checker = HealthChecker(engine, manager, ReplicaSet([]), timeout=0.1)
+
+    async def scenario():
+        await checker.check()
+        first = dict(checker.database)
+        async with engine.connect():
+            await checker.check()
+        second = dict(checker.database)
+        await engine.dispose()
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first["status"] == "ok"
+    assert second["status"] == "timeout"
@@ -0,0 +1,121 @@
+"""
+Tests for the adaptive connection pool manager
+"""
+
+import asyncio
+import time
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app import metrics
+from app.db import TimedQueuePool
+from app.pool import PoolManager
+
+
+def make_manager(tmp_path, **kwargs):
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}",
+        poolclass=TimedQueuePool,
+        pool_size=3,
+        max_overflow=2,
+    )
+    engine.sync_engine.pool.engine_name = kwargs.get("name", "primary")
+    options = dict(
+        min_connections=3,
+        baseline=5,
+        max_connections=9,
+        target_wait=0.004,
+        max_latency=0.1,
+    )
+    options.update(kwargs)
+    return PoolManager(engine, **options)
+
+
+def test_limit_grows_on_checkout_wait_and_backs_off_on_latency(tmp_path):
+    manager = make_manager(tmp_path)
+
+    manager.limit = manager.decide(wait=0.02, latency=0.01, checked_out=5)
+    assert manager.limit == 7
+    manager.limit = manager.decide(wait=0.02, latency=0.01, checked_out=7)
+    manager.limit = manager.decide(wait=0.02, latency=0.01, checked_out=9)
+    assert manager.limit == 9  # capped at max_connections
+
+    # A slow database gets fewer connections even while requests queue
+    manager.limit = manager.decide(wait=0.02, latency=0.5, checked_out=9)
+    assert manager.limit == 6
+    manager.limit = manager.decide(wait=0.02, latency=0.5, checked_out=6)
+    assert manager.limit == 4
+    manager.limit = manager.decide(wait=0.02, latency=0.5, checked_out=4)
+    assert manager.limit == 3  # floored at min_connections
+
+    # Idle: drift back to the configured baseline one step at a time
+    manager.limit = manager.decide(wait=0.0, latency=0.001, checked_out=0)
+    assert manager.limit == 4
+
+
+def test_tick_rebuilds_pool_with_limit_as_persistent_size(tmp_path):
+    manager = make_manager(tmp_path, name="pool-resize-test")
+    original = manager.pool
+    manager.limit = 8
+    manager.tick()  # no traffic: decays towards the baseline
+    assert manager.limit == 7
+    assert manager.pool is not original
+    assert manager.pool.size() == 7
+    assert manager.pool.overflow() == -7  # no overflow beyond the limit
+    assert manager.stats()["adjustments"] == 1
+
+    resized = manager.pool
+    # Moderate wait: the limit holds and the pool is kept
+    metrics.db_pool_checkout_wait.labels("pool-resize-test").observe(0.002)
+    manager.tick()
+    assert manager.limit == 7
+    assert manager.pool is resized
+
+
+def test_checkout_wait_excludes_connect_time(tmp_path):
+    manager = make_manager(tmp_path, name="pool-wait-test")
+    event.listen(
+        manager.engine.sync_engine, "connect", lambda *args: time.sleep(0.05)
+    )
+
+    async def scenario():
+        async with manager.engine.connect():  # opens a new connection
+            pass
+        async with manager.engine.connect():  # reuses the idle one
+            pass
+        await manager.engine.dispose()
+
+    total_before, count_before = metrics.db_pool_checkout_wait.totals(
+        engine="pool-wait-test"
+    )
+    asyncio.run(scenario())
+    total, count = metrics.db_pool_checkout_wait.totals(engine="pool-wait-test")
+    assert count - count_before == 2
+    assert total - total_before < 0.02
+
+
+def test_warm_opens_idle_connections(tmp_path):
+    manager = make_manager(tmp_path)
+
+    async def scenario():
+        opened = await manager.warm(10)
+        checked_in = manager.pool.checkedin()
+        await manager.engine.dispose()
+        return opened, checked_in
+
+    assert asyncio.run(scenario()) == (3, 3)
+
+
+def test_tick_ignores_replica_samples(tmp_path):
+    manager = make_manager(tmp_path, name="pool-test")
+    replica = "pool-test-replica"
+    metrics.db_pool_checkout_wait.labels(replica).observe(1.0)
+    metrics.db_statement_duration.labels(replica, "select", "notes").observe(1.0)
+    metrics.db_pool_checkout_wait.labels("pool-test").observe(0.02)
+    metrics.db_statement_duration.labels("pool-test", "select", "notes").observe(0.01)
+
+    manager.tick()
+    assert manager.last_wait == 0.02
+    assert manager.last_latency == 0.01
+    assert manager.limit == 7  # grew on the wait, not cut by replica latency
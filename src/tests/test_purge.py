@@ -0,0 +1,124 @@
+"""
+Tests for hard-purging expired soft-deleted notes
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.api import crud
+from app.db import metadata, note_counts, note_tags, notes, users
+from app.purge import NotePurger
+
+
+def _note(note_id, is_deleted=False, deleted_date=None):
+    return {
+        "id": note_id,
+        "title": f"note {note_id}",
+        "description": "body",
+        "completed": False,
+        "is_deleted": is_deleted,
+        "deleted_date": deleted_date,
+        "owner_id": 1,
+    }
+
+
+def test_purger_removes_only_expired_notes_in_batches(tmp_path):
+    """Test that expired notes and their tags go, in batch_size chunks"""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'purge.db'}")
+    session_factory = async_sessionmaker(engine, class_=AsyncSession)
+    old = datetime.now(timezone.utc) - timedelta(days=40)
+    recent = datetime.now(timezone.utc) - timedelta(days=1)
+
+    async def scenario():
+        async with engine.begin() as conn:
+            await conn.run_sync(metadata.create_all)
+            await conn.execute(
+                users.insert().values(
+                    id=1, username="alice", email="a@example.com", hashed_password="x"
+                )
+            )
+            await conn.execute(
+                notes.insert(),
+                [
+                    _note(1),
+                    _note(2, True, old),
+                    _note(3, True, old),
+                    _note(4, True, old),
+                    _note(5, True, recent),
+                ],
+            )
+            await conn.execute(
+                note_tags.insert(),
+                [
+                    {"note_id": 2, "owner_id": 1, "tag": "work"},
+                    {"note_id": 5, "owner_id": 1, "tag": "work"},
+                ],
+            )
+
+        purger = NotePurger(
+            session_factory, retention=timedelta(days=30), batch_size=2, pause=0
+        )
+        removed = await purger.run_once()
+
+        async with engine.connect() as conn:
+            remaining = (await conn.scalars(select(notes.c.id))).all()
+            tags = (await conn.scalars(select(note_tags.c.note_id))).all()
+            again = await purger.run_once()
+            count = await conn.scalar(select(func.count()).select_from(notes))
+        await engine.dispose()
+        return removed, sorted(remaining), tags, again, count, purger.purged
+
+    removed, remaining, tags, again, count, purged = asyncio.run(scenario())
+    assert removed == 3
+    assert remaining == [1, 5]
+    assert tags == [5]
+    assert again == 0
+    assert count == 2
+    assert purged == 3
+
+
+def test_batch_purged_by_another_worker_is_not_counted_twice(tmp_path):
+    """Test that candidates deleted after being selected aren't counted"""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'purge.db'}")
+    session_factory = async_sessionmaker(engine, class_=AsyncSession)
+    old = datetime.now(timezone.utc) - timedelta(days=40)
+
+    async def scenario():
+        async with engine.begin() as conn:
+            await conn.run_sync(metadata.create_all)
+            await conn.execute(
+                users.insert().values(
+                    id=1, username="alice", email="a@example.com", hashed_password="x"
+                )
+            )
+            await conn.execute(
+                notes.insert(), [_note(2, True, old), _note(3, True, old)]
+            )
+            await conn.execute(
+                note_counts.insert().values(owner_id=1, total=0, completed=0, deleted=2)
+            )
+
+        async with session_factory() as session:
+            execute = session.execute
+
+            async def racing_execute(statement, *args, **kwargs):
+                result = await execute(statement, *args, **kwargs)
+                if statement.is_select and statement.selected_columns[0] is notes.c.id:
+                    # Another worker purges the same batch before our DELETE
+                    await execute(notes.delete().where(notes.c.id == 2))
+                    await execute(note_counts.update().values(deleted=1))
+                return result
+
+            session.execute = racing_execute
+            removed = await crud.purge_deleted_notes(session, timedelta(days=30))
+
+        async with engine.connect() as conn:
+            deleted = await conn.scalar(select(note_counts.c.deleted))
+            remaining = await conn.scalar(select(func.count()).select_from(notes))
+        await engine.dispose()
+        return removed, deleted, remaining
+
+    assert asyncio.run(scenario()) == (1, 0, 0)
@@ -0,0 +1,384 @@
+"""
+Query-plan regression tests for every query crud generates
+
+A realistically sized dataset is seeded into a throwaway local database and
+each crud call below is run against it with commits turned into flushes and
+rolled back, so the data never changes. Every statement it sends (except
+INSERTs of plain values) is then explained, and the test fails when an
+index recorded in ``query_plans.json`` is no longer used (``"a|b"`` accepts
+either of two equivalent indexes), when a table is scanned in full, or when
+the cost exceeds the recorded baseline by more than COST_TOLERANCE.
+
+Postgres reports the planner's estimated total cost. SQLite has no cost
+estimate, so there the cost is the number of VM instructions executing the
+statement takes, which is deterministic for the seeded data.
+
+SQLite is used by default. Set QUERY_PLAN_DATABASE_URL to an empty local
+Postgres database to check Postgres plans (its tables are dropped
+afterwards), and UPDATE_QUERY_PLANS=1 to record new baselines for the
+dialect under test after an intended plan change.
+"""
+
+import asyncio
+import inspect
+import json
+import os
+import random
+import re
+import sqlite3
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Set, Tuple
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.api import crud
+from app.api.models import NoteSchema
+from app.cache import ReadThroughCache
+from app.db import metadata, note_tags, notes, users
+
+BASELINE_FILE = Path(__file__).with_name("query_plans.json")
+UPDATE_BASELINES = os.environ.get("UPDATE_QUERY_PLANS") == "1"
+COST_TOLERANCE = 1.5
+# Absolute headroom so single-row lookups don't fail on a few instructions
+COST_SLACK = 100
+# Tables that must never be read in full
+LARGE_TABLES = {"users", "notes", "note_tags"}
+
+USERS = 50
+NOTES_PER_USER = 400
+OWNER_ID = 1
+WORDS = ["alpha", "bravo", "charlie", "delta", "echo", "foxtrot", "golf", "hotel"]
+TAGS = ["work", "home", "urgent", "later", "ideas", "travel", "health", "money"]
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+# SQLite instructions per progress callback
+STEP_GRANULARITY = 10
+
+
+class Plan(NamedTuple):
+    indexes: Set[str]
+    full_scans: Set[str]
+    cost: float
+    details: List[str]
+
+
+# --- Dataset ---
+
+
+def _dataset() -> Tuple[List[dict], List[dict], List[dict]]:
+    rng = random.Random(19)
+    user_rows = [
+        {
+            "id": user_id,
+            "username": f"user{user_id}",
+            "email": f"user{user_id}@example.com",
+            "hashed_password": "x",
+        }
+        for user_id in range(1, USERS + 1)
+    ]
+    note_rows, tag_rows = [], []
+    for user_id in range(1, USERS + 1):
+        for i in range(NOTES_PER_USER):
+            note_id = (user_id - 1) * NOTES_PER_USER + i + 1
+            deleted = rng.random() < 0.1
+            tags = rng.sample(TAGS, rng.randint(0, 3))
+            note_rows.append(
+                {
+                    "id": note_id,
+                    "title": " ".join(rng.sample(WORDS, 2)),
+                    "description": " ".join(rng.choices(WORDS, k=12)),
+                    "completed": rng.random() < 0.4,
+                    "is_deleted": deleted,
+                    "deleted_date": START + timedelta(days=i % 30) if deleted else None,
+                    "tags": tags,
+                    "created_date": START + timedelta(minutes=i * 7 + user_id),
+                    "owner_id": user_id,
+                }
+            )
+            tag_rows.extend(
+                {"note_id": note_id, "owner_id": user_id, "tag": tag} for tag in tags
+            )
+    return user_rows, note_rows, tag_rows
+
+
+async def _seed(url: str) -> None:
+    engine = create_async_engine(url)
+    user_rows, note_rows, tag_rows = _dataset()
+    async with engine.begin() as conn:
+        await conn.run_sync(metadata.create_all)
+        await conn.execute(users.insert(), user_rows)
+        for start in range(0, len(note_rows), 2000):
+            await conn.execute(notes.insert(), note_rows[start : start + 2000])
+        await conn.execute(note_tags.insert(), tag_rows)
+    session_factory = async_sessionmaker(engine, class_=AsyncSession)
+    for user_id in range(1, USERS + 1):
+        async with session_factory() as session:
+            await crud.rebuild_note_stats(session, user_id)
+    async with engine.begin() as conn:
+        await conn.exec_driver_sql("ANALYZE")
+    await engine.dispose()
+
+
+async def _drop(url: str) -> None:
+    engine = create_async_engine(url)
+    async with engine.begin() as conn:
+        await conn.run_sync(metadata.drop_all)
+    await engine.dispose()
+
+
+# --- Cases ---
+
+
+def _payload(**kwargs) -> NoteSchema:
+    return NoteSchema(
+        title="planned", description="a note", tags=["work", "urgent"], **kwargs
+    )
+
+
+# After this position half of the owner's notes remain
+AFTER = (START + timedelta(minutes=NOTES_PER_USER // 2 * 7 + OWNER_ID), 200)
+TAG_FILTERS = {
+    "none": {},
+    "one": {"tags": ["work"]},
+    "all": {"tags": ["work", "urgent"], "tag_mode": "all"},
+    "any": {"tags": ["work", "urgent"], "tag_mode": "any"},
+}
+
+
+async def _stream(session, **kwargs):
+    async for _ in crud.stream_notes(session, OWNER_ID, batch_size=100, **kwargs):
+        pass
+
+
+# conftest patches these for the API tests
+get_notes_version = crud.get_notes_version
+count_notes = crud.count_notes
+
+CASES: Dict[str, Any] = {
+    "get_user_by_username": lambda s: crud.get_user_by_username(s, "user1"),
+    "get_user_by_email": lambda s: crud.get_user_by_email(s, "user1@example.com"),
+    "get_user_ids": lambda s: crud.get_user_ids(s, after=20, limit=10),
+    "get_notes_version": lambda s: get_notes_version(s, OWNER_ID),
+    "get": lambda s: crud.get(s, 3),
+    "get_notes[skip]": lambda s: crud.get_notes(s, OWNER_ID, skip=200, limit=20),
+    "get_notes[after]": lambda s: crud.get_notes(s, OWNER_ID, after=AFTER),
+    "get_notes[after,completed]": lambda s: crud.get_notes(
+        s, OWNER_ID, after=AFTER, completed=True
+    ),
+    "get_notes[search,highlight]": lambda s: crud.get_notes(
+        s, OWNER_ID, search="alpha", highlight=True
+    ),
+    "count_notes": lambda s: count_notes(s, OWNER_ID),
+    "count_notes[completed=False]": lambda s: count_notes(
+        s, OWNER_ID, completed=False
+    ),
+    "count_notes[search]": lambda s: count_notes(s, OWNER_ID, search="alpha"),
+    "count_notes[completed,tags]": lambda s: count_notes(
+        s, OWNER_ID, completed=True, tags=["work", "urgent"], tag_mode="any"
+    ),
+    "get_note_stats": lambda s: crud.get_note_stats(
+        s, OWNER_ID, since=(START + timedelta(days=10)).date()
+    ),
+    "rebuild_note_stats": lambda s: crud.rebuild_note_stats(s, OWNER_ID),
+    "stream_notes": lambda s: _stream(s),
+    "stream_notes[completed,tags]": lambda s: _stream(
+        s, completed=False, tags=["work"]
+    ),
+    "post": lambda s: crud.post(s, _payload(), OWNER_ID),
+    "post_many": lambda s: crud.post_many(s, [_payload()] * 3, OWNER_ID),
+    "put": lambda s: crud.put(s, 3, _payload(completed=True), OWNER_ID),
+    "delete_note": lambda s: crud.delete_note(s, 3, OWNER_ID),
+    "delete_all": lambda s: crud.delete_all(s, OWNER_ID),
+    "purge_deleted_notes": lambda s: crud.purge_deleted_notes(
+        s, timedelta(days=30), batch_size=100
+    ),
+}
+# Every filter combination of the listing
+for _completed in (None, True, False):
+    for _tags, _tag_filter in TAG_FILTERS.items():
+        for _search in (None, "alpha"):
+            CASES[
+                f"get_notes[completed={_completed},tags={_tags},search={_search}]"
+            ] = lambda s, c=_completed, t=_tag_filter, q=_search: crud.get_notes(
+                s, OWNER_ID, completed=c, search=q, **t
+            )
+
+# Only INSERT ... VALUES, which has no access path to regress
+NOT_PLANNED = {"create_user"}
+PLAIN_INSERT = re.compile(
+    r"\s*INSERT\b(?!.*\bSELECT\b)", re.IGNORECASE | re.DOTALL
+)
+
+
+async def _capture(url: str, case) -> List[Tuple[str, Any]]:
+    """Run ``case`` without committing and return the statements it sent"""
+    engine = create_async_engine(url)
+    statements: List[Tuple[str, Any]] = []
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if not PLAIN_INSERT.match(statement):
+            # Every row of an executemany shares the statement's plan
+            statements.append((statement, parameters[0] if executemany else parameters))
+
+    session_factory = async_sessionmaker(engine, class_=AsyncSession)
+    async with session_factory() as session:
+        session.commit = session.flush
+        await case(session)
+        await session.rollback()
+    await engine.dispose()
+    return statements
+
+
+# --- Plans ---
+
+
+def _sqlite_plan(path: str, statements: List[Tuple[str, Any]]) -> Plan:
+    indexes, full_scans, details = set(), set(), []
+    steps = 0
+
+    def count_steps():
+        nonlocal steps
+        steps += 1
+        return 0
+
+    conn = sqlite3.connect(path)
+    try:
+        for statement, parameters in statements:
+            for row in conn.execute("EXPLAIN QUERY PLAN " + statement, parameters):
+                detail = row[3]
+                details.append(detail)
+                indexes.update(re.findall(r"USING (?:COVERING )?INDEX (\w+)", detail))
+                match = re.match(r"(?:SEARCH|SCAN) (?:TABLE )?(\w+)", detail)
+                if match is None:
+                    continue
+                table = match.group(1)
+                if "INTEGER PRIMARY KEY" in detail:
+                    indexes.add(f"{table}_pkey")
+                elif "VIRTUAL TABLE" in detail:
+                    indexes.add(table)
+                elif re.fullmatch(r"SCAN (?:TABLE )?\w+( AS \w+)?", detail):
+                    full_scans.add(table)
+            conn.set_progress_handler(count_steps, STEP_GRANULARITY)
+            try:
+                conn.execute(statement, parameters).fetchall()
+            finally:
+                conn.set_progress_handler(None, STEP_GRANULARITY)
+    finally:
+        # Statements run in one transaction, as they did in the case
+        conn.rollback()
+        conn.close()
+    return Plan(indexes, full_scans & LARGE_TABLES, steps * STEP_GRANULARITY, details)
+
+
+def _walk(node: Dict[str, Any]):
+    yield node
+    for child in node.get("Plans", []):
+        yield from _walk(child)
+
+
+async def _postgres_plan(url: str, statements: List[Tuple[str, Any]]) -> Plan:
+    indexes, full_scans, details = set(), set(), []
+    cost = 0.0
+    engine = create_async_engine(url)
+    async with engine.connect() as conn:
+        for statement, parameters in statements:
+            result = await conn.exec_driver_sql(
+                "EXPLAIN (FORMAT JSON) " + statement, parameters
+            )
+            explained = result.scalar()
+            if isinstance(explained, str):
+                explained = json.loads(explained)
+            root = explained[0]["Plan"]
+            cost += root["Total Cost"]
+            for node in _walk(root):
+                details.append(node["Node Type"])
+                if "Index Name" in node:
+                    indexes.add(node["Index Name"])
+                if node["Node Type"] == "Seq Scan":
+                    full_scans.add(node["Relation Name"])
+    await engine.dispose()
+    return Plan(indexes, full_scans & LARGE_TABLES, round(cost, 2), details)
+
+
+async def _explain(url: str, case) -> Plan:
+    statements = await _capture(url, case)
+    assert statements, "the case sent no statements to explain"
+    if url.startswith("sqlite"):
+        return _sqlite_plan(url.split("///", 1)[1], statements)
+    return await _postgres_plan(url, statements)
+
+
+def _missing_indexes(expected: List[str], plan: Plan) -> List[str]:
+    """Expected entries the plan doesn't use; "a|b" accepts either index"""
+    return [
+        entry for entry in expected if not set(entry.split("|")) & plan.indexes
+    ]
+
+
+# --- Tests ---
+
+
+@pytest.fixture(scope="module")
+def plan_database(tmp_path_factory):
+    url = os.environ.get("QUERY_PLAN_DATABASE_URL") or (
+        f"sqlite+aiosqlite:///{tmp_path_factory.mktemp('plans') / 'plans.db'}"
+    )
+    asyncio.run(_seed(url))
+    dialect = url.split(":", 1)[0].split("+", 1)[0]
+    baselines = json.loads(BASELINE_FILE.read_text())
+    recorded: Dict[str, Any] = {}
+
+    yield url, baselines.get(dialect), recorded
+
+    if UPDATE_BASELINES and recorded:
+        baselines[dialect] = dict(sorted(recorded.items()))
+        BASELINE_FILE.write_text(json.dumps(baselines, indent=2) + "\n")
+    if not url.startswith("sqlite"):
+        asyncio.run(_drop(url))
+
+
+@pytest.fixture
+def uncached_notes(monkeypatch):
+    monkeypatch.setattr(crud, "note_cache", ReadThroughCache(None, ttl=0))
+
+
+def test_every_crud_query_has_a_case():
+    """Test that new crud functions get a query-plan case"""
+    functions = {
+        name
+        for name, function in inspect.getmembers(crud, inspect.isfunction)
+        if not name.startswith("_")
+        and function.__module__ == crud.__name__
+        and (
+            inspect.iscoroutinefunction(function)
+            or inspect.isasyncgenfunction(function)
+        )
+    }
+    covered = {name.split("[", 1)[0] for name in CASES} | NOT_PLANNED
+    assert functions - covered == set()
+
+
+@pytest.mark.parametrize("name", sorted(CASES))
+def test_query_plan(name, plan_database, uncached_notes):
+    """Test that the query keeps its indexes and stays within its cost"""
+    url, baselines, recorded = plan_database
+    plan = asyncio.run(_explain(url, CASES[name]))
+    baseline = (baselines or {}).get(name)
+    missing = _missing_indexes(baseline["indexes"], plan) if baseline else None
+    # Re-recording keeps hand-written alternatives that still hold
+    indexes = baseline["indexes"] if missing == [] else sorted(plan.indexes)
+    recorded[name] = {"indexes": indexes, "cost": plan.cost}
+
+    assert plan.full_scans == set(), f"full scan in: {plan.details}"
+    if UPDATE_BASELINES:
+        return
+    if baselines is None:
+        pytest.skip("no baselines recorded for this dialect")
+    assert baseline is not None, "no baseline; record it with UPDATE_QUERY_PLANS=1"
+    assert missing == [], f"indexes no longer used: {missing} in {plan.details}"
+    assert plan.cost <= baseline["cost"] * COST_TOLERANCE + COST_SLACK, (
+        f"cost {plan.cost} exceeds baseline {baseline['cost']}: {plan.details}"
+    )
@@ -0,0 +1,142 @@
+"""
+Tests for read replica selection and read-your-writes routing
+"""
+
+import asyncio
+
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app import db
+from app.cache import TTLCache
+from app.middleware import ReadYourWritesMiddleware
+from app.replicas import ReplicaSet
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeEngine:
+    def __init__(self, name):
+        self.name = name
+        self.sync_engine = object()
+
+
+def make_replicas(lags, **kwargs):
+    engines = [FakeEngine(f"replica{i}") for i in range(len(lags))]
+    clock = FakeClock()
+    replicas = ReplicaSet(engines, clock=clock, **kwargs)
+
+    async def measure_lag(engine):
+        lag = lags[engines.index(engine)]
+        if isinstance(lag, Exception):
+            raise lag
+        return lag
+
+    replicas._measure_lag = measure_lag
+    return replicas, engines, clock
+
+
+def test_choose_round_robins_usable_replicas():
+    replicas, engines, _ = make_replicas([0, 0, 0])
+    chosen = [replicas.choose() for _ in range(4)]
+    assert chosen == [engines[0], engines[1], engines[2], engines[0]]
+
+
+def test_lagging_and_failing_replicas_are_skipped():
+    replicas, engines, _ = make_replicas(
+        [0, 10.0, ConnectionRefusedError()], max_lag=5
+    )
+    asyncio.run(replicas.refresh())
+    assert {replicas.choose() for _ in range(4)} == {engines[0]}
+
+    replicas.mark_down(engines[0].sync_engine)
+    assert replicas.choose() is None
+
+
+def test_failed_replica_returns_after_successful_check():
+    lags = [ConnectionRefusedError()]
+    replicas, engines, clock = make_replicas(lags, check_interval=5, retry_after=30)
+    asyncio.run(replicas.refresh())
+    assert replicas.choose() is None
+
+    lags[0] = 0
+    clock.now = 3
+    asyncio.run(replicas.refresh())  # checked too recently: still down
+    assert replicas.choose() is None
+
+    clock.now = 6
+    asyncio.run(replicas.refresh())
+    assert replicas.choose() is engines[0]
+
+
+def test_lag_check_that_hangs_counts_as_failure():
+    replicas, _, _ = make_replicas([0], timeout=0.01, retry_after=30)
+
+    async def hang(engine):
+        await asyncio.sleep(10)
+
+    replicas._measure_lag = hang
+    asyncio.run(replicas.refresh())
+    assert replicas.choose() is None
+
+
+def _worker_app(clock):
+    """One worker: a fresh in-process writer list behind the cookie middleware"""
+    recent_writers = TTLCache(maxsize=10, ttl=5)
+
+    async def write(request):
+        db.mark_write(7)
+        return JSONResponse({})
+
+    async def read(request):
+        previous, db.recent_writers = db.recent_writers, recent_writers
+        try:
+            return JSONResponse({"primary": db.wrote_recently(7)})
+        finally:
+            db.recent_writers = previous
+
+    routes = [Route("/write", write, methods=["POST"]), Route("/read", read)]
+    app = Starlette(routes=routes)
+    return ReadYourWritesMiddleware(app, secret="secret", ttl=5, clock=clock)
+
+
+def test_write_cookie_routes_reads_to_primary_in_other_workers(monkeypatch):
+    monkeypatch.setattr(db, "read_urls", ["postgresql+asyncpg://replica/db"])
+    monkeypatch.setattr(db, "recent_writers", TTLCache(maxsize=10, ttl=5))
+    clock = FakeClock()
+    clock.now = 1000.0
+    writer = TestClient(_worker_app(clock))
+    reader = TestClient(_worker_app(clock))
+
+    assert writer.get("/read").json() == {"primary": False}
+    response = writer.post("/write")
+    assert "Max-Age=5" in response.headers["set-cookie"]
+    cookie = writer.cookies["primary_until"]
+
+    reader.cookies.set("primary_until", cookie)
+    assert reader.get("/read").json() == {"primary": True}
+    clock.now += 5
+    assert reader.get("/read").json() == {"primary": False}
+
+
+def test_tampered_write_cookie_is_ignored(monkeypatch):
+    monkeypatch.setattr(db, "read_urls", ["postgresql+asyncpg://replica/db"])
+    clock = FakeClock()
+    middleware = _worker_app(clock)
+    value = middleware.cookie_value(7)
+
+    assert middleware.cookie_user(value) == 7
+    assert middleware.cookie_user("8" + value[1:]) is None
+    assert middleware.cookie_user(value[:-1]) is None
+    assert middleware.cookie_user("garbage") is None
+    client = TestClient(middleware)
+    client.cookies.set("primary_until", "8" + value[1:])
+    assert client.get("/read").json() == {"primary": False}
@@ -0,0 +1,40 @@
+"""
+Tests that the fast note serializers match response_model output byte for byte
+"""
+
+from datetime import datetime
+from typing import List
+
+from pydantic import TypeAdapter
+
+from app.api.models import NoteDB, NoteListItem
+from app.api.serializers import dump_note, dump_notes
+
+
+def make_row(id, **extra):
+    row = {
+        "id": id,
+        "title": f"Note ✓ {id}",
+        "description": 'Quotes " and \\ backslashes\nnew lines',
+        "completed": id % 2 == 0,
+        "is_deleted": False,
+        "tags": ["work", "ünïcode"],
+        "created_date": datetime(2024, 1, 15, 10, 30, 0, id),
+        "owner_id": 1,
+    }
+    row.update(extra)
+    return row
+
+
+def test_dump_note_matches_response_model():
+    row = make_row(1)
+    expected = TypeAdapter(NoteDB).dump_json(NoteDB.model_validate(row))
+    assert dump_note(row) == expected
+
+
+def test_dump_notes_matches_response_model():
+    rows = [make_row(0), make_row(1, snippet="<mark>Note</mark>"), make_row(2)]
+    adapter = TypeAdapter(List[NoteListItem])
+    expected = adapter.dump_json(adapter.validate_python(rows), exclude_unset=True)
+    assert dump_notes(rows) == expected
+    assert dump_notes([]) == b"[]"
@@ -0,0 +1,59 @@
+"""
+Import-time budget: importing the app must stay cheap for worker boot
+"""
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+SRC_DIR = Path(__file__).resolve().parents[1]
+# Generous for slow CI machines; importing app.main takes ~0.6s locally,
+# almost all of it FastAPI and SQLAlchemy themselves
+IMPORT_BUDGET_SECONDS = 2.0
+# Loaded on first use (lifespan, first login), never by the import
+DEFERRED_MODULES = ["asyncpg", "aiosqlite", "passlib", "bcrypt", "redis"]
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - start
+from app import db
+print(json.dumps({
+    "seconds": elapsed,
+    "loaded": [m for m in %r if m in sys.modules],
+    "engine_built": db.get_engine.cache_info().currsize > 0,
+}))
+""" % (DEFERRED_MODULES,)
+
+
+def _probe():
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        cwd=SRC_DIR,
+        env={**os.environ, "PYTHONPATH": str(SRC_DIR)},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+@pytest.fixture(scope="module")
+def import_report():
+    return _probe()
+
+
+def test_import_builds_no_engine_and_loads_no_driver(import_report):
+    assert import_report["engine_built"] is False
+    assert import_report["loaded"] == []
+
+
+def test_import_within_budget(import_report):
+    # Best of two, so a busy machine doesn't fail the build
+    seconds = min(import_report["seconds"], _probe()["seconds"])
+    assert seconds < IMPORT_BUDGET_SECONDS
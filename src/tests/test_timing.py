@@ -0,0 +1,73 @@
+"""
+Tests for Server-Timing headers and on-demand request profiling
+"""
+
+import time
+
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app import timing
+from app.middleware import ServerTimingMiddleware
+
+
+def test_request_timings_header():
+    with timing.collect() as timings:
+        timing.record("db", 0.002)
+        timing.record("db", 0.001)
+        with timing.measure("serialize"):
+            pass
+    timing.record("db", 1)  # outside a request: ignored
+
+    header = timings.header(total=0.01)
+    assert header.startswith('db;dur=3.00;desc="2x", serialize;dur=')
+    assert header.endswith("total;dur=10.00")
+
+
+def test_notes_response_has_server_timing(test_app, token_headers, monkeypatch):
+    from app.api import crud
+
+    async def mock_get_notes(session, owner_id, **kwargs):
+        return []
+
+    monkeypatch.setattr(crud, "get_notes", mock_get_notes)
+    response = test_app.get("/notes/", headers=token_headers)
+    assert response.status_code == 200
+    server_timing = response.headers["server-timing"]
+    assert "serialize;dur=" in server_timing
+    assert "total;dur=" in server_timing
+
+
+def _profiled_app(tmp_path):
+    async def slow(request):
+        deadline = time.perf_counter() + 0.05
+        while time.perf_counter() < deadline:
+            pass
+        return PlainTextResponse("ok")
+
+    app = Starlette(routes=[Route("/slow", slow)])
+    return ServerTimingMiddleware(
+        app, profile_token="secret", profile_dir=str(tmp_path), profile_interval=0.001
+    )
+
+
+def test_profile_written_for_valid_token(tmp_path):
+    with TestClient(_profiled_app(tmp_path)) as client:
+        response = client.get("/slow", headers={"X-Profile-Token": "secret"})
+
+    name = response.headers["x-profile"]
+    folded = (tmp_path / name).read_text()
+    assert "slow (test_timing.py:" in folded
+    _, count = folded.splitlines()[0].rsplit(" ", 1)
+    assert int(count) > 0
+
+
+def test_profile_requires_matching_token(tmp_path):
+    with TestClient(_profiled_app(tmp_path)) as client:
+        response = client.get("/slow", headers={"X-Profile-Token": "wrong"})
+
+    assert "x-profile" not in response.headers
+    assert "server-timing" in response.headers
+    assert list(tmp_path.iterdir()) == []
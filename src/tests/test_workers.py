@@ -0,0 +1,100 @@
+"""
+Tests for the multi-worker launcher
+"""
+
+import pytest
+
+from app import workers
+from app.config import Settings
+
+
+def make_settings(**kwargs):
+    defaults = dict(
+        db_pool_size=5,
+        db_max_overflow=10,
+        db_pool_max_connections=30,
+        note_cache_backend="redis",
+        database_read_urls="",
+    )
+    return Settings(**{**defaults, **kwargs})
+
+
+def test_worker_count_defaults_to_available_cpus(monkeypatch):
+    monkeypatch.setattr(workers, "available_cpus", lambda: 8)
+    assert workers.worker_count(make_settings(web_concurrency=0)) == 8
+    assert workers.worker_count(make_settings(web_concurrency=3)) == 3
+
+
+def test_pools_unchanged_without_budget_or_when_they_fit():
+    assert workers.worker_pool_limits(make_settings(db_connection_budget=0), 8) == {}
+    assert workers.worker_pool_limits(make_settings(db_connection_budget=300), 8) == {}
+
+
+def test_pools_scaled_to_budget_share():
+    settings = make_settings(db_connection_budget=100)
+    limits = workers.worker_pool_limits(settings, 8)
+    assert limits == {
+        "db_pool_size": 5,
+        "db_max_overflow": 7,
+        "db_pool_max_connections": 12,
+    }
+    assert limits["db_pool_max_connections"] * 8 <= 100
+
+    limits = workers.worker_pool_limits(make_settings(db_connection_budget=24), 8)
+    assert limits == {
+        "db_pool_size": 3,
+        "db_max_overflow": 0,
+        "db_pool_max_connections": 3,
+    }
+
+
+def test_budget_smaller_than_worker_count_is_rejected():
+    with pytest.raises(ValueError):
+        workers.worker_pool_limits(make_settings(db_connection_budget=4), 8)
+
+
+def test_run_passes_limits_to_workers(monkeypatch):
+    calls = {}
+    environ = {}
+    settings = make_settings(
+        web_concurrency=4, db_connection_budget=20, shutdown_drain_seconds=15
+    )
+    monkeypatch.setattr(workers, "get_settings", lambda: settings)
+    monkeypatch.setattr(workers.os, "environ", environ)
+    monkeypatch.setattr(workers.uvicorn, "run", lambda app, **kw: calls.update(kw))
+
+    workers.run()
+    assert calls["workers"] == 4
+    assert calls["loop"] == "uvloop"
+    assert calls["http"] == "httptools"
+    assert calls["timeout_graceful_shutdown"] == 15
+    assert environ == {
+        "DB_POOL_SIZE": "5",
+        "DB_MAX_OVERFLOW": "0",
+        "DB_POOL_MAX_CONNECTIONS": "5",
+    }
+
+
+def test_memory_note_cache_is_validated_for_several_workers():
+    settings = make_settings(note_cache_backend="memory")
+    assert workers.worker_state_overrides(settings, 1) == {}
+    assert workers.worker_state_overrides(settings, 4) == {
+        "note_cache_validate": "true"
+    }
+    assert workers.worker_state_overrides(make_settings(), 4) == {}
+
+
+def test_read_your_writes_is_kept_for_several_workers():
+    settings = make_settings(database_read_urls="postgresql+asyncpg://replica/db")
+    assert workers.worker_state_overrides(settings, 2) == {}
+
+
+def test_run_validates_the_memory_note_cache(monkeypatch):
+    environ = {}
+    settings = make_settings(web_concurrency=2, note_cache_backend="memory")
+    monkeypatch.setattr(workers, "get_settings", lambda: settings)
+    monkeypatch.setattr(workers.os, "environ", environ)
+    monkeypatch.setattr(workers.uvicorn, "run", lambda app, **kw: None)
+
+    workers.run()
+    assert environ == {"NOTE_CACHE_VALIDATE": "true"}